@@ -1,23 +1,32 @@
-import boto3
 import json
 
-from botocore.client import Config
 from uuid import uuid4
+from datetime import datetime, timedelta, timezone
 from flask import Blueprint, request, jsonify
 from app.core.dependencies import verify_admin, safe_db_operation
 from app.crud import admin as admin_crud
 from app.schemas.event import EventCreate, EventUpdate
 from app.schemas.update import LiveUpdateCreate, LiveUpdateUpdate
+from app.schemas.upload import (
+    ImageUploadRequest,
+    ImageUploadFinalize,
+    PartSignRequest,
+    UploadResumeRequest
+)
+from app.core.utils import (
+    presign_image_upload,
+    presign_video_parts,
+    file_url,
+    delete_file,
+    MAX_PART_NUMBER
+)
+from app.storage import r2, rollups
+from app.core import cache, fallback, purge
+from app.storage.backends import get_storage, StorageNotSupported
+from app.storage.dedup import content_digest
 from config import get_settings
 
 settings = get_settings()
-r2_client = boto3.client(
-    "s3",
-    endpoint_url=settings.r2_endpoint_url_s3,
-    aws_access_key_id=settings.r2_access_key_id,
-    aws_secret_access_key=settings.r2_secret_access_key,
-    config=Config(signature_version="s3v4")
-)
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
@@ -28,24 +37,42 @@ def initiate_video_upload():
     data = request.json
     filename = data.get("filename")
     content_type = data.get("content_type", "video/mp4")
+    parts_expected = data.get("parts_expected")
 
     if not filename:
         return jsonify({"error": "Filename required"}), 400
 
+    if parts_expected is not None:
+        try:
+            parts_expected = int(parts_expected)
+        except (TypeError, ValueError):
+            return jsonify({"error": "Invalid parts_expected"}), 400
+
+        if not 0 < parts_expected <= MAX_PART_NUMBER:
+            return jsonify({"error": "Invalid parts_expected"}), 400
+
     key = f"videos/{uuid4()}_{filename}"
 
     try:
-        response = r2_client.create_multipart_upload(
-            Bucket=settings.r2_bucket_name,
-            Key=key,
-            ContentType=content_type
+        upload_id = get_storage().create_multipart_upload(key, content_type)
+    except Exception as e:
+        return jsonify({'error': 'failed'}), 500
+
+    try:
+        session = safe_db_operation(
+            admin_crud.create_upload_session,
+            key,
+            upload_id,
+            content_type,
+            parts_expected
         )
     except Exception as e:
         return jsonify({'error': 'failed'}), 500
 
     return jsonify({
-        "upload_id": response["UploadId"],
-        "key": key
+        "upload_id": upload_id,
+        "key": key,
+        "session": session
     })
 
 
@@ -65,22 +92,195 @@ def sign_video_part():
         return jsonify({"error": "Missing key, upload_id, or part_number"}), 400
 
     try:
-        url = r2_client.generate_presigned_url(
-            "upload_part",
-            Params={
-                "Bucket": settings.r2_bucket_name,
-                "Key": key,
-                "UploadId": upload_id,
-                "PartNumber": part_number
-            },
-            ExpiresIn=3600
-        )
+        url = get_storage().presign_part(key, upload_id, part_number)
     except Exception as e:
         return jsonify({'error': 'failed'}), 500
 
     return jsonify({"url": url})
 
 
+@admin_bp.route("/videos/multipart/sign-parts", methods=["POST"])
+@verify_admin
+def sign_video_parts():
+    """Presign a batch of parts, given as a list or an inclusive range"""
+    try:
+        data = PartSignRequest(**(request.get_json() or {}))
+    except Exception:
+        return jsonify({"error": "invalid input"}), 400
+
+    if data.part_numbers is not None:
+        first, last = min(data.part_numbers, default=0), max(data.part_numbers, default=0)
+        count = len(set(data.part_numbers))
+    elif data.start is not None and data.end is not None:
+        first, last = data.start, data.end
+        count = data.end - data.start + 1
+    else:
+        return jsonify({"error": "Provide part_numbers or start and end"}), 400
+
+    # Checked before any list is built from the bounds
+    if not 0 < count <= settings.part_sign_batch_max:
+        return jsonify({
+            "error": f"Between 1 and {settings.part_sign_batch_max} parts per call"
+        }), 400
+
+    if first < 1 or last > MAX_PART_NUMBER:
+        return jsonify({"error": "invalid part number"}), 400
+
+    if data.part_numbers is not None:
+        part_numbers = sorted(set(data.part_numbers))
+    else:
+        part_numbers = list(range(first, last + 1))
+
+    try:
+        if not safe_db_operation(admin_crud.get_upload_session, data.key, data.upload_id):
+            return jsonify({"error": "Upload session not found"}), 404
+
+        urls = presign_video_parts(data.key, data.upload_id, part_numbers)
+    except Exception as e:
+        return jsonify({'error': 'failed'}), 500
+
+    return jsonify({"urls": {str(n): url for n, url in urls.items()}})
+
+
+@admin_bp.route("/videos/multipart/resume", methods=["POST"])
+@verify_admin
+def resume_video_upload():
+    """Report the parts storage already holds so only the rest are re-sent"""
+    try:
+        data = UploadResumeRequest(**(request.get_json() or {}))
+    except Exception:
+        return jsonify({"error": "invalid input"}), 400
+
+    try:
+        session = safe_db_operation(admin_crud.get_upload_session, data.key, data.upload_id)
+        if not session:
+            return jsonify({"error": "Upload session not found"}), 404
+
+        parts = get_storage().list_parts(data.key, data.upload_id)
+        session = safe_db_operation(admin_crud.record_uploaded_parts, data.key, len(parts))
+    except Exception as e:
+        return jsonify({'error': 'failed'}), 500
+
+    missing = None
+    urls = None
+    if session["parts_expected"]:
+        received = {part["PartNumber"] for part in parts}
+        missing = [
+            n for n in range(1, session["parts_expected"] + 1)
+            if n not in received
+        ]
+
+        if data.sign_missing and missing:
+            try:
+                signed = presign_video_parts(
+                    data.key,
+                    data.upload_id,
+                    missing[:settings.part_sign_batch_max]
+                )
+            except Exception as e:
+                return jsonify({'error': 'failed'}), 500
+            urls = {str(n): url for n, url in signed.items()}
+
+    return jsonify({
+        "session": session,
+        "parts": parts,
+        "missing_parts": missing,
+        "urls": urls
+    })
+
+
+@admin_bp.route("/uploads/images/presign", methods=["POST"])
+@verify_admin
+def presign_image():
+    """Issue a presigned URL so the image body bypasses the worker"""
+    try:
+        upload = ImageUploadRequest(**(request.get_json() or {}))
+    except Exception:
+        return jsonify({"error": "invalid input"}), 400
+
+    if upload.method not in ("PUT", "POST"):
+        return jsonify({"error": "Method must be PUT or POST"}), 400
+
+    if upload.content_type not in settings.image_upload_types:
+        return jsonify({"error": "Unsupported content type"}), 400
+
+    if not 0 < upload.size <= settings.image_upload_max_bytes:
+        return jsonify({"error": "Invalid file size"}), 400
+
+    try:
+        presigned = presign_image_upload(
+            upload.filename,
+            upload.content_type,
+            upload.size,
+            upload.method
+        )
+    except StorageNotSupported as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception:
+        return jsonify({'error': 'failed'}), 500
+
+    try:
+        safe_db_operation(
+            admin_crud.record_image_upload,
+            presigned["key"],
+            upload.content_type,
+            upload.size
+        )
+    except Exception:
+        return jsonify({'error': 'failed'}), 500
+
+    return jsonify(presigned)
+
+
+@admin_bp.route("/uploads/images/finalize", methods=["POST"])
+@verify_admin
+def finalize_image():
+    """Verify a presigned image upload and attach it to its owner"""
+    try:
+        upload = ImageUploadFinalize(**(request.get_json() or {}))
+    except Exception:
+        return jsonify({"error": "invalid input"}), 400
+
+    if upload.target not in admin_crud.IMAGE_TARGETS:
+        return jsonify({"error": "Target must be event, update or video"}), 400
+
+    if not upload.key.startswith("images/") or content_digest(upload.key):
+        return jsonify({"error": "Invalid key"}), 400
+
+    # Only keys presigned by /uploads/images/presign, each once
+    try:
+        if not safe_db_operation(admin_crud.image_upload_issued, upload.key):
+            return jsonify({"error": "Upload not found"}), 404
+
+        stored = get_storage().head_object(upload.key)
+    except Exception:
+        return jsonify({'error': 'failed'}), 500
+
+    if not stored:
+        return jsonify({"error": "Upload not found"}), 404
+
+    image_url = file_url(upload.key)
+    if (
+        stored["size"] > settings.image_upload_max_bytes
+        or stored["content_type"] not in settings.image_upload_types
+    ):
+        delete_file(image_url)
+        return jsonify({"error": "Uploaded file rejected"}), 400
+
+    try:
+        result = safe_db_operation(
+            admin_crud.finalize_image_upload,
+            upload.key,
+            upload.target,
+            upload.target_id
+        )
+        if not result:
+            return jsonify({"error": f"{upload.target.capitalize()} not found"}), 404
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': 'failed'}), 500
+
+
 @admin_bp.route("/videos", methods=["POST"])
 @verify_admin
 def complete_video_upload():
@@ -107,16 +307,11 @@ def complete_video_upload():
         return jsonify({"error": "Invalid parts format"}), 400
 
     try:
-        result = r2_client.complete_multipart_upload(
-            Bucket=settings.r2_bucket_name,
-            Key=key,
-            UploadId=upload_id,
-            MultipartUpload={"Parts": parts}
-        )
+        get_storage().complete_multipart_upload(key, upload_id, parts)
     except Exception:
         return jsonify({'error': 'failed'}), 500
 
-    video_url = f"{settings.r2_public_url}/{key}"
+    video_url = file_url(key)
     try:
         if not safe_db_operation(admin_crud.validate_category_ids, category_ids):
             return jsonify({"error": "Some category IDs are invalid."}), 400
@@ -125,7 +320,8 @@ def complete_video_upload():
             "title": title,
             "description": description,
             "categories": category_ids,
-            'video_url': video_url
+            'video_url': video_url,
+            'key': key
         }
 
         created_video = safe_db_operation(admin_crud.upload_files, video_data, thumbnail)
@@ -134,6 +330,25 @@ def complete_video_upload():
         return jsonify({'error': 'failed'}), 500
 
 
+@admin_bp.route("/storage/stats", methods=["GET"])
+@verify_admin
+def get_storage_stats():
+    """Storage client request latency and connection pool utilization"""
+    return jsonify({"backend": get_storage().name, **r2.stats()})
+
+
+@admin_bp.route("/cache/stats", methods=["GET"])
+@verify_admin
+def get_cache_stats():
+    """Coalesced reads, database circuit, last-known-good store and CDN purges of this worker"""
+    return jsonify({
+        **cache.reads.stats(),
+        "circuit": fallback.breaker.stats(),
+        "last_known_good": fallback.store.stats(),
+        "purger": purge.get_purger().stats()
+    })
+
+
 @admin_bp.route("/events", methods=["POST"])
 @verify_admin
 def create_event():
@@ -167,6 +382,8 @@ def add_update_to_event(event_id: int):
 
     try:
         created_update = safe_db_operation(admin_crud.add_update, event_id, update, image_file)
+        if created_update is None:
+            return jsonify({"error": "Event not found"}), 404
         return jsonify(created_update)
     except Exception as e:
         return jsonify({'error': 'failed'}), 500
@@ -182,12 +399,60 @@ def get_the_analytics():
         return jsonify({'error': 'failed'}), 500
 
 
+@admin_bp.route("/analytics/trends", methods=["GET"])
+@verify_admin
+def get_analytics_trend():
+    """Per-bucket totals of one metric, e.g. ?metric=views&group_by=category&days=7"""
+    metric = request.args.get("metric", "views")
+    entity_type = request.args.get("type", "video")
+    granularity = request.args.get("granularity", "day")
+    group_by = request.args.get("group_by") or None
+
+    if metric not in rollups.METRICS:
+        return jsonify({"error": f"metric must be one of {', '.join(rollups.METRICS)}"}), 400
+    if entity_type not in rollups.ENTITY_TYPES:
+        return jsonify({"error": f"type must be one of {', '.join(rollups.ENTITY_TYPES)}"}), 400
+    if granularity not in rollups.GRANULARITIES:
+        return jsonify({"error": "granularity must be hour or day"}), 400
+    if group_by not in (None, "category", "entity"):
+        return jsonify({"error": "group_by must be category or entity"}), 400
+    if group_by == "category" and entity_type != "video":
+        return jsonify({"error": "Only videos have categories"}), 400
+
+    try:
+        end = request.args.get("end")
+        end = datetime.fromisoformat(end) if end else datetime.now(timezone.utc)
+        start = request.args.get("start")
+        start = datetime.fromisoformat(start) if start else end - timedelta(
+            days=request.args.get("days", default=7, type=int)
+        )
+    except ValueError:
+        return jsonify({"error": "Invalid start or end"}), 400
+
+    start, end = (value if value.tzinfo else value.replace(tzinfo=timezone.utc) for value in (start, end))
+    max_days = (
+        settings.rollup_hourly_retention_days if granularity == "hour"
+        else settings.analytics_trend_max_days
+    )
+    if not start < end or end - start > timedelta(days=max_days):
+        return jsonify({"error": f"Range must be positive and at most {max_days} days"}), 400
+
+    try:
+        trend = safe_db_operation(
+            admin_crud.get_trend, metric, entity_type, start, end, granularity, group_by
+        )
+        return jsonify(trend.model_dump())
+    except Exception as e:
+        return jsonify({'error': 'failed'}), 500
+
+
 @admin_bp.route("/events/<int:event_id>", methods=["DELETE"])
 @verify_admin
 def close_and_delete_event(event_id):
     try:
         result = safe_db_operation(admin_crud.delete_event, event_id)
-        return jsonify(result.model_dump())
+        # Large events finish deleting in the background
+        return jsonify(result.model_dump()), 202 if result.status == 'deleting' else 200
     except Exception as e:
         return jsonify({'error': 'failed'}), 500
 
@@ -1,4 +1,3 @@
-import jwt
 from flask import Blueprint, request, jsonify
 from datetime import timedelta
 
@@ -70,6 +69,8 @@ def refresh_token():
 
     refresh_token_value = data["refresh_token"]
 
+    import jwt
+
     try:
         payload = jwt.decode(
             refresh_token_value, settings.secret_key, algorithms=[ALGORITHM]
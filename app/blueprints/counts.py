@@ -0,0 +1,32 @@
+from flask import Blueprint, jsonify
+from app.core.dependencies import safe_db_operation, request_ids
+from app.crud import counts as counts_crud
+from config import get_settings
+
+settings = get_settings()
+
+counts_bp = Blueprint("counts", __name__, url_prefix="/counts")
+
+
+@counts_bp.route("", methods=["GET"])
+def get_counts():
+    """Likes, comments and views of many items, e.g. ?video_ids=1,2&event_ids=3"""
+    try:
+        ids = {
+            target: request_ids(f"{target[:-1]}_ids")
+            for target in counts_crud.TARGETS
+        }
+    except ValueError:
+        return jsonify({"error": "ids must be integers"}), 400
+
+    ids = {target: target_ids for target, target_ids in ids.items() if target_ids}
+    if not ids:
+        return jsonify({"error": "video_ids, update_ids or event_ids required"}), 400
+    if sum(len(target_ids) for target_ids in ids.values()) > settings.batch_max_ids:
+        return jsonify({"error": f"At most {settings.batch_max_ids} ids per request"}), 400
+
+    try:
+        counts = safe_db_operation(counts_crud.get_counts, ids)
+        return jsonify(counts)
+    except Exception as e:
+        return jsonify({'error': 'failed'}), 500
@@ -1,5 +1,5 @@
 from flask import Blueprint, jsonify, request
-from app.core.dependencies import safe_db_operation
+from app.core.dependencies import safe_db_operation, shared_db_operation
 from app.crud import event as events_crud
 from app.schemas.comment import CommentCreate
 
@@ -20,7 +20,7 @@ def get_event_updates(event_id: int):
     limit = request.args.get("limit", default=10, type=int)
     offset = request.args.get("offset", default=0, type=int)
     try:
-        updates = safe_db_operation(events_crud.get_updates_for_event, event_id, limit, offset)
+        updates = shared_db_operation(events_crud.get_updates_for_event, event_id, limit, offset)
         return jsonify(updates)
     except Exception as e:
         return jsonify({'error': 'failed'}), 500
@@ -29,7 +29,7 @@ def get_event_updates(event_id: int):
 @event_bp.route("/<int:event_id>", methods=["GET"])
 def get_an_event(event_id: int):
     try:
-        event = safe_db_operation(events_crud.get_event, event_id)
+        event = shared_db_operation(events_crud.get_event, event_id)
         if event:
             return jsonify(event)
 
@@ -44,6 +44,8 @@ def comment_on_event(event_id: int):
     content = CommentCreate(**data)
     try:
         comment = safe_db_operation(events_crud.comment_on_event, event_id, content)
+        if comment is None:
+            return jsonify({"detail": "Event not found"}), 404
         return jsonify(comment)
     except Exception as e:
         return jsonify({'error': 'failed'}), 500
@@ -62,6 +64,8 @@ def get_event_comments(event_id: int):
 def like_an_event(event_id: int):
     try:
         like = safe_db_operation(events_crud.like_event, event_id)
+        if like is None:
+            return jsonify({"detail": "Event not found"}), 404
         return jsonify(like)
     except Exception as e:
         return jsonify({'error': 'failed'}), 500
@@ -0,0 +1,30 @@
+from flask import Blueprint, Response, jsonify, request
+from app.core.cache import PayloadCache
+from app.crud.feed import get_home_feed
+from app.storage import changes
+from config import get_settings
+
+settings = get_settings()
+
+feed_bp = Blueprint("feed", __name__, url_prefix="/feed")
+
+home_cache = PayloadCache(
+    get_home_feed,
+    changes.current_generation,
+    check_seconds=settings.feed_check_seconds,
+    max_age=settings.feed_max_age_seconds
+)
+changes.content_changed.connect(home_cache.invalidate)
+
+
+@feed_bp.route("/home", methods=["GET"])
+def get_home():
+    """Recent videos, recent updates and live events in one response"""
+    try:
+        cached = home_cache.get()
+    except Exception as e:
+        return jsonify({'error': 'failed'}), 500
+
+    response = Response(cached.body, mimetype="application/json")
+    response.set_etag(cached.etag)
+    return response.make_conditional(request)
@@ -0,0 +1,72 @@
+from flask import Blueprint, request, jsonify, send_file, redirect
+from app.storage.backends import get_storage, LocalBackend, StorageError
+from config import get_settings
+
+settings = get_settings()
+
+media_bp = Blueprint("media", __name__, url_prefix="/media")
+
+MAX_PART_BYTES = 5 * 1024 ** 3  # S3 multipart part limit
+
+
+@media_bp.route("/<path:key>", methods=["GET", "HEAD"])
+def serve_media(key: str):
+    """Serve a stored file from local disk, with Range and conditional requests"""
+    storage = get_storage()
+    path = storage.local_path(key)
+    if path is None:
+        if isinstance(storage, LocalBackend):
+            return jsonify({"error": "Not found"}), 404
+        return redirect(storage.public_url(key))
+
+    # A path lets the WSGI server use sendfile(), or the proxy X-Sendfile
+    response = send_file(
+        path,
+        mimetype=storage.content_type(key),
+        conditional=True,
+        etag=True,
+        max_age=settings.media_max_age
+    )
+    response.headers.update(storage.object_headers(key))
+    return response
+
+
+@media_bp.route("/_upload", methods=["PUT"])
+def receive_upload():
+    """Accept a presigned PUT or multipart part upload for local storage"""
+    storage = get_storage()
+    if not isinstance(storage, LocalBackend):
+        return jsonify({"error": "Not found"}), 404
+
+    try:
+        grant = storage.verify_grant(request.args.get("token", ""))
+    except StorageError as e:
+        return jsonify({"error": str(e)}), 403
+
+    try:
+        if "upload_id" in grant:
+            etag = storage.upload_part(
+                grant["upload_id"],
+                grant["part"],
+                request.stream,
+                max_bytes=MAX_PART_BYTES
+            )
+        else:
+            if request.mimetype != grant["content_type"]:
+                return jsonify({"error": "Content type does not match the grant"}), 403
+            if request.content_length != grant["size"]:
+                return jsonify({"error": "Content length does not match the grant"}), 403
+
+            etag = storage.upload_fileobj(
+                request.stream,
+                grant["key"],
+                grant["content_type"],
+                max_bytes=grant["size"]
+            )
+            etag = f'"{etag}"'
+    except StorageError as e:
+        return jsonify({"error": str(e)}), 400
+
+    response = jsonify({"key": grant["key"]})
+    response.headers["ETag"] = etag
+    return response
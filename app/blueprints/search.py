@@ -0,0 +1,33 @@
+from flask import Blueprint, jsonify, request
+from app.core.dependencies import safe_db_operation
+from app.crud import search as search_crud
+from app.storage.search import SEARCH_TYPES
+from config import get_settings
+
+settings = get_settings()
+
+search_bp = Blueprint("search", __name__, url_prefix="/search")
+
+
+@search_bp.route("", methods=["GET"])
+def search_content():
+    """Full-text search, e.g. ?q=election&type=video&type=update&category_ids=2"""
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Query required"}), 400
+    if len(query) > settings.search_max_query_length:
+        return jsonify({"error": "Query too long"}), 400
+
+    types = request.args.getlist("type") or list(SEARCH_TYPES)
+    if any(entity_type not in SEARCH_TYPES for entity_type in types):
+        return jsonify({"error": f"type must be one of {', '.join(SEARCH_TYPES)}"}), 400
+
+    category_ids = request.args.getlist("category_ids", type=int) or None
+    limit = min(max(request.args.get("limit", default=20, type=int), 1), settings.search_max_limit)
+    offset = max(request.args.get("offset", default=0, type=int), 0)
+
+    try:
+        results = safe_db_operation(search_crud.search, query, types, category_ids, limit, offset)
+        return jsonify(results)
+    except Exception as e:
+        return jsonify({'error': 'failed'}), 500
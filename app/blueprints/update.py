@@ -2,6 +2,9 @@ from flask import Blueprint, jsonify, request, abort
 from app.core.dependencies import safe_db_operation
 from app.crud import update as updates_crud
 from app.schemas.comment import CommentPublic, CommentCreate
+from config import get_settings
+
+settings = get_settings()
 
 update_bp = Blueprint("update", __name__, url_prefix="/updates")
 
@@ -15,6 +18,16 @@ def fetch_recent_updates():
         return jsonify({'error': 'failed'}), 500
 
 
+@update_bp.route("/trending", methods=["GET"])
+def fetch_trending_updates():
+    limit = min(max(request.args.get("limit", default=10, type=int), 1), settings.trending_max_limit)
+    try:
+        updates = safe_db_operation(updates_crud.get_trending_updates, limit)
+        return jsonify(updates)
+    except Exception as e:
+        return jsonify({'error': 'failed'}), 500
+
+
 @update_bp.route("/<int:update_id>", methods=["GET"])
 def get_event_update(update_id: int):
     try:
@@ -33,6 +46,8 @@ def comment_on_update(update_id: int):
         content_data = request.get_json()
         content = CommentCreate(**content_data)
         comment = safe_db_operation(updates_crud.comment_on_update, update_id, content)
+        if comment is None:
+            return jsonify({'error': 'live update not found'}), 404
         return jsonify(comment)
     except Exception as e:
         return jsonify({'error': 'failed'}), 500
@@ -51,6 +66,8 @@ def get_update_comments(update_id: int):
 def like_update(update_id: int):
     try:
         like = safe_db_operation(updates_crud.like_update, update_id)
+        if like is None:
+            return jsonify({'error': 'live update not found'}), 404
         return jsonify(like)
     except Exception as e:
         return jsonify({'error': 'failed'}), 500
@@ -1,11 +1,35 @@
 from flask import Blueprint, jsonify, request
-from app.core.dependencies import safe_db_operation
+from app.core.dependencies import safe_db_operation, shared_db_operation, request_ids
 from app.crud import video as videos_crud
+from app.storage import viewcounts
+from config import get_settings
 from app.schemas.comment import  CommentCreate
 
+settings = get_settings()
+
 video_bp = Blueprint("video", __name__, url_prefix="/tvs")
 
 
+@video_bp.route("", methods=["GET"])
+def get_videos_by_ids():
+    """Many videos at once as an id-keyed map, e.g. ?ids=1,2,3"""
+    try:
+        video_ids = request_ids("ids")
+    except ValueError:
+        return jsonify({"error": "ids must be integers"}), 400
+
+    if not video_ids:
+        return jsonify({"error": "ids required"}), 400
+    if len(video_ids) > settings.batch_max_ids:
+        return jsonify({"error": f"At most {settings.batch_max_ids} ids per request"}), 400
+
+    try:
+        videos = safe_db_operation(videos_crud.get_videos_by_ids, video_ids)
+        return jsonify(videos)
+    except Exception as e:
+        return jsonify({'error': 'failed'}), 500
+
+
 @video_bp.route("/ungrouped", methods=["GET"])
 def get_ungrouped_videos():
     category_ids = request.args.getlist("category_ids", type=int) or None
@@ -35,12 +59,26 @@ def fetch_recent_videos():
         return jsonify({'error': 'failed'}), 500
 
 
+@video_bp.route("/trending", methods=["GET"])
+def fetch_trending_videos():
+    limit = min(max(request.args.get("limit", default=10, type=int), 1), settings.trending_max_limit)
+    try:
+        videos = safe_db_operation(videos_crud.get_trending_videos, limit)
+        return jsonify(videos)
+    except Exception as e:
+        return jsonify({'error': 'failed'}), 500
+
+
 @video_bp.route("/<int:video_id>", methods=["GET"])
 def get_a_video(video_id: int):
     try:
-        video = safe_db_operation(videos_crud.get_video_and_increment_views, video_id)
+        video = shared_db_operation(videos_crud.get_video_with_related, video_id)
         if video:
-            return jsonify(video)
+            # Counted in memory and written in batches, see viewcounts
+            views = video["video"]["views"] + viewcounts.record_view(
+                video_id, viewcounts.viewer_fingerprint()
+            )
+            return jsonify({**video, "video": {**video["video"], "views": views}})
 
         return jsonify({'error': "Video not found"}), 404
     except Exception as e:
@@ -49,9 +87,16 @@ def get_a_video(video_id: int):
 
 @video_bp.route("/<int:video_id>/views", methods=["GET"])
 def get_video_views(video_id: int):
+    days = request.args.get("days", type=int)
+    if days is not None and not 0 < days <= settings.analytics_trend_max_days:
+        return jsonify({'error': f"days must be between 1 and {settings.analytics_trend_max_days}"}), 400
+
     try:
-        count = safe_db_operation(videos_crud.get_view_count_for_video, video_id)
-        return jsonify(count)
+        counts = safe_db_operation(videos_crud.get_view_counts, video_id, days)
+        if counts is None:
+            return jsonify({'error': "Video not found"}), 404
+
+        return jsonify(counts)
     except Exception as e:
         return jsonify({'error': 'failed'}), 500
 
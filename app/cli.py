@@ -0,0 +1,119 @@
+import json
+import click
+
+from datetime import datetime, timedelta, timezone
+from flask import Flask
+from app.core.dependencies import safe_db_operation
+from app.storage import sweeper, deletions, cascade, rollups, trending, search, snapshots, viewcounts
+from app.crud import admin as admin_crud
+from app.core.images import process_image
+from app.factory import bootstrap
+from app.storage.database import db_config
+from config import get_settings
+
+
+def register_commands(app: Flask):
+    """Attach the maintenance commands to `flask`."""
+
+    @app.cli.command("bootstrap")
+    def bootstrap_command():
+        """Create the schema, the default admin and missing categories."""
+        click.echo(json.dumps(bootstrap()))
+
+    @app.cli.command("sweep-storage")
+    @click.option("--dry-run", is_flag=True, help="Report without deleting anything.")
+    @click.option("--stale-hours", default=24, show_default=True,
+                  help="Abort multipart uploads older than this.")
+    @click.option("--grace-hours", default=1, show_default=True,
+                  help="Keep unreferenced objects younger than this.")
+    def sweep_storage_command(dry_run: bool, stale_hours: int, grace_hours: int):
+        """Abort stale multipart uploads and delete orphaned objects."""
+        referenced = safe_db_operation(sweeper.referenced_keys)
+        report = sweeper.sweep_storage(
+            referenced,
+            dry_run=dry_run,
+            stale_after=timedelta(hours=stale_hours),
+            grace=timedelta(hours=grace_hours)
+        )
+
+        if not dry_run and report["stale_uploads"]:
+            safe_db_operation(sweeper.mark_uploads_aborted, report["stale_uploads"])
+
+        click.echo(json.dumps(report, indent=2))
+
+    @app.cli.command("drain-deletions")
+    def drain_deletions_command():
+        """Delete every due key in the storage deletion queue."""
+        claimed = deleted = 0
+        while True:
+            result = deletions.drain_once()
+            claimed += result["claimed"]
+            deleted += result["deleted"]
+            if not result["claimed"]:
+                break
+
+        click.echo(json.dumps({"claimed": claimed, "deleted": deleted}))
+
+    @app.cli.command("purge-events")
+    def purge_events_command():
+        """Finish deleting events whose background purge was interrupted."""
+        event_ids = safe_db_operation(cascade.get_deleting_event_ids)
+        for event_id in event_ids:
+            cascade.purge_event_job(event_id)
+
+        click.echo(json.dumps({"purged": event_ids}))
+
+    @app.cli.command("build-image-variants")
+    def build_image_variants_command():
+        """Generate resized variants for images that have none yet."""
+        missing = safe_db_operation(admin_crud.get_images_without_variants)
+        for target, target_id, url in missing:
+            try:
+                process_image(target, target_id, url)
+            except Exception as e:
+                click.echo(f"{target} {target_id}: {e}", err=True)
+
+        click.echo(json.dumps({"processed": len(missing)}))
+
+    @app.cli.command("prune-rollups")
+    def prune_rollups_command():
+        """Drop hourly engagement buckets past ROLLUP_HOURLY_RETENTION_DAYS."""
+        before = datetime.now(timezone.utc) - timedelta(
+            days=get_settings().rollup_hourly_retention_days
+        )
+        pruned = safe_db_operation(rollups.prune_hourly, before)
+        click.echo(json.dumps({"pruned": pruned}))
+
+    @app.cli.command("prune-sketches")
+    def prune_sketches_command():
+        """Drop daily unique-viewer sketches past ANALYTICS_TREND_MAX_DAYS."""
+        pruned = safe_db_operation(viewcounts.prune_sketches, get_settings().analytics_trend_max_days)
+        click.echo(json.dumps({"pruned": pruned}))
+
+    @app.cli.command("rebuild-rollups")
+    @click.option("--days", type=int, default=None,
+                  help="Only recount the last N days (default: everything).")
+    def rebuild_rollups_command(days: int | None):
+        """Recount likes and comments buckets from the raw rows."""
+        since = datetime.now(timezone.utc) - timedelta(days=days) if days else None
+        safe_db_operation(rollups.rebuild_likes_and_comments, since)
+        click.echo(json.dumps({"rebuilt": True, "days": days}))
+
+    @app.cli.command("rebase-trending")
+    def rebase_trending_command():
+        """Rescale trending scores to a new landmark and drop faded items."""
+        click.echo(json.dumps(safe_db_operation(trending.rebase)))
+
+    @app.cli.command("reindex-search")
+    def reindex_search_command():
+        """Rebuild the full-text search index from the content tables."""
+        index = search.get_search_index()
+        index.ensure_schema(db_config.get_engine())
+        indexed = safe_db_operation(index.rebuild)
+        click.echo(json.dumps({"backend": index.name, "indexed": indexed}))
+
+    @app.cli.command("publish-snapshots")
+    def publish_snapshots_command():
+        """Publish the catalogue and every ended event as static JSON snapshots."""
+        names = set(snapshots.CATALOGUE) | safe_db_operation(snapshots.ended_event_names)
+        click.echo(json.dumps(snapshots.publish(names), indent=2, sort_keys=True))
@@ -0,0 +1,271 @@
+import os
+import time
+import fcntl
+import logging
+import threading
+
+from contextlib import contextmanager
+from flask import Flask, g, has_request_context, jsonify, request
+from app.core import timing
+from config import get_settings
+
+settings = get_settings()
+
+READ = "read"
+WRITE = "write"
+ADMIN = "admin"
+BACKGROUND = "background"
+
+# Logins stay out: anyone can send them, so they must not eat admin capacity
+ADMIN_BLUEPRINTS = {"admin"}
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class AdmissionRejected(Exception):
+    """Raised when a database slot could not be obtained in time."""
+
+    def __init__(self, pool: str, retry_after: int):
+        super().__init__(f"database pool '{pool}' is saturated")
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+class _Pool:
+    def __init__(self, name: str, limit: int, priority: bool = False):
+        self.name = name
+        self.limit = limit
+        self.priority = priority
+        self.in_use = 0
+        self.waiting = 0
+        self.rejected = 0
+
+
+class AdmissionController:
+    """
+    Bulkhead around database access.
+
+    Every pool has its own slot limit; all pools share the process-wide
+    connection limit, of which `reserved` slots may only be taken by the
+    priority (admin) pool. Waiters queue for at most `timeout` seconds and at
+    most `max_waiters` may queue per pool; anything beyond is rejected
+    immediately so the caller can answer with a 503.
+
+    When `lock_dir` is set, pool slots are additionally backed by `flock`ed
+    files in that directory, which makes the pool limits host-wide across
+    all gunicorn workers.
+    """
+
+    def __init__(
+        self,
+        max_connections: int,
+        pools: dict[str, int],
+        priority_pool: str,
+        reserved: int,
+        max_waiters: int,
+        timeout: float,
+        retry_after: int,
+        lock_dir: str = ""
+    ):
+        self.max_connections = max_connections
+        self.reserved = min(reserved, max_connections)
+        self.max_waiters = max_waiters
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.lock_dir = lock_dir
+        self.pools = {
+            name: _Pool(name, limit, priority=(name == priority_pool))
+            for name, limit in pools.items()
+        }
+        self.in_use = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+
+    def _priority_waiting(self) -> bool:
+        return any(p.waiting for p in self.pools.values() if p.priority)
+
+    def _can_enter(self, pool: _Pool) -> bool:
+        if pool.in_use >= pool.limit:
+            return False
+
+        if pool.priority:
+            return self.in_use < self.max_connections
+
+        if self._priority_waiting():
+            return False
+
+        return self.in_use < self.max_connections - self.reserved
+
+    def _reject(self, pool: _Pool):
+        pool.rejected += 1
+        logging.warning(f"Admission rejected for database pool '{pool.name}'")
+        raise AdmissionRejected(pool.name, self.retry_after)
+
+    def _acquire_local(self, pool: _Pool, deadline: float):
+        with self._cond:
+            if self._can_enter(pool):
+                pool.in_use += 1
+                self.in_use += 1
+                return
+
+            if pool.waiting >= self.max_waiters:
+                self._reject(pool)
+
+            pool.waiting += 1
+            try:
+                while not self._can_enter(pool):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._reject(pool)
+                    self._cond.wait(remaining)
+            finally:
+                pool.waiting -= 1
+                # A departing priority waiter may unblock public waiters
+                self._cond.notify_all()
+
+            pool.in_use += 1
+            self.in_use += 1
+
+    def _release_local(self, pool: _Pool):
+        with self._cond:
+            pool.in_use -= 1
+            self.in_use -= 1
+            self._cond.notify_all()
+
+    def _acquire_file_slot(self, pool: _Pool, deadline: float) -> int:
+        """Grab one of the pool's slot files; returns the locked descriptor."""
+        while True:
+            for index in range(pool.limit):
+                path = os.path.join(self.lock_dir, f"{pool.name}-{index}.lock")
+                fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except BlockingIOError:
+                    os.close(fd)
+
+            if time.monotonic() >= deadline:
+                pool.rejected += 1
+                raise AdmissionRejected(pool.name, self.retry_after)
+            time.sleep(0.02)
+
+    @contextmanager
+    def slot(self, pool_name: str):
+        """Hold a database slot from `pool_name` for the duration of the block."""
+        # Nested database calls on the same thread reuse the outer slot
+        if getattr(self._local, "depth", 0):
+            self._local.depth += 1
+            try:
+                yield
+            finally:
+                self._local.depth -= 1
+            return
+
+        pool = self.pools[pool_name]
+        deadline = time.monotonic() + self.timeout
+        with timing.timed("db-queue"):
+            self._acquire_local(pool, deadline)
+
+        fd = None
+        try:
+            if self.lock_dir:
+                with timing.timed("db-queue"):
+                    fd = self._acquire_file_slot(pool, deadline)
+
+            self._local.depth = 1
+            try:
+                yield
+            finally:
+                self._local.depth = 0
+        finally:
+            if fd is not None:
+                os.close(fd)
+            self._release_local(pool)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "in_use": self.in_use,
+                "max_connections": self.max_connections,
+                "pools": {
+                    name: {
+                        "in_use": p.in_use,
+                        "limit": p.limit,
+                        "waiting": p.waiting,
+                        "rejected": p.rejected
+                    }
+                    for name, p in self.pools.items()
+                }
+            }
+
+
+controller = AdmissionController(
+    max_connections=settings.db_max_connections,
+    pools={
+        READ: settings.db_read_slots,
+        WRITE: settings.db_write_slots,
+        ADMIN: settings.db_admin_slots,
+        BACKGROUND: settings.db_background_slots,
+    },
+    priority_pool=ADMIN,
+    reserved=settings.db_admin_reserved,
+    max_waiters=settings.db_queue_size,
+    timeout=settings.db_queue_timeout,
+    retry_after=settings.db_retry_after,
+    lock_dir=settings.db_slot_lock_dir
+)
+
+
+def current_pool() -> str:
+    """Classify the current unit of work into a database pool."""
+    if not has_request_context():
+        # Startup, maintenance and background jobs (view flushes, deletions,
+        # purges, snapshots) must not take the admin's reserved slots
+        return BACKGROUND
+
+    if request.blueprint in ADMIN_BLUEPRINTS:
+        return ADMIN
+
+    if request.method in READ_METHODS:
+        return READ
+
+    return WRITE
+
+
+@contextmanager
+def db_slot():
+    """Admission-controlled section for one database operation."""
+    try:
+        with controller.slot(current_pool()):
+            yield
+    except AdmissionRejected as e:
+        if has_request_context():
+            # Views swallow exceptions into a 500; remember the rejection so
+            # the response can be rewritten into a 503 on the way out
+            g.admission_rejected = e
+        raise
+
+
+def _rejection_response(response):
+    rejected = g.pop("admission_rejected", None)
+    if rejected is None:
+        return response
+
+    busy = jsonify({"error": "Service busy, retry later"})
+    busy.status_code = 503
+    busy.headers["Retry-After"] = str(rejected.retry_after)
+    return busy
+
+
+def init_app(app: Flask):
+    """Register the 503 rewriting hooks on the application."""
+    app.after_request(_rejection_response)
+
+    @app.errorhandler(AdmissionRejected)
+    def _handle_rejection(e: AdmissionRejected):
+        response = jsonify({"error": "Service busy, retry later"})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response
@@ -0,0 +1,40 @@
+import os
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, Future
+from config import get_settings
+
+settings = get_settings()
+
+_executor: ThreadPoolExecutor | None = None
+_executor_pid: int | None = None
+_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    # Executors do not survive fork, so each worker process builds its own
+    global _executor, _executor_pid
+
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.background_workers,
+                thread_name_prefix="background"
+            )
+            _executor_pid = os.getpid()
+
+        return _executor
+
+
+def _log_failure(future: Future):
+    error = future.exception()
+    if error:
+        logging.warning(f"Background job failed: {error!r}")
+
+
+def submit(func, *args, **kwargs) -> Future:
+    """Run `func` on the per-process background thread pool."""
+    future = _get_executor().submit(func, *args, **kwargs)
+    future.add_done_callback(_log_failure)
+    return future
@@ -0,0 +1,202 @@
+import time
+import hashlib
+import threading
+
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from flask import current_app, g, has_request_context
+from app.core import fallback, timing
+from app.core.admission import AdmissionRejected
+from app.storage import changes
+from config import get_settings
+
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class CachedPayload:
+    body: bytes
+    etag: str
+    generation: int
+    built_at: float
+
+
+def serialize(payload) -> tuple[bytes, str]:
+    """JSON body of a response, encoded once, and its strong ETag"""
+    body = current_app.json.dumps(payload).encode()
+    return body, hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class PayloadCache:
+    """
+    One response body shared by this process's threads, kept serialized.
+
+    `build(db)` returns (content generation, payload). The body is dropped
+    when this process commits a content change (`content_changed`), and
+    when another process's change moves the shared generation on, which is
+    checked at most every `check_seconds`. Counts that change without a
+    generation bump (likes, comments) are at most `max_age` seconds old.
+    """
+
+    def __init__(self, build, current_generation, check_seconds: float, max_age: float):
+        self.build = build
+        self.current_generation = current_generation
+        self.check_seconds = check_seconds
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.entry: CachedPayload | None = None
+        self.checked_at = 0.0
+        self.invalidations = 0
+
+    def invalidate(self, *args, **kwargs):
+        self.invalidations += 1
+        self.entry = None
+
+    def _young(self, entry: CachedPayload | None, now: float) -> bool:
+        return entry is not None and now - entry.built_at <= self.max_age
+
+    def get(self) -> CachedPayload:
+        from app.core.dependencies import safe_db_operation
+
+        entry, now = self.entry, time.monotonic()
+        if self._young(entry, now) and now - self.checked_at < self.check_seconds:
+            return entry
+
+        # One thread checks or rebuilds; the others wait and take its result
+        with self.lock:
+            entry, now = self.entry, time.monotonic()
+            if self._young(entry, now):
+                if now - self.checked_at < self.check_seconds:
+                    return entry
+                self.checked_at = now
+                if safe_db_operation(self.current_generation) == entry.generation:
+                    return entry
+
+            invalidations = self.invalidations
+            generation, payload = safe_db_operation(self.build)
+            body, etag = serialize(payload)
+            entry = CachedPayload(body, etag, generation, time.monotonic())
+            # A change committed during the build may be missing from it
+            if invalidations == self.invalidations:
+                self.entry, self.checked_at = entry, entry.built_at
+
+            return entry
+
+
+class _Call:
+    """One execution of a key, awaited by every caller coalesced onto it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Exception | None = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent reads within this process.
+
+    Calls are keyed by route and arguments. While one thread runs a key,
+    other callers wait for its result instead of running the same queries.
+    Results are then served as-is for `fresh_seconds`. For `stale_seconds`
+    more, the first caller after expiry refreshes the entry while everyone
+    else is answered from the stale one (stale-while-revalidate). At most
+    `max_entries` results are kept, least recently used first out.
+    """
+
+    OUTCOMES = ("executed", "coalesced", "fresh", "stale", "failed")
+
+    def __init__(self, fresh_seconds: float, stale_seconds: float, max_entries: int):
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[tuple, tuple[object, float]] = OrderedDict()
+        self.calls: dict[tuple, _Call] = {}
+        self.invalidations = 0
+        self.counts: dict[str, Counter] = {}
+
+    def clear(self, *args, **kwargs):
+        with self.lock:
+            self.entries.clear()
+            self.invalidations += 1
+
+    def _count(self, route: str, outcome: str):
+        self.counts.setdefault(route, Counter())[outcome] += 1
+
+    def run(self, route: str, operation_func, *args):
+        """`safe_db_operation(operation_func, *args)`, coalesced per (route, *args)"""
+        key = (route, *args)
+        with self.lock:
+            entry = self.entries.get(key)
+            age = time.monotonic() - entry[1] if entry else None
+            if entry and age < self.fresh_seconds:
+                self.entries.move_to_end(key)
+                self._count(route, "fresh")
+                return entry[0]
+
+            call = self.calls.get(key)
+            if call and entry and age < self.fresh_seconds + self.stale_seconds:
+                self._count(route, "stale")
+                return entry[0]
+
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+                invalidations = self.invalidations
+            self._count(route, "executed" if leader else "coalesced")
+
+        if leader:
+            self._execute(key, call, invalidations, operation_func, args)
+        else:
+            with timing.timed("db-coalesce"):
+                call.done.wait()
+
+        if call.error is not None:
+            if has_request_context() and isinstance(call.error, AdmissionRejected):
+                # Let the admission hook answer every coalesced caller with a 503
+                g.admission_rejected = call.error
+            fallback.note_failure(call.error)
+            raise call.error
+
+        return call.value
+
+    def _execute(self, key: tuple, call: _Call, invalidations: int, operation_func, args):
+        from app.core.dependencies import safe_db_operation
+
+        try:
+            call.value = safe_db_operation(operation_func, *args)
+        except Exception as e:
+            call.error = e
+        finally:
+            with self.lock:
+                del self.calls[key]
+                if call.error is not None:
+                    self._count(key[0], "failed")
+                elif invalidations == self.invalidations:
+                    # Results of a read that overlapped a content change are not kept
+                    self.entries[key] = (call.value, time.monotonic())
+                    self.entries.move_to_end(key)
+                    while len(self.entries) > self.max_entries:
+                        self.entries.popitem(last=False)
+
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "in_flight": len(self.calls),
+                "routes": {
+                    route: {outcome: counts[outcome] for outcome in self.OUTCOMES}
+                    for route, counts in self.counts.items()
+                }
+            }
+
+
+reads = SingleFlight(
+    fresh_seconds=settings.singleflight_fresh_seconds,
+    stale_seconds=settings.singleflight_stale_seconds,
+    max_entries=settings.singleflight_max_entries
+)
+changes.content_changed.connect(reads.clear)
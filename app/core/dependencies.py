@@ -1,24 +1,56 @@
-import jwt
 from sqlmodel import Session
-from app.storage.database import db_config, get_db, db_retry
-from passlib.context import CryptContext
-from jwt.exceptions import InvalidTokenError
+from app.storage.database import get_db, db_retry
 from flask import request, jsonify
 from functools import wraps
 from config import get_settings
 from app.crud.admin import get_admin
+from app.core.admission import db_slot
+from app.core.fallback import breaker, note_failure
+from app.storage import deletions  # registers the storage deletion outbox hooks
 
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
-engine = db_config.create_engine()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def request_ids(name: str) -> list[int]:
+    """
+    Distinct ids from a query parameter, repeated (?ids=1&ids=2) or comma
+    separated (?ids=1,2).
+
+    Raises:
+        ValueError: When an id is not an integer.
+    """
+    ids = []
+    for value in request.args.getlist(name):
+        ids.extend(int(part) for part in value.split(",") if part.strip())
+
+    return list(dict.fromkeys(ids))
 
 
-@db_retry()
 def safe_db_operation(operation_func, *args, **kwargs):
-    """Execute database operation with automatic retry"""
-    with get_db() as db:
+    """Execute database operation with admission control, circuit breaking and automatic retry"""
+    try:
+        with db_slot(), breaker.guard():
+            return _run_db_operation(operation_func, *args, **kwargs)
+    except Exception as e:
+        note_failure(e)
+        raise
+
+
+def shared_db_operation(operation_func, *args):
+    """
+    safe_db_operation for hot public reads: identical concurrent calls from
+    one route share a single execution and its recent result (see
+    cache.SingleFlight). The result is shared, so do not modify it.
+    """
+    from app.core.cache import reads
+
+    return reads.run(request.endpoint, operation_func, *args)
+
+
+@db_retry()
+def _run_db_operation(operation_func, *args, **kwargs):
+    with get_db(read_only=getattr(operation_func, "read_only", False)) as db:
         return operation_func(db, *args, **kwargs)
 
 
@@ -34,6 +66,8 @@ def verify_admin(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
+        import jwt  # deferred: only admin routes verify tokens
+
         token = None
         if "Authorization" in request.headers:
             auth_header = request.headers["Authorization"]
@@ -52,7 +86,7 @@ def verify_admin(f):
             username = payload.get("sub")
             if username is None:
                 return jsonify({"error": "Invalid token"}), 401
-        except InvalidTokenError:
+        except jwt.InvalidTokenError:
             return jsonify({"error": "Invalid token"}), 401
 
         if not safe_db_operation(get_admin, username=username):
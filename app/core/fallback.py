@@ -0,0 +1,303 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from flask import Flask, Response, g, has_request_context, jsonify, request
+from app.core.admission import ADMIN_BLUEPRINTS
+from app.storage.database import is_unavailable_error
+from config import get_settings
+
+settings = get_settings()
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a database that is known to be down."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("database circuit is open")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Stops calling the database after `threshold` consecutive operations
+    failed because it was unreachable.
+
+    While open, operations fail at once with `CircuitOpen` instead of
+    waiting on connects and retries. After `reset_seconds` one operation is
+    let through as a probe: success closes the circuit, failure opens it
+    again for another `reset_seconds`.
+    """
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+        self.rejected = 0
+
+    @property
+    def rejecting(self) -> bool:
+        """Whether the next operation would fail with `CircuitOpen`."""
+        with self.lock:
+            return self.opened_at is not None and (
+                self.probing or time.monotonic() < self.opened_at + self.reset_seconds
+            )
+
+    def before_call(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+
+            remaining = self.opened_at + self.reset_seconds - time.monotonic()
+            if remaining <= 0 and not self.probing:
+                self.probing = True
+                return
+
+            self.rejected += 1
+            raise CircuitOpen(max(1, int(remaining + 0.999)))
+
+    def after_call(self, error: Exception | None):
+        with self.lock:
+            self.probing = False
+            if error is None or not is_unavailable_error(error):
+                if self.opened_at is not None:
+                    logging.warning("Database reachable again, closing circuit")
+                self.failures, self.opened_at = 0, None
+            else:
+                self.failures += 1
+                if self.opened_at is not None or self.failures >= self.threshold:
+                    if self.opened_at is None:
+                        logging.warning(f"Database unreachable, opening circuit: {error}")
+                    self.opened_at = time.monotonic()
+
+    @contextmanager
+    def guard(self):
+        """Section calling the database, failing fast while the circuit is open."""
+        self.before_call()
+        try:
+            yield
+        except Exception as e:
+            self.after_call(e)
+            raise
+        self.after_call(None)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "open": self.opened_at is not None,
+                "consecutive_failures": self.failures,
+                "rejected": self.rejected
+            }
+
+
+breaker = CircuitBreaker(settings.circuit_failure_threshold, settings.circuit_reset_seconds)
+
+
+def note_failure(error: Exception):
+    """Remember that the current request failed for want of a database."""
+    if has_request_context() and (isinstance(error, CircuitOpen) or is_unavailable_error(error)):
+        g.db_unavailable = error
+
+
+@dataclass
+class _Entry:
+    body: bytes
+    mimetype: str
+    stored_at: float  # wall clock, comparable with the file's
+    persisted_at: float = 0.0
+
+
+class LastKnownGood:
+    """
+    Last successful body of each public GET, to answer with while the
+    database is down.
+
+    The most recently used `memory_entries` are kept in memory, always with
+    the latest body. They are also written to an SQLite file shared by the
+    workers of a host, at most every `touch_seconds` per key, which keeps
+    the `disk_entries` most recently stored ones and survives restarts.
+    """
+
+    def __init__(self, path: str, memory_entries: int, disk_entries: int, touch_seconds: float):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.touch_seconds = touch_seconds
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[str, _Entry] = OrderedDict()
+        self.disk_lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._conn_pid: int | None = None
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Called with the disk lock held; connections must not cross a fork
+        if self._conn is None or self._conn_pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=1, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, body BLOB NOT NULL, mimetype TEXT NOT NULL, "
+                "stored_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_responses_stored_at ON responses (stored_at)"
+            )
+            self._conn_pid = os.getpid()
+
+        return self._conn
+
+    def _remember(self, key: str, entry: _Entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.memory_entries:
+            self.entries.popitem(last=False)
+
+    def put(self, key: str, body: bytes, mimetype: str):
+        now = time.time()
+        with self.lock:
+            known = self.entries.get(key)
+            entry = _Entry(body, mimetype, now, known.persisted_at if known else 0.0)
+            self._remember(key, entry)
+            if not self.path or now - entry.persisted_at < self.touch_seconds:
+                return
+            entry.persisted_at = now
+
+        try:
+            with self.disk_lock:
+                conn = self._connection()
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO responses (key, body, mimetype, stored_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        (key, body, mimetype, now)
+                    )
+                    self._writes += 1
+                    if self._writes % 100 == 0:
+                        conn.execute(
+                            "DELETE FROM responses WHERE key NOT IN "
+                            "(SELECT key FROM responses ORDER BY stored_at DESC LIMIT ?)",
+                            (self.disk_entries,)
+                        )
+        except sqlite3.Error as e:
+            logging.warning(f"Could not save last known good response: {e}")
+
+    def get(self, key: str) -> _Entry | None:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry:
+                self.entries.move_to_end(key)
+                return entry
+        if not self.path:
+            return None
+
+        try:
+            with self.disk_lock:
+                row = self._connection().execute(
+                    "SELECT body, mimetype, stored_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logging.warning(f"Could not read last known good response: {e}")
+            return None
+        if not row:
+            return None
+
+        body, mimetype, stored_at = row
+        entry = _Entry(body, mimetype, stored_at, persisted_at=stored_at)
+        with self.lock:
+            self._remember(key, entry)
+        return entry
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"memory_entries": len(self.entries), "path": self.path or None}
+
+
+store = LastKnownGood(
+    settings.last_known_good_path,
+    memory_entries=settings.last_known_good_memory_entries,
+    disk_entries=settings.last_known_good_disk_entries,
+    touch_seconds=settings.last_known_good_touch_seconds
+)
+
+
+def _max_staleness() -> float:
+    """Oldest fallback the current route may serve, 0 when it has none."""
+    if request.method != "GET" or request.blueprint in ADMIN_BLUEPRINTS:
+        return 0
+
+    limits = settings.stale_if_error_max_age
+    return limits.get(request.endpoint, limits.get("default", 0))
+
+
+def _stale_response() -> Response | None:
+    max_age = _max_staleness()
+    entry = store.get(request.full_path) if max_age else None
+    if entry is None:
+        return None
+
+    age = max(0, int(time.time() - entry.stored_at))
+    if age > max_age:
+        return None
+
+    g.served_stale = True
+    response = Response(entry.body, mimetype=entry.mimetype)
+    response.headers["Age"] = str(age)
+    response.headers["Warning"] = '110 - "Response is Stale", 111 - "Revalidation Failed"'
+    return response
+
+
+def _serve_while_open():
+    # Don't even run the view while the database is known to be down
+    if breaker.rejecting:
+        return _stale_response()
+
+
+def _remember_or_fall_back(response: Response):
+    if g.get("served_stale"):
+        return response
+
+    failure = g.pop("db_unavailable", None)
+    if failure is not None and response.status_code >= 500:
+        stale = _stale_response()
+        if stale is not None:
+            return stale
+        if isinstance(failure, CircuitOpen):
+            unavailable = jsonify({"error": "Service unavailable, retry later"})
+            unavailable.status_code = 503
+            unavailable.headers["Retry-After"] = str(failure.retry_after)
+            return unavailable
+        return response
+
+    if (
+        response.status_code == 200
+        and response.mimetype == "application/json"
+        and not response.direct_passthrough
+        and _max_staleness()
+    ):
+        store.put(request.full_path, response.get_data(), response.mimetype)
+
+    return response
+
+
+def init_app(app: Flask):
+    """
+    Register the last-known-good hooks on the application, once its
+    blueprints are. Fails on `STALE_IF_ERROR_MAX_AGE` keys that name no
+    endpoint, which would otherwise silently fall back to the default.
+    """
+    endpoints = {rule.endpoint for rule in app.url_map.iter_rules()}
+    unknown = set(settings.stale_if_error_max_age) - endpoints - {"default"}
+    if unknown:
+        raise ValueError(f"Unknown endpoints in STALE_IF_ERROR_MAX_AGE: {', '.join(sorted(unknown))}")
+
+    app.before_request(_serve_while_open)
+    app.after_request(_remember_or_fall_back)
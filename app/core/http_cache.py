@@ -0,0 +1,123 @@
+from dataclasses import dataclass, field
+from typing import Callable
+from flask import Flask, Response, g, request
+from app.core import purge
+from app.storage import changes
+from config import get_settings
+
+settings = get_settings()
+
+
+def _listing(*types: str) -> Callable:
+    return lambda args, payload: [f"{entity_type}:*" for entity_type in types]
+
+
+def _item(entity_type: str, arg: str) -> Callable:
+    return lambda args, payload: [f"{entity_type}:{args[arg]}"]
+
+
+def _video_page(args, payload) -> list[str]:
+    related = payload()["related_videos"]
+    return [f"video:{args['video_id']}"] + [f"video:{video['id']}" for video in related]
+
+
+def _videos_by_id(args, payload) -> list[str]:
+    return [f"video:{video_id}" for video_id in payload()]
+
+
+def _update_page(args, payload) -> list[str]:
+    return [f"update:{args['update_id']}", f"event:{payload()['event']['id']}"]
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """
+    How long browsers (`max_age`) and shared caches (`s_maxage`) may keep
+    a response, and for how long after that a CDN may keep serving it while
+    it refetches. `keys(view_args, payload)` names the surrogate keys to tag
+    it with; `payload()` parses the response body.
+    """
+
+    max_age: int
+    s_maxage: int
+    stale_while_revalidate: int
+    keys: Callable = field(default=lambda args, payload: [])
+
+    @property
+    def cache_control(self) -> str:
+        return (
+            f"public, max-age={self.max_age}, s-maxage={self.s_maxage}, "
+            f"stale-while-revalidate={self.stale_while_revalidate}"
+        )
+
+
+def _content(keys: Callable) -> CachePolicy:
+    # Admin-edited content only: purged on change, so CDNs may keep it a while
+    return CachePolicy(30, 300, 600, keys)
+
+
+def _engagement(keys: Callable) -> CachePolicy:
+    # Likes, comments and views move with every visitor and are never purged,
+    # so this covers any payload embedding them
+    return CachePolicy(0, 5, 30, keys)
+
+
+POLICIES = {
+    "video.get_videos_by_ids": _engagement(_videos_by_id),
+    "video.get_ungrouped_videos": _engagement(_listing("video")),
+    "video.get_grouped_videos": _engagement(_listing("video")),
+    "video.fetch_recent_videos": _engagement(_listing("video")),
+    "video.fetch_trending_videos": _engagement(_listing("video")),
+    # Every hit counts a view, so it has to reach the app
+    "video.get_a_video": CachePolicy(0, 0, 0, _video_page),
+    "video.get_video_views": _engagement(_item("video", "video_id")),
+    "video.get_video_comments": _engagement(_item("video", "video_id")),
+    "video.get_video_likes": _engagement(_item("video", "video_id")),
+    "update.fetch_recent_updates": _engagement(_listing("update")),
+    "update.fetch_trending_updates": _engagement(_listing("update")),
+    "update.get_event_update": _engagement(_update_page),
+    "update.get_update_comments": _engagement(_item("update", "update_id")),
+    "update.get_update_likes": _engagement(_item("update", "update_id")),
+    "event.list_events": _engagement(_listing("event")),
+    "event.get_event_updates": _engagement(_item("event", "event_id")),
+    "event.get_an_event": _engagement(_item("event", "event_id")),
+    "event.get_event_comments": _engagement(_item("event", "event_id")),
+    "event.get_event_likes": _engagement(_item("event", "event_id")),
+    "category.fetch_all_video_categories": CachePolicy(3600, 86400, 86400, _listing("category")),
+    "search.search_content": _content(_listing("video", "event", "update")),
+    "counts.get_counts": _engagement(_listing()),
+    "feed.get_home": _engagement(_listing("video", "event", "update")),
+}
+
+
+def _apply_policy(response: Response):
+    if request.method not in ("GET", "HEAD") or "Cache-Control" in response.headers:
+        return response
+
+    if g.get("served_stale"):
+        # A fallback from the last-known-good store must not be cached onwards
+        response.headers["Cache-Control"] = "no-store"
+        return response
+
+    policy = POLICIES.get(request.endpoint)
+    if policy is None or response.status_code not in (200, 304):
+        return response
+
+    response.headers["Cache-Control"] = policy.cache_control
+    try:
+        keys = policy.keys(request.view_args or {}, response.get_json)
+    except (KeyError, TypeError, ValueError):
+        # 304s carry no body to take item keys from
+        keys = []
+    if keys:
+        header = settings.surrogate_key_header
+        separator = "," if header.lower() == "cache-tag" else " "
+        response.headers[header] = separator.join(dict.fromkeys(keys))
+
+    return response
+
+
+def init_app(app: Flask):
+    """Register the caching headers hook and purge CDNs on content changes."""
+    app.after_request(_apply_policy)
+    changes.content_changed.connect(purge.on_content_changed)
@@ -0,0 +1,121 @@
+import io
+import os
+import threading
+
+from app.core import background
+from app.core.utils import key_from_url, file_url
+from app.storage.backends import get_storage
+from config import get_settings
+
+settings = get_settings()
+
+# Output format name -> (Pillow encoder, content type, file extension)
+VARIANT_FORMATS = {
+    "webp": ("WEBP", "image/webp", "webp"),
+    "jpeg": ("JPEG", "image/jpeg", "jpg"),
+}
+
+_pool = None  # ProcessPoolExecutor, started on first use
+_pool_pid: int | None = None
+_pool_lock = threading.Lock()
+
+
+def render_variants(data: bytes, widths: list[int]) -> list[tuple[str, int, bytes]]:
+    """
+    Resize an image to each width narrower than the original and encode it
+    in every variant format. Runs in the image process pool.
+
+    Only pixel data is written back, so EXIF, GPS and ICC metadata are
+    stripped; orientation is applied to the pixels first.
+
+    Returns:
+        list[tuple[str, int, bytes]]: (format, width, encoded bytes).
+    """
+    # Pillow is imported here, in the pool process, never on worker boot
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original).convert("RGB")
+
+    targets = sorted(w for w in widths if w < image.width) or [image.width]
+    variants = []
+    for width in targets:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize(
+            (width, height), Image.Resampling.LANCZOS
+        )
+        for name, (encoder, _, _) in VARIANT_FORMATS.items():
+            out = io.BytesIO()
+            resized.save(out, encoder, quality=80, optimize=True)
+            variants.append((name, width, out.getvalue()))
+
+    return variants
+
+
+def _get_pool():
+    global _pool, _pool_pid
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            # spawn: never fork a process that is running request threads
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.image_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _pool_pid = os.getpid()
+
+        return _pool
+
+
+def variant_key(key: str, name: str, width: int) -> str:
+    """Key of a variant, stored next to the original."""
+    stem = key.rsplit(".", 1)[0] if "." in key.rsplit("/", 1)[-1] else key
+    return f"{stem}.w{width}.{VARIANT_FORMATS[name][2]}"
+
+
+def build_variants(key: str, data: bytes) -> dict[str, dict[str, bytes]]:
+    """Render variants of `data` off-process, keyed by their storage key."""
+    rendered = _get_pool().submit(
+        render_variants, data, settings.image_variant_widths
+    ).result()
+
+    return {
+        variant_key(key, name, width): (name, width, body)
+        for name, width, body in rendered
+    }
+
+
+def process_image(target: str, target_id: int, url: str):
+    """Background job: render, upload and record the variants of one image."""
+    from app.core.dependencies import safe_db_operation
+    from app.crud.admin import record_image_variants, find_image_variants
+    from app.storage.models import schedule_deletion
+
+    # Deduplicated images share their variants with earlier uploads
+    existing = safe_db_operation(find_image_variants, url)
+    if existing:
+        safe_db_operation(record_image_variants, target, target_id, url, existing)
+        return
+
+    storage = get_storage()
+    key = key_from_url(url)
+    variants = build_variants(key, storage.get_object_bytes(key))
+
+    urls = {}
+    for vkey, (name, width, body) in variants.items():
+        storage.put_object(vkey, body, VARIANT_FORMATS[name][1])
+        urls.setdefault(name, {})[str(width)] = file_url(vkey)
+
+    if not safe_db_operation(record_image_variants, target, target_id, url, urls):
+        # The image was replaced or its owner deleted while we worked. Other
+        # rows may share content-addressed variants, so they go through the
+        # outbox, which keeps them while their original is referenced
+        safe_db_operation(schedule_deletion, urls)
+
+
+def schedule_variants(target: str, target_id: int, url: str | None):
+    """Queue variant generation for an image; call after the row commits."""
+    if url:
+        background.submit(process_image, target, target_id, url)
@@ -0,0 +1,124 @@
+import json
+import time
+import logging
+import threading
+import urllib.request
+
+from abc import ABC, abstractmethod
+from collections import deque
+from functools import lru_cache
+from sqlmodel import Session, select
+from app.core import background
+from app.storage.models import LiveUpdate
+from config import get_settings
+
+settings = get_settings()
+
+
+class Purger(ABC):
+    """Invalidates CDN copies of responses by surrogate key."""
+
+    name = "base"
+
+    @abstractmethod
+    def purge(self, keys: list[str]):
+        ...
+
+    def stats(self) -> dict:
+        return {"name": self.name}
+
+
+class LocalPurger(Purger):
+    """
+    Remembers the last `history` purges instead of calling a CDN; stands in
+    for one in development and tests.
+    """
+
+    name = "local"
+
+    def __init__(self, history: int = 1000):
+        self.lock = threading.Lock()
+        self.purges: deque[tuple[float, tuple[str, ...]]] = deque(maxlen=history)
+
+    def purge(self, keys: list[str]):
+        with self.lock:
+            self.purges.append((time.time(), tuple(keys)))
+
+    def purged_keys(self) -> set[str]:
+        with self.lock:
+            return {key for _, keys in self.purges for key in keys}
+
+    def stats(self) -> dict:
+        with self.lock:
+            recent = [{"at": at, "keys": list(keys)} for at, keys in list(self.purges)[-20:]]
+        return {"name": self.name, "recent": recent}
+
+
+class CloudflarePurger(Purger):
+    """Purge by cache tag through the Cloudflare zone API."""
+
+    name = "cloudflare"
+    TAGS_PER_CALL = 30
+
+    def __init__(self, zone_id: str, api_token: str):
+        self.url = f"https://api.cloudflare.com/client/v4/zones/{zone_id}/purge_cache"
+        self.api_token = api_token
+
+    def purge(self, keys: list[str]):
+        for start in range(0, len(keys), self.TAGS_PER_CALL):
+            call = urllib.request.Request(
+                self.url,
+                data=json.dumps({"tags": keys[start:start + self.TAGS_PER_CALL]}).encode(),
+                headers={
+                    "Authorization": f"Bearer {self.api_token}",
+                    "Content-Type": "application/json"
+                },
+                method="POST"
+            )
+            with urllib.request.urlopen(call, timeout=10) as response:
+                result = json.load(response)
+            if not result.get("success"):
+                raise RuntimeError(f"Cloudflare purge failed: {result.get('errors')}")
+
+
+@lru_cache
+def get_purger() -> Purger:
+    """The configured purger (`CDN_PURGER`: local or cloudflare)."""
+    if settings.cdn_purger == "local":
+        return LocalPurger()
+    if settings.cdn_purger == "cloudflare":
+        return CloudflarePurger(settings.cloudflare_zone_id, settings.cloudflare_api_token)
+
+    raise ValueError(f"Unknown CDN purger: {settings.cdn_purger}")
+
+
+def purge_keys(db: Session, entity_type: str, ids) -> list[str]:
+    """
+    Surrogate keys to purge after items changed: the items, the listings of
+    their type, and whatever embeds them (updates embed their event, events
+    list their updates).
+    """
+    keys = [f"{entity_type}:{item_id}" for item_id in sorted(ids)] + [f"{entity_type}:*"]
+    if entity_type == "event":
+        keys.append("update:*")
+    if entity_type == "update":
+        event_ids = db.exec(
+            select(LiveUpdate.event_id).where(LiveUpdate.id.in_(ids)).distinct()
+        ).all()
+        keys += [f"event:{event_id}" for event_id in sorted(event_ids)]
+
+    return keys
+
+
+def purge_changes(entity_type: str, ids):
+    from app.core.dependencies import safe_db_operation
+
+    keys = safe_db_operation(purge_keys, entity_type, ids)
+    try:
+        get_purger().purge(keys)
+    except Exception as e:
+        logging.warning(f"CDN purge of {len(keys)} keys failed: {e}")
+
+
+def on_content_changed(entity_type: str, ids=()):
+    background.submit(purge_changes, entity_type, set(ids))
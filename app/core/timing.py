@@ -0,0 +1,136 @@
+import json
+import time
+import logging
+
+from contextlib import contextmanager
+from flask import Flask, Response, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config import get_settings
+
+settings = get_settings()
+
+logger = logging.getLogger("blacctheddi.timing")
+
+# Phases in the order they are reported
+PHASES = (
+    ("db-queue", "waiting for a database slot"),
+    ("db-coalesce", "waiting on an identical read"),
+    ("db-engine", "engine creation"),
+    ("db-probe", "connect and SELECT 1"),
+    ("db", "statements"),
+    ("db-retry", "sleeping between retries"),
+    ("validate", "pydantic validation"),
+    ("serialize", "model dumps and JSON encoding"),
+    ("r2", "object storage calls"),
+)
+
+
+def record(phase: str, seconds: float):
+    """Add time spent on `phase` to the current request, if there is one."""
+    if not has_request_context():
+        return
+
+    timings = g.setdefault("timings", {})
+    total, count = timings.get(phase, (0.0, 0))
+    timings[phase] = (total + seconds, count + 1)
+
+
+@contextmanager
+def timed(phase: str):
+    """
+    Time a block as `phase` of the current request. Nested blocks of the
+    same phase only count once; different phases may overlap (statements
+    run while validating lazy relationships count as both).
+    """
+    if not has_request_context():
+        yield
+        return
+
+    active = g.setdefault("timing_active", set())
+    if phase in active:
+        yield
+        return
+
+    active.add(phase)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        active.discard(phase)
+        record(phase, time.perf_counter() - started)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and has_request_context():
+        context._timing_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_timing_started", None)
+    if started is not None:
+        record("db", time.perf_counter() - started)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, with encoding timed per request."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        with timed("serialize"):
+            return super().dumps(obj, **kwargs)
+
+
+def _start():
+    g.timing_started = time.perf_counter()
+
+
+def _report(response: Response):
+    started = g.pop("timing_started", None)
+    if started is None:
+        return response
+
+    total = time.perf_counter() - started
+    timings = g.pop("timings", {})
+    metrics = [
+        f'{phase};dur={timings[phase][0] * 1000:.1f};desc="{description} x{timings[phase][1]}"'
+        for phase, description in PHASES if phase in timings
+    ]
+    metrics.append(f"total;dur={total * 1000:.1f}")
+    response.headers["Server-Timing"] = ", ".join(metrics)
+
+    if settings.server_timing_log:
+        logger.info(json.dumps({
+            "event": "request_timing",
+            "method": request.method,
+            "path": request.path,
+            "endpoint": request.endpoint,
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 1),
+            "phases": {
+                phase: {"ms": round(seconds * 1000, 1), "count": count}
+                for phase, (seconds, count) in timings.items()
+            }
+        }))
+
+    return response
+
+
+def init_app(app: Flask):
+    """
+    Time every request and report its phases in a Server-Timing header and
+    one JSON log line. Register before the other hooks so the total covers
+    them.
+    """
+    app.json = TimedJSONProvider(app)
+    app.before_request(_start)
+    app.after_request(_report)
+
+    if settings.server_timing_log and not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
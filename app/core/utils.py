@@ -1,31 +1,45 @@
-import jwt
-import boto3
+import hashlib
+import logging
 
-from botocore.client import Config
 from uuid import uuid4
-from passlib.context import CryptContext
+from tempfile import SpooledTemporaryFile
+from functools import lru_cache
+from urllib.parse import urlparse
 from config import get_settings
 from datetime import timedelta, timezone, datetime
-from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
 from flask import abort
+from app.storage.backends import get_storage
 
 ALGORITHM = "HS256"
+MAX_PART_NUMBER = 10000  # S3 multipart upload limit
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024  # larger uploads spill to disk
 settings = get_settings()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+# passlib, bcrypt and PyJWT are only needed by the auth and admin routes, so
+# they are imported on first use rather than on worker boot
+@lru_cache
+def _pwd_context():
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed one."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return _pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password using bcrypt."""
-    return pwd_context.hash(password)
+    return _pwd_context().hash(password)
 
 
 def create_token(data: dict, expires_delta: timedelta | None = None) -> str:
     """Create a JWT token with optional expiry."""
+    import jwt
+
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (
         expires_delta if expires_delta else timedelta(minutes=15)
@@ -36,54 +50,138 @@ def create_token(data: dict, expires_delta: timedelta | None = None) -> str:
 
 
 # File Upload Setup
-r2_client = boto3.client(
-    "s3",
-    endpoint_url=settings.r2_endpoint_url_s3,
-    aws_access_key_id=settings.r2_access_key_id,
-    aws_secret_access_key=settings.r2_secret_access_key,
-    config=Config(signature_version="s3v4")
-)
-
-
-def store_file(file: FileStorage, file_type: str = "videos") -> str:
+def spool_and_hash(stream, chunk_size: int = 1024 * 1024) -> tuple:
     """
-    Upload a file to R2 storage and return its public URL.
-
-    Args:
-        file (FileStorage): File uploaded from Flask request.
-        file_type (str): Folder prefix in R2 bucket.
+    Copy an upload stream into a spooled temp file while hashing it.
 
     Returns:
-        str: Publicly accessible file URL.
+        tuple: (spooled file rewound to the start, sha256 hex digest, size).
     """
-    try:
-        # Generate unique key with folder prefix
-        key = f"{file_type}/{uuid4()}_{file.filename}"
+    digest = hashlib.sha256()
+    size = 0
+    spool = SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    while chunk := stream.read(chunk_size):
+        digest.update(chunk)
+        size += len(chunk)
+        spool.write(chunk)
 
-        # Upload to R2
-        r2_client.upload_fileobj(
-            Fileobj=file.stream,
-            Bucket=settings.r2_bucket_name,
-            Key=key,
-            ExtraArgs={"ContentType": file.mimetype}
-        )
+    spool.seek(0)
+    return spool, digest.hexdigest(), size
 
-        return f"{settings.r2_public_url}/{key}"
 
+def upload_stream(fileobj, key: str, content_type: str):
+    """
+    Upload a file object to media storage under `key`.
+
+    Aborts the request with a 500 when the upload fails.
+    """
+    try:
+        get_storage().upload_fileobj(fileobj, key, content_type)
     except Exception as e:
+        logging.warning(f"Storage upload failed for {key}: {e}")
         abort(500, description=f"Upload failed")
 
 
-def delete_file(file_url: str):
+def media_urls(value) -> list[str]:
+    """Flatten a URL or a nested mapping of image variant URLs into a list."""
+    if not value:
+        return []
+
+    if isinstance(value, str):
+        return [value]
+
+    urls = []
+    for item in value.values():
+        urls.extend(media_urls(item))
+
+    return urls
+
+
+def key_from_url(file_url: str) -> str:
+    """Object key for a public file URL."""
+    base_url = get_storage().base_url.rstrip("/")
+    if base_url and file_url.startswith(f"{base_url}/"):
+        return file_url[len(base_url) + 1:]
+
+    return urlparse(file_url).path.lstrip("/")
+
+
+def delete_file(file_url: str) -> bool:
     """
-    Delete a file from R2 storage given its public URL.
+    Delete a file from media storage given its public URL.
 
     Args:
         file_url (str): Publicly accessible file URL.
+
+    Returns:
+        bool: Whether the delete call succeeded. Failures are logged, the
+        orphaned object is picked up later by the storage sweeper.
     """
     try:
-        base_url = settings.r2_public_url.rstrip("/")
-        old_key = file_url.split(f"{base_url}/")[-1]
-        r2_client.delete_object(Bucket=settings.r2_bucket_name, Key=old_key)
-    except Exception:
-        pass  # Continue even if deletion fails
+        get_storage().delete_object(key_from_url(file_url))
+        return True
+    except Exception as e:
+        logging.warning(f"Storage delete failed for {file_url}: {e}")
+        return False
+
+
+def file_url(key: str) -> str:
+    """Public URL for an object key."""
+    return get_storage().public_url(key)
+
+
+def presign_image_upload(
+    filename: str,
+    content_type: str,
+    size: int,
+    method: str = "PUT"
+) -> dict:
+    """
+    Issue a presigned upload so the client sends an image straight to storage.
+
+    PUT signs the content type and length into the URL; POST returns a form
+    policy that enforces them with `content-length-range` conditions.
+
+    Args:
+        filename (str): Original file name, used as the key suffix.
+        content_type (str): MIME type the client will send.
+        size (int): Exact size in bytes the client will send.
+        method (str): "PUT" or "POST".
+
+    Returns:
+        dict: Key, method, URL, and the headers or form fields to send.
+    """
+    key = f"images/{uuid4()}_{secure_filename(filename) or 'image'}"
+    expires_in = settings.presign_expires_in
+
+    if method == "POST":
+        post = get_storage().presign_post(key, content_type, settings.image_upload_max_bytes, expires_in)
+        return {
+            "key": key,
+            "method": "POST",
+            "url": post["url"],
+            "fields": post["fields"],
+            "expires_in": expires_in
+        }
+
+    return {
+        "key": key,
+        "method": "PUT",
+        "url": get_storage().presign_put(key, content_type, size, expires_in),
+        "headers": {"Content-Type": content_type},
+        "expires_in": expires_in
+    }
+
+
+def presign_video_parts(key: str, upload_id: str, part_numbers: list[int]) -> dict[int, str]:
+    """
+    Presign `upload_part` for several parts of a multipart upload at once.
+
+    Signing is local, so a batch costs one HTTP round trip for the client
+    instead of one per part.
+    """
+    storage = get_storage()
+    return {
+        part_number: storage.presign_part(key, upload_id, part_number)
+        for part_number in part_numbers
+    }
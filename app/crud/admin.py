@@ -1,25 +1,36 @@
-import boto3
-
 from app.schemas.event import EventPublic, EventUpdate
 from app.schemas.update import LiveUpdatePublic, LiveUpdateUpdate
 from app.schemas.video import VideoPublic
-from sqlmodel import Session, select
-from app.storage.models import Admin, Event, LiveUpdate, Video, Category, VideoCategoryLink
+from sqlmodel import Session, select, func, delete
+from app.storage.models import (
+    Admin,
+    Event,
+    LiveUpdate,
+    Video,
+    Category,
+    VideoCategoryLink,
+    UploadSession,
+    ImageUpload,
+    UniqueViewSketch,
+    schedule_deletion
+)
+from app.schemas.upload import UploadSessionPublic
+from datetime import datetime, timedelta, timezone
 from app.schemas.event import EventCreate
 from app.schemas.update import LiveUpdateCreate
 from werkzeug.datastructures import FileStorage
 from app.schemas.common import StatusJSON
-from app.schemas.admin import Analytics
-from app.core.utils import store_file, delete_file
+from app.schemas.admin import Analytics, Trend
+from app.storage.dedup import store_file, content_digest
+from app.core.utils import key_from_url, file_url
+from app.core.images import schedule_variants
+from app.storage.database import run_after_commit, read_only
+from app.storage import cascade, changes, rollups, viewcounts
+from app.storage import snapshots  # publishes catalogue snapshots after content changes
+from app.core import background
 from config import get_settings
 
 settings = get_settings()
-r2_client = boto3.client(
-    "s3",
-    endpoint_url=settings.r2_endpoint_url_s3,
-    aws_access_key_id=settings.r2_access_key_id,
-    aws_secret_access_key=settings.r2_secret_access_key
-)
 
 
 def get_admin(db: Session, username: str) -> bool:
@@ -45,7 +56,7 @@ def create_event(
     event_data: EventCreate,
     image_file: FileStorage
 ) -> dict:
-    image_url = store_file(image_file, 'images') if image_file else None
+    image_url = store_file(db, image_file, 'images') if image_file else None
     event = Event(
         **event_data.model_dump(),
         image_url=image_url
@@ -55,6 +66,9 @@ def create_event(
     db.flush()
     db.refresh(event)
 
+    run_after_commit(db, schedule_variants, 'event', event.id, image_url)
+    changes.mark_changed(db, 'event', [event.id])
+
     return EventPublic.model_validate(event).model_dump()
 
 
@@ -63,8 +77,11 @@ def add_update(
     event_id: int,
     update_data: LiveUpdateCreate,
     image_file: FileStorage
-) -> dict:
-    image_url = store_file(image_file, 'images') if image_file else None
+) -> dict | None:
+    if not cascade.open_event(db, event_id):
+        return None
+
+    image_url = store_file(db, image_file, 'images') if image_file else None
     update = LiveUpdate(
         **update_data.model_dump(),
         event_id=event_id,
@@ -75,6 +92,9 @@ def add_update(
     db.flush()
     db.refresh(update)
 
+    run_after_commit(db, schedule_variants, 'update', update.id, image_url)
+    changes.mark_changed(db, 'update', [update.id])
+
     return LiveUpdatePublic.model_validate(update).model_dump()
 
 
@@ -83,7 +103,7 @@ def upload_files(
     video_data: dict,
     thumbnail: FileStorage,
 ) -> dict:
-    thumbnail_url = store_file(thumbnail, 'images') if thumbnail else None
+    thumbnail_url = store_file(db, thumbnail, 'images') if thumbnail else None
     video = Video(
         title=video_data['title'],
         description=video_data['description'],
@@ -102,23 +122,281 @@ def upload_files(
     db.flush()
     db.refresh(video)
 
+    close_upload_session(db, video_data['key'], 'completed')
+    run_after_commit(db, schedule_variants, 'video', video.id, thumbnail_url)
+    changes.mark_changed(db, 'video', [video.id])
+
     return VideoPublic.model_validate(video).model_dump()
 
 
+def create_upload_session(
+    db: Session,
+    key: str,
+    upload_id: str,
+    content_type: str,
+    parts_expected: int | None
+) -> dict:
+    session = UploadSession(
+        key=key,
+        upload_id=upload_id,
+        content_type=content_type,
+        parts_expected=parts_expected
+    )
+
+    db.add(session)
+    db.flush()
+    db.refresh(session)
+
+    return UploadSessionPublic.model_validate(session).model_dump()
+
+
+def get_upload_session(db: Session, key: str, upload_id: str) -> dict | None:
+    """Return the in-progress upload session matching key and upload id"""
+    session = db.exec(
+        select(UploadSession).where(UploadSession.key == key)
+    ).first()
+    if not session or session.upload_id != upload_id or session.status != 'uploading':
+        return None
+
+    return UploadSessionPublic.model_validate(session).model_dump()
+
+
+def record_uploaded_parts(db: Session, key: str, parts_received: int) -> dict | None:
+    session = db.exec(
+        select(UploadSession).where(UploadSession.key == key)
+    ).first()
+    if not session:
+        return None
+
+    session.parts_received = parts_received
+    session.updated_at = datetime.now(timezone.utc)
+    db.add(session)
+    db.flush()
+    db.refresh(session)
+
+    return UploadSessionPublic.model_validate(session).model_dump()
+
+
+def close_upload_session(db: Session, key: str, status: str):
+    session = db.exec(
+        select(UploadSession).where(UploadSession.key == key)
+    ).first()
+    if session:
+        session.status = status
+        session.updated_at = datetime.now(timezone.utc)
+        db.add(session)
+
+
+# How long a presigned image upload may wait to be finalized
+ISSUED_UPLOAD_TTL = timedelta(days=1)
+
+# Image and variants fields of each image owner, with its public schema
+IMAGE_TARGETS = {
+    "event": (Event, "image_url", "image_variants", EventPublic),
+    "update": (LiveUpdate, "image_url", "image_variants", LiveUpdatePublic),
+    "video": (Video, "thumbnail_url", "thumbnail_variants", VideoPublic),
+}
+
+
+def replace_image(
+    db: Session,
+    target: str,
+    item,
+    image_url: str | None,
+    referenced: bool = False
+):
+    """
+    Swap an owner's image, queueing the old one and its variants for
+    deletion. `referenced` tells that the caller took a reference on
+    `image_url` (through `store_file`).
+    """
+    _, field, variants_field, _ = IMAGE_TARGETS[target]
+    if getattr(item, field) == image_url:
+        if referenced:
+            # Same content uploaded again: give back the reference just taken
+            schedule_deletion(db, image_url)
+        return
+
+    schedule_deletion(db, getattr(item, field))
+    schedule_deletion(db, getattr(item, variants_field))
+    setattr(item, field, image_url)
+    setattr(item, variants_field, None)
+    run_after_commit(db, schedule_variants, target, item.id, image_url)
+
+
+def attach_image(
+    db: Session,
+    target: str,
+    target_id: int,
+    image_url: str
+) -> dict | None:
+    """
+    Point an event, live update or video at an already uploaded image.
+
+    Content-addressed keys are shared through reference counts that only
+    `store_file` takes, so they can't be attached this way.
+    """
+    if content_digest(key_from_url(image_url)):
+        raise ValueError(f"Content-addressed image can't be attached: {image_url}")
+
+    model, _, _, schema = IMAGE_TARGETS[target]
+    item = db.get(model, target_id)
+    if not item:
+        return None
+
+    replace_image(db, target, item, image_url)
+    db.add(item)
+    changes.mark_changed(db, target, [target_id])
+    db.flush()
+    db.refresh(item)
+
+    return schema.model_validate(item).model_dump()
+
+
+def record_image_upload(db: Session, key: str, content_type: str, size: int):
+    """Remember a presigned image upload so only it can be finalized"""
+    # Uploads never finalized are swept from storage long before this
+    db.exec(delete(ImageUpload).where(
+        ImageUpload.created_at < datetime.now(timezone.utc) - ISSUED_UPLOAD_TTL
+    ))
+    db.add(ImageUpload(key=key, content_type=content_type, size=size))
+
+
+def image_upload_issued(db: Session, key: str) -> bool:
+    return db.exec(
+        select(ImageUpload.id).where(ImageUpload.key == key)
+    ).first() is not None
+
+
+def finalize_image_upload(
+    db: Session,
+    key: str,
+    target: str,
+    target_id: int
+) -> dict | None:
+    """Attach a presigned upload to its owner, consuming its record"""
+    result = attach_image(db, target, target_id, file_url(key))
+    if result is None:
+        return None
+
+    # Both attach and claim roll back if another request finalized it first
+    if db.exec(delete(ImageUpload).where(ImageUpload.key == key)).rowcount != 1:
+        raise ValueError(f"Image upload already finalized: {key}")
+
+    return result
+
+
+def record_image_variants(
+    db: Session,
+    target: str,
+    target_id: int,
+    source_url: str,
+    variants: dict
+) -> bool:
+    """Store generated variants unless the owner's image changed meanwhile"""
+    model, field, variants_field, _ = IMAGE_TARGETS[target]
+    item = db.get(model, target_id)
+    if not item or getattr(item, field) != source_url:
+        return False
+
+    setattr(item, variants_field, variants)
+    db.add(item)
+    changes.mark_changed(db, target, [target_id])
+    return True
+
+
+def find_image_variants(db: Session, image_url: str) -> dict | None:
+    """Variants already generated for an image shared by another row"""
+    for model, field, variants_field, _ in IMAGE_TARGETS.values():
+        variants = db.exec(
+            select(getattr(model, variants_field)).where(
+                getattr(model, field) == image_url,
+                getattr(model, variants_field).is_not(None)
+            )
+        ).first()
+        if variants:
+            return variants
+
+    return None
+
+
+def get_images_without_variants(db: Session) -> list[tuple[str, int, str]]:
+    """(target, id, image url) of every image that has no variants yet"""
+    missing = []
+    for target, (model, field, variants_field, _) in IMAGE_TARGETS.items():
+        rows = db.exec(
+            select(model.id, getattr(model, field)).where(
+                getattr(model, field).is_not(None),
+                getattr(model, variants_field).is_(None)
+            )
+        ).all()
+        missing.extend((target, row_id, url) for row_id, url in rows)
+
+    return missing
+
+
+@read_only
 def get_analytics(db: Session) -> Analytics:
-    videos =  db.exec(select(Video)).all()
+    total_views, total_videos = db.exec(
+        select(func.coalesce(func.sum(Video.views), 0), func.count(Video.id))
+    ).one()
+    # Sum of each video's distinct viewers, as last estimated on flush
+    unique_views = db.exec(
+        select(func.coalesce(func.sum(UniqueViewSketch.estimate), 0))
+        .where(UniqueViewSketch.period == viewcounts.ALL_TIME)
+    ).one()
     return Analytics(
-        total_views=sum(v.views for v in videos),
-        total_updates=len(db.exec(select(LiveUpdate)).all()),
-        total_videos=len(videos)
+        total_views=total_views,
+        unique_views=unique_views,
+        total_updates=db.exec(select(func.count(LiveUpdate.id))).one(),
+        total_videos=total_videos
+    )
+
+
+@read_only
+def get_trend(
+    db: Session,
+    metric: str,
+    entity_type: str,
+    start: datetime,
+    end: datetime,
+    granularity: str = "day",
+    group_by: str | None = None
+) -> Trend:
+    buckets, series = rollups.get_trend(db, metric, entity_type, start, end, granularity, group_by)
+    return Trend(
+        metric=metric,
+        entity_type=entity_type,
+        granularity=granularity,
+        group_by=group_by,
+        buckets=buckets,
+        series=series
     )
 
 
 def delete_event(db: Session, event_id: int) -> StatusJSON:
-    event = db.get(Event, event_id)
-    if event:
-        db.delete(event)
+    """
+    Delete an event with its updates, comments and likes.
+
+    Large events are hidden right away and purged in chunks by a background
+    job; the rest are deleted with set-based statements in this transaction.
+    """
+    event = db.get(Event, event_id, with_for_update=True)
+    if not event:
+        return StatusJSON(status='ok')
+
+    # Already being purged: a second job would race the first over the chunks
+    if event.status == cascade.DELETING:
+        return StatusJSON(status=cascade.DELETING)
 
+    if cascade.count_event_rows(db, event_id) > settings.cascade_delete_background_rows:
+        event.status = cascade.DELETING
+        db.add(event)
+        changes.mark_changed(db, 'event', [event_id])
+        run_after_commit(db, background.submit, cascade.purge_event_job, event_id)
+        return StatusJSON(status=cascade.DELETING)
+
+    cascade.purge_event(db, event_id)
     return StatusJSON(status='ok')
 
 def update_event(
@@ -129,7 +407,7 @@ def update_event(
 ) -> dict | None:
     """Update an existing event"""
     event = db.get(Event, event_id)
-    if not event:
+    if not event or event.status == cascade.DELETING:
         return None
 
     # Update only provided fields
@@ -139,14 +417,12 @@ def update_event(
 
     # Handle image upload if provided
     if image_file:
-        if event.image_url:
-            delete_file(event.image_url)
-
-        event.image_url = store_file(image_file, 'images')
+        replace_image(db, 'event', event, store_file(db, image_file, 'images'), referenced=True)
 
     db.add(event)
     db.flush()
     db.refresh(event)
+    changes.mark_changed(db, 'event', [event.id])
 
     return EventPublic.model_validate(event).model_dump()
 
@@ -159,7 +435,7 @@ def update_live_update(
 ) -> dict | None:
     """Update an existing live update"""
     live_update = db.get(LiveUpdate, update_id)
-    if not live_update:
+    if not live_update or not cascade.open_event(db, live_update.event_id):
         return None
 
     # Update only provided fields
@@ -169,46 +445,33 @@ def update_live_update(
 
     # Handle image upload if provided
     if image_file:
-        if live_update.image_url:
-            delete_file(live_update.image_url)
-
-        live_update.image_url = store_file(image_file, 'images')
+        replace_image(db, 'update', live_update, store_file(db, image_file, 'images'), referenced=True)
 
     db.add(live_update)
     db.flush()
     db.refresh(live_update)
+    changes.mark_changed(db, 'update', [live_update.id])
 
     return LiveUpdatePublic.model_validate(live_update).model_dump()
 
 
 def delete_live_update(db: Session, update_id: int) -> StatusJSON | None:
-    """Delete a live update and its associated image"""
+    """Delete a live update; its image is queued for deletion on commit"""
     live_update = db.get(LiveUpdate, update_id)
     if not live_update:
         return None
 
-    # Delete associated image from R2 if it exists
-    if live_update.image_url:
-        delete_file(live_update.image_url)
-
-    db.delete(live_update)
+    # Gone from its event's detail too, and can't be traced back afterwards
+    changes.mark_changed(db, 'event', [live_update.event_id])
+    cascade.purge_update(db, live_update)
     return StatusJSON(status='ok')
 
 
 def delete_video(db: Session, video_id: int) -> StatusJSON | None:
-    """Delete a video and its associated files from R2"""
+    """Delete a video; its files are queued for deletion on commit"""
     video = db.get(Video, video_id)
     if not video:
         return None
 
-    # Delete video file from R2
-    if video.url:
-        delete_file(video.url)
-
-    # Delete thumbnail from R2 if it exists
-    if video.thumbnail_url:
-        delete_file(video.thumbnail_url)
-
-    # Delete video from database (cascade will handle VideoCategoryLink)
-    db.delete(video)
+    cascade.purge_video(db, video)
     return StatusJSON(status='ok')
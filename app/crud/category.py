@@ -1,8 +1,10 @@
 from sqlmodel import select, Session
 from app.storage.models import Category
 from app.schemas.category import CategoryPublic
+from app.storage.database import read_only
 
 
+@read_only
 def get_all_categories(db: Session) -> list[CategoryPublic]:
     categories = db.exec(select(Category)).all()
     return [
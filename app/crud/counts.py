@@ -0,0 +1,80 @@
+from sqlalchemy import and_, literal, union_all
+from sqlmodel import Session, select, func
+from app.storage.models import Video, Event, LiveUpdate, Comment, Like, UniqueViewSketch
+from app.storage.cascade import DELETING
+from app.storage.database import read_only
+from app.storage import viewcounts
+
+# Entity type -> (model, column of likes and comments pointing at it)
+TARGETS = {
+    "videos": (Video, "video_id"),
+    "events": (Event, "event_id"),
+    "updates": (LiveUpdate, "update_id"),
+}
+
+
+def _engagement_counts(target: str, ids: list[int]):
+    """Likes and comments per item, grouped in one pass over both tables"""
+    column = TARGETS[target][1]
+    rows = union_all(
+        select(getattr(Like, column).label("item_id"), literal(1).label("likes"), literal(0).label("comments"))
+        .where(getattr(Like, column).in_(ids)),
+        select(getattr(Comment, column), literal(0), literal(1))
+        .where(getattr(Comment, column).in_(ids))
+    ).subquery()
+
+    return (
+        select(
+            rows.c.item_id,
+            func.sum(rows.c.likes).label("likes"),
+            func.sum(rows.c.comments).label("comments")
+        )
+        .group_by(rows.c.item_id)
+        .subquery()
+    )
+
+
+@read_only
+def get_counts(db: Session, ids: dict[str, list[int]]) -> dict[str, dict[int, dict]]:
+    """
+    Likes and comments (and views, for videos) of many items, one query per
+    entity type. Unknown ids are left out of the maps.
+
+    Args:
+        ids (dict[str, list[int]]): Ids by entity type (videos, events, updates).
+    """
+    counts = {}
+    for target, target_ids in ids.items():
+        model = TARGETS[target][0]
+        engagement = _engagement_counts(target, target_ids)
+        columns = [
+            model.id,
+            func.coalesce(engagement.c.likes, 0),
+            func.coalesce(engagement.c.comments, 0)
+        ]
+        if model is Video:
+            columns += [Video.views, func.coalesce(UniqueViewSketch.estimate, 0)]
+
+        stmt = (
+            select(*columns)
+            .outerjoin(engagement, engagement.c.item_id == model.id)
+            .where(model.id.in_(target_ids))
+        )
+        if model is Video:
+            stmt = stmt.outerjoin(UniqueViewSketch, and_(
+                UniqueViewSketch.video_id == Video.id,
+                UniqueViewSketch.period == viewcounts.ALL_TIME
+            ))
+        if model is Event:
+            stmt = stmt.where(Event.status != DELETING)
+
+        counts[target] = {}
+        for item_id, likes, comments, *views in db.exec(stmt):
+            counts[target][item_id] = {"likes": int(likes), "comments": int(comments)}
+            if views:
+                counts[target][item_id].update(
+                    views=views[0] + viewcounts.pending_views(item_id),
+                    unique_views=views[1]
+                )
+
+    return counts
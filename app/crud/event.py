@@ -1,20 +1,35 @@
-from sqlmodel import Session, select
+from sqlmodel import Session, select, func
 from app.schemas.comment import CommentCreate, CommentPublic
 from app.storage.models import Event, LiveUpdate, Comment, Like
 from app.schemas.event import EventPublicWithRel, LiveUpdatePublicWithEvent
 from app.schemas.like import LikePublic
+from app.storage.cascade import DELETING, open_event
+from app.storage.database import read_only
+from app.storage.rollups import record_engagement
+from sqlalchemy.orm import selectinload
 
 
+@read_only
 def get_event(db: Session, event_id: int) -> EventPublicWithRel | None:
     event = db.get(Event, event_id)
-    if event:
+    if event and event.status != DELETING:
         return EventPublicWithRel.model_validate(event).model_dump()
 
     return None
 
 
-def get_all_live_events(db: Session) -> list[EventPublicWithRel]:
-    events = db.exec(select(Event).where(Event.status == "live")).all()
+@read_only
+def get_all_live_events(db: Session, limit: int | None = None) -> list[EventPublicWithRel]:
+    events = db.exec(
+        select(Event)
+        .where(Event.status == "live")
+        .limit(limit)
+        .options(
+            selectinload(Event.updates),
+            selectinload(Event.comments),
+            selectinload(Event.likes)
+        )
+    ).all()
     return [
         EventPublicWithRel.model_validate(event).model_dump()
         for event in events
@@ -25,28 +40,38 @@ def comment_on_event(
     db: Session,
     event_id: int,
     content_data: CommentCreate
-) -> CommentPublic:
+) -> CommentPublic | None:
+    if not open_event(db, event_id):
+        return None
+
     comment = Comment(**content_data.model_dump(), event_id=event_id)
     db.add(comment)
     db.flush()
     db.refresh(comment)
+    record_engagement(db, "event", event_id, comments=1)
 
     return CommentPublic.model_validate(comment).model_dump()
 
 
-def like_event(db: Session, event_id: int) -> LikePublic:
+def like_event(db: Session, event_id: int) -> LikePublic | None:
+    if not open_event(db, event_id):
+        return None
+
     like = Like(event_id=event_id)
     db.add(like)
     db.flush()
     db.refresh(like)
+    record_engagement(db, "event", event_id, likes=1)
 
     return LikePublic.model_validate(like).model_dump()
 
 
+@read_only
 def get_like_count_for_event(db: Session, event_id: int) -> int:
-    return len(db.exec(select(Like).where(Like.event_id == event_id)).all())
+    return db.exec(select(func.count(Like.id)).where(Like.event_id == event_id)).one()
 
 
+@read_only
 def get_comments_for_event(db: Session, event_id: int) -> list[Comment]:
     comments = db.exec(select(Comment).where(Comment.event_id == event_id)).all()
     return [
@@ -55,6 +80,7 @@ def get_comments_for_event(db: Session, event_id: int) -> list[Comment]:
     ]
 
 
+@read_only
 def get_updates_for_event(
     db: Session,
     event_id: int,
@@ -63,7 +89,10 @@ def get_updates_for_event(
 ) -> list[LiveUpdate]:
     updates = db.exec(
         select(LiveUpdate)
-        .where(LiveUpdate.event_id == event_id)
+        .where(
+            LiveUpdate.event_id == event_id,
+            LiveUpdate.event.has(Event.status != DELETING)
+        )
         .order_by(LiveUpdate.timestamp.desc())
         .offset(offset)
         .limit(limit)
@@ -0,0 +1,23 @@
+from sqlmodel import Session
+from app.storage.changes import current_generation
+from app.storage.database import read_only
+from app.crud.video import get_recent_videos
+from app.crud.update import get_recent_updates
+from app.crud.event import get_all_live_events
+from config import get_settings
+
+settings = get_settings()
+
+
+@read_only
+def get_home_feed(db: Session) -> tuple[int, dict]:
+    """
+    Everything the home page shows, read in one session, with the content
+    generation it was read at.
+    """
+    generation = current_generation(db)
+    return generation, {
+        "videos": get_recent_videos(db, settings.feed_videos),
+        "updates": get_recent_updates(db, settings.feed_updates),
+        "events": get_all_live_events(db, settings.feed_events),
+    }
@@ -1,11 +1,16 @@
 from sqlmodel import Session
 from app.storage.models import Like
 from app.schemas.common import StatusJSON
+from app.storage.rollups import ENTITY_TYPES, record_engagement
 
 
 def unlike_item(db: Session, like_id: int) -> StatusJSON:
     event = db.get(Like, like_id)
     if event:
+        targets = (event.video_id, event.event_id, event.update_id)
+        for entity_type, entity_id in zip(ENTITY_TYPES, targets):
+            if entity_id is not None:
+                record_engagement(db, entity_type, entity_id, at=event.timestamp, likes=-1)
         db.delete(event)
 
     return StatusJSON(status='unliked')
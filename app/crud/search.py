@@ -0,0 +1,52 @@
+from collections import defaultdict
+from sqlmodel import Session, select
+from app.storage.models import Event, LiveUpdate
+from app.storage.search import SEARCH_FIELDS, get_search_index, tokenize
+from app.storage.cascade import DELETING
+from app.storage.database import read_only
+from app.schemas.event import EventPublic
+from app.schemas.update import LiveUpdatePublic
+from app.schemas.video import VideoPublic
+
+PUBLIC_SCHEMAS = {"video": VideoPublic, "event": EventPublic, "update": LiveUpdatePublic}
+
+
+@read_only
+def search(
+    db: Session,
+    query: str,
+    types: list[str],
+    category_ids: list[int] | None,
+    limit: int,
+    offset: int
+) -> list[dict]:
+    """Ranked videos, events and updates matching every word of `query`"""
+    terms = tokenize(query)
+    if not terms:
+        return []
+
+    hits = get_search_index().search(db, terms, types, category_ids, limit, offset)
+
+    ids = defaultdict(list)
+    for entity_type, entity_id, _ in hits:
+        ids[entity_type].append(entity_id)
+
+    items = {}
+    for entity_type, entity_ids in ids.items():
+        model = SEARCH_FIELDS[entity_type][0]
+        stmt = select(model).where(model.id.in_(entity_ids))
+        if model is LiveUpdate:
+            # Updates of an event being purged may not be unindexed yet
+            stmt = stmt.where(LiveUpdate.event.has(Event.status != DELETING))
+        items.update({(entity_type, item.id): item for item in db.exec(stmt).all()})
+
+    return [
+        {
+            "type": entity_type,
+            "id": entity_id,
+            "score": round(score, 4),
+            "item": PUBLIC_SCHEMAS[entity_type].model_validate(items[(entity_type, entity_id)]).model_dump()
+        }
+        for entity_type, entity_id, score in hits
+        if (entity_type, entity_id) in items
+    ]
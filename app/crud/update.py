@@ -1,51 +1,109 @@
-from sqlmodel import Session, select
+from sqlmodel import Session, select, func
 from app.storage.models import Comment, Like
 from app.schemas.comment import CommentCreate, CommentPublic
-from app.storage.models import LiveUpdate
+from app.storage.models import LiveUpdate, Event
 from app.schemas.like import LikePublic
 from app.schemas.event import LiveUpdatePublicWithEvent
+from app.storage.database import read_only
+from app.storage.rollups import record_engagement
+from app.storage.cascade import DELETING, open_event
+from app.storage import trending
+from sqlalchemy.orm import selectinload
 
 
+@read_only
 def get_update(db: Session, update_id: int) -> LiveUpdatePublicWithEvent | None:
-    update = db.get(LiveUpdate, update_id)
+    update = db.exec(
+        select(LiveUpdate).where(
+            LiveUpdate.id == update_id,
+            LiveUpdate.event.has(Event.status != DELETING)
+        )
+    ).first()
     if update:
         return LiveUpdatePublicWithEvent.model_validate(update).model_dump()
 
 
+def _open_update(db: Session, update_id: int) -> LiveUpdate | None:
+    """The live update, unless it or its event is gone or being deleted"""
+    update = db.get(LiveUpdate, update_id)
+    if update is None or not open_event(db, update.event_id):
+        return None
+
+    return update
+
+
 def comment_on_update(
     db: Session,
     update_id: int,
     content_data: CommentCreate
-) -> CommentPublic:
+) -> CommentPublic | None:
+    if not _open_update(db, update_id):
+        return None
+
     comment = Comment(**content_data.model_dump(), update_id=update_id)
     db.add(comment)
     db.flush()
     db.refresh(comment)
+    record_engagement(db, "update", update_id, comments=1)
 
     return CommentPublic.model_validate(comment).model_dump()
 
 
-def like_update(db: Session, update_id: int) -> LikePublic:
+def like_update(db: Session, update_id: int) -> LikePublic | None:
+    if not _open_update(db, update_id):
+        return None
+
     like = Like(update_id=update_id)
     db.add(like)
     db.flush()
     db.refresh(like)
+    record_engagement(db, "update", update_id, likes=1)
 
     return LikePublic.model_validate(like).model_dump()
 
 
-def get_recent_updates(db: Session) -> list[LiveUpdatePublicWithEvent]:
-    updates = db.exec(select(LiveUpdate).order_by(LiveUpdate.timestamp.desc())).all()[:3]
+@read_only
+def get_recent_updates(db: Session, limit: int = 3) -> list[LiveUpdatePublicWithEvent]:
+    updates = db.exec(
+        select(LiveUpdate)
+        .where(LiveUpdate.event.has(Event.status != DELETING))
+        .order_by(LiveUpdate.timestamp.desc())
+        .limit(limit)
+        .options(
+            selectinload(LiveUpdate.comments),
+            selectinload(LiveUpdate.likes),
+            selectinload(LiveUpdate.event)
+        )
+    ).all()
     return [
         LiveUpdatePublicWithEvent.model_validate(u).model_dump()
         for u in updates
     ]
 
 
+@read_only
+def get_trending_updates(db: Session, limit: int) -> list[LiveUpdatePublicWithEvent]:
+    ranked = trending.top(
+        db, LiveUpdate, "update", limit,
+        LiveUpdate.event.has(Event.status != DELETING),
+        options=(
+            selectinload(LiveUpdate.comments),
+            selectinload(LiveUpdate.likes),
+            selectinload(LiveUpdate.event)
+        )
+    )
+    return [
+        {**LiveUpdatePublicWithEvent.model_validate(u).model_dump(), "trending_score": score}
+        for u, score in ranked
+    ]
+
+
+@read_only
 def get_like_count_for_update(db: Session, update_id: int) -> int:
-    return len(db.exec(select(Like).where(Like.update_id == update_id)).all())
+    return db.exec(select(func.count(Like.id)).where(Like.update_id == update_id)).one()
 
 
+@read_only
 def get_comments_for_update(db: Session, update_id: int) -> list[CommentPublic]:
     comments = db.exec(select(Comment).where(Comment.update_id == update_id)).all()
     return [CommentPublic.model_validate(c).model_dump() for c in comments]
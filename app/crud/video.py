@@ -1,22 +1,70 @@
-from sqlmodel import Session, select
-from app.storage.models import Video, Comment, Like, VideoCategoryLink, Category
+from sqlmodel import Session, select, func
+from app.storage.models import Video, Comment, Like, VideoCategoryLink, Category, UniqueViewSketch
 from app.schemas.comment import CommentPublic, CommentCreate
 from app.schemas.like import LikePublic
 from app.schemas.video import VideoCombined, VideoPublicWithRel
 from config import get_settings
 from sqlalchemy.orm import selectinload
+from app.storage.database import read_only
+from app.storage.rollups import record_engagement
+from app.storage import viewcounts, trending
 
 settings = get_settings()
 
 
-def get_recent_videos(db: Session) -> list[VideoPublicWithRel]:
-    videos = db.exec(select(Video).order_by(Video.timestamp.desc())).all()[:3]
+@read_only
+def get_recent_videos(db: Session, limit: int = 3) -> list[VideoPublicWithRel]:
+    videos = db.exec(
+        select(Video)
+        .order_by(Video.timestamp.desc())
+        .limit(limit)
+        .options(
+            selectinload(Video.comments),
+            selectinload(Video.likes),
+            selectinload(Video.categories)
+        )
+    ).all()
     return [
         VideoPublicWithRel.model_validate(v).model_dump()
         for v in videos
     ]
 
 
+@read_only
+def get_videos_by_ids(db: Session, video_ids: list[int]) -> dict[int, VideoPublicWithRel]:
+    """Many videos by id in one query per relationship; unknown ids are left out"""
+    videos = db.exec(
+        select(Video)
+        .where(Video.id.in_(video_ids))
+        .options(
+            selectinload(Video.comments),
+            selectinload(Video.likes),
+            selectinload(Video.categories)
+        )
+    ).all()
+    return {
+        v.id: VideoPublicWithRel.model_validate(v).model_dump()
+        for v in videos
+    }
+
+
+@read_only
+def get_trending_videos(db: Session, limit: int) -> list[VideoPublicWithRel]:
+    ranked = trending.top(
+        db, Video, "video", limit,
+        options=(
+            selectinload(Video.comments),
+            selectinload(Video.likes),
+            selectinload(Video.categories)
+        )
+    )
+    return [
+        {**VideoPublicWithRel.model_validate(v).model_dump(), "trending_score": score}
+        for v, score in ranked
+    ]
+
+
+@read_only
 def get_videos(
     db: Session,
     category_ids: list[int],
@@ -68,16 +116,17 @@ def get_videos(
         ]
 
 
-def get_video_and_increment_views(db: Session, video_id: int) -> VideoCombined:
+@read_only
+def get_video_with_related(db: Session, video_id: int) -> VideoCombined:
+    """The video and its five most viewed peers; views are counted by the caller"""
     video = db.get(Video, video_id)
     if video:
-        video.views += 1
-        db.add(video)
-        db.flush()
-        db.refresh(video)
-
-        videos = db.exec(select(Video).order_by(Video.views.desc())).all()
-        related_videos = [v for v in videos if v.id != video_id][:5]
+        related_videos = db.exec(
+            select(Video)
+            .where(Video.id != video_id)
+            .order_by(Video.views.desc())
+            .limit(5)
+        ).all()
         video_combined = {
             "video": video,
             "related_videos": related_videos
@@ -88,15 +137,39 @@ def get_video_and_increment_views(db: Session, video_id: int) -> VideoCombined:
     return None
 
 
+@read_only
 def get_like_count_for_video(db: Session, video_id: int) -> int:
-    return len(db.exec(select(Like).where(Like.video_id == video_id)).all())
+    return db.exec(select(func.count(Like.id)).where(Like.video_id == video_id)).one()
 
 
-def get_view_count_for_video(db: Session, video_id: int) -> int:
+@read_only
+def get_view_counts(db: Session, video_id: int, days: int | None = None) -> dict | None:
+    """
+    Raw and distinct views of a video, all time or over the last `days`
+    days; this worker's unwritten views are included.
+    """
     video = db.get(Video, video_id)
-    return video.views if video else 0
+    if not video:
+        return None
+
+    periods = viewcounts.periods(days)
+    sketch = viewcounts.pending_sketch(video_id, periods)
+    stored = db.exec(
+        select(UniqueViewSketch.registers).where(
+            UniqueViewSketch.video_id == video_id,
+            UniqueViewSketch.period.in_(periods)
+        )
+    )
+    for registers in stored:
+        sketch.merge(registers)
 
+    return {
+        "views": video.views + viewcounts.pending_views(video_id),
+        "unique_views": sketch.count()
+    }
 
+
+@read_only
 def get_related_videos(db: Session, video_id: int) -> list[Video]:
     videos = db.exec(select(Video).order_by(Video.views.desc())).all()
     return [v for v in videos if v.id != video_id][:5]
@@ -111,6 +184,7 @@ def comment_on_video(
     db.add(comment)
     db.flush()
     db.refresh(comment)
+    record_engagement(db, "video", video_id, comments=1)
 
     return CommentPublic.model_validate(comment).model_dump()
 
@@ -120,17 +194,15 @@ def like_video(db: Session, video_id: int) -> LikePublic:
     db.add(like)
     db.flush()
     db.refresh(like)
+    record_engagement(db, "video", video_id, likes=1)
 
     return LikePublic.model_validate(like).model_dump()
 
 
+@read_only
 def get_comments_for_video(db: Session, video_id: int) -> list[CommentPublic]:
     comments = db.exec(select(Comment).where(Comment.video_id == video_id)).all()
     return [
         CommentPublic.model_validate(c).model_dump()
         for c in comments
     ]
-
-
-def get_like_count_for_video(db: Session, video_id: int) -> int:
-    return len(db.exec(select(Like).where(Like.video_id == video_id)).all())
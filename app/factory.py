@@ -0,0 +1,189 @@
+import fcntl
+import threading
+
+from contextlib import contextmanager
+from flask import Flask, jsonify
+from flask_cors import CORS
+from sqlalchemy import insert
+from sqlmodel import Session, select
+from config import get_settings
+
+settings = get_settings()
+
+_bootstrap_lock = threading.Lock()
+_bootstrapped = False
+
+
+@contextmanager
+def _host_lock(path: str):
+    """Exclusive lock shared by every process on this host."""
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def create_defaults(db: Session) -> dict:
+    """
+    Insert the default admin and any missing categories.
+
+    Existing category names are read in one query and the missing ones
+    inserted in one statement; INSERT IGNORE makes a concurrent insert of
+    the same (unique) name harmless.
+    """
+    from app.storage.models import Admin, Category
+    from app.crud.admin import get_admin
+    from app.core.utils import get_password_hash
+
+    created_admin = False
+    if not get_admin(db, settings.admin_user):
+        admin_user = Admin(
+            username=settings.admin_user,
+            password=get_password_hash(settings.admin_pwd)
+        )
+        db.add(admin_user)
+        created_admin = True
+
+    names = list(dict.fromkeys(settings.video_categories))
+    existing = set(db.exec(select(Category.name).where(Category.name.in_(names))).all())
+    missing = [name for name in names if name not in existing]
+    if missing:
+        db.exec(
+            insert(Category.__table__)
+            .prefix_with("IGNORE", dialect="mysql")
+            .prefix_with("OR IGNORE", dialect="sqlite"),
+            params=[{"name": name} for name in missing]
+        )
+
+    return {"admin_created": created_admin, "categories_added": missing}
+
+
+def bootstrap() -> dict | None:
+    """
+    Create the schema and default rows; idempotent.
+
+    Runs at most once per process. Processes on one host take turns on a
+    file lock and, on MySQL, every host takes turns on an advisory lock, so
+    concurrent deploys never race on the same inserts.
+
+    Returns:
+        dict | None: What was created, None if this process already ran it.
+    """
+    global _bootstrapped
+    from app.storage.database import create_db, advisory_lock
+    from app.storage.search import ensure_search_index
+    from app.core.dependencies import safe_db_operation
+
+    with _bootstrap_lock:
+        if _bootstrapped:
+            return None
+
+        with _host_lock(settings.bootstrap_lock_file), \
+                advisory_lock("blacctheddi.bootstrap", settings.bootstrap_lock_timeout):
+            create_db()
+            created = safe_db_operation(create_defaults)
+            created["search_index"] = safe_db_operation(ensure_search_index)
+
+        _bootstrapped = True
+        return created
+
+
+def init_worker():
+    """
+    Post-fork initialization: drop the database engine and storage client
+    inherited from the parent so this worker builds its own on first use.
+    """
+    from app.storage.database import db_config, router
+    from app.storage import r2
+
+    db_config.dispose_engine()
+    router.dispose_engines()
+    r2.reset_client()
+
+
+def create_app(bootstrap_db: bool = False) -> Flask:
+    """
+    Build the Flask application.
+
+    The database is not touched; run `flask bootstrap` (or let the gunicorn
+    master do it) to create the schema and default rows.
+
+    Args:
+        bootstrap_db (bool): Run `bootstrap()` as part of app creation.
+    """
+    app = Flask("main")
+    app.url_map.strict_slashes = False
+
+    # Load config
+    app.config["SECRET_KEY"] = settings.secret_key
+    app.config["USE_X_SENDFILE"] = settings.use_x_sendfile
+
+    # Client addresses from the proxies' X-Forwarded-For, when behind some
+    if settings.trusted_proxy_hops:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+
+        app.wsgi_app = ProxyFix(
+            app.wsgi_app,
+            x_for=settings.trusted_proxy_hops,
+            x_proto=settings.trusted_proxy_hops
+        )
+
+    # Enable CORS
+    CORS(app, origins=[
+        'https://tvandlivepost.vercel.app',
+        'https://blacctheddipost.madeinblacc.net',
+        'http://localhost:3000',
+    ], supports_credentials=True, expose_headers=['ETag'])
+
+    # Register Blueprints (auth, admin, etc.)
+    from app.blueprints import auth, admin, video, update, event, like, category, media, search, counts, feed
+
+    app.register_blueprint(auth.auth_bp,  strict_slashes=False)
+    app.register_blueprint(admin.admin_bp, strict_slashes=False)
+    app.register_blueprint(video.video_bp, strict_slashes=False)
+    app.register_blueprint(update.update_bp, strict_slashes=False)
+    app.register_blueprint(event.event_bp, strict_slashes=False)
+    app.register_blueprint(like.like_bp, strict_slashes=False)
+    app.register_blueprint(category.category_bp, strict_slashes=False)
+    app.register_blueprint(media.media_bp, strict_slashes=False)
+    app.register_blueprint(search.search_bp, strict_slashes=False)
+    app.register_blueprint(counts.counts_bp, strict_slashes=False)
+    app.register_blueprint(feed.feed_bp, strict_slashes=False)
+
+    # Server-Timing header and a timing log line per request; first, so its
+    # total covers the other hooks
+    from app.core import timing
+
+    timing.init_app(app)
+
+    # Turn database admission rejections into fast 503s
+    from app.core import admission
+
+    admission.init_app(app)
+
+    # Cache-Control and surrogate keys on public reads, CDN purges on changes
+    from app.core import http_cache
+
+    http_cache.init_app(app)
+
+    # Answer public reads from their last good response while the database is down
+    from app.core import fallback
+
+    fallback.init_app(app)
+
+    # Maintenance commands (flask --app main <command>)
+    from app.cli import register_commands
+
+    register_commands(app)
+
+    # Status route
+    @app.route("/")
+    def app_status():
+        return jsonify({"status": "active"})
+
+    if bootstrap_db:
+        bootstrap()
+
+    return app
@@ -1,7 +1,18 @@
-from sqlmodel import SQLModel
+from datetime import datetime
+from app.schemas.common import Schema
 
 
-class Analytics(SQLModel):
+class Analytics(Schema):
     total_views: int
+    unique_views: int
     total_updates: int
     total_videos: int
+
+
+class Trend(Schema):
+    metric: str
+    entity_type: str
+    granularity: str
+    group_by: str | None = None
+    buckets: list[datetime]
+    series: dict[str, list[int]]
@@ -1,12 +1,12 @@
-from sqlmodel import SQLModel
+from app.schemas.common import Schema
 
 
-class LoginRequest(SQLModel):
+class LoginRequest(Schema):
     username: str
     password: str
 
 
-class Token(SQLModel):
+class Token(Schema):
     access_token: str
     token_type: str
 
@@ -15,6 +15,6 @@ class TokenFull(Token):
     refresh_token: str
 
 
-class PWDReset(SQLModel):
+class PWDReset(Schema):
     old_password: str
     new_password: str
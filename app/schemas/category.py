@@ -1,7 +1,8 @@
-from sqlmodel import SQLModel, Field
+from sqlmodel import Field
+from app.schemas.common import Schema
 
 
-class CategoryBase(SQLModel):
+class CategoryBase(Schema):
     name: str = Field(index=True, unique=True)
 
 
@@ -1,4 +1,9 @@
 from sqlmodel import SQLModel
+from app.core.timing import timed
+
+# Width list and card images are rendered at on clients
+LIST_IMAGE_WIDTH = 320
+PREFERRED_IMAGE_FORMATS = ("webp", "jpeg")
 
 
 # class BaseSchema(SQLModel):
@@ -32,5 +37,41 @@ from sqlmodel import SQLModel
 #         return data
 
 
-class StatusJSON(SQLModel):
+class Schema(SQLModel):
+    """Base of the API schemas; validating and dumping them is timed per request"""
+
+    def __init__(self, **data):
+        with timed("validate"):
+            super().__init__(**data)
+
+    @classmethod
+    def model_validate(cls, obj, **kwargs):
+        with timed("validate"):
+            return super().model_validate(obj, **kwargs)
+
+    def model_dump(self, **kwargs) -> dict:
+        with timed("serialize"):
+            return super().model_dump(**kwargs)
+
+
+class StatusJSON(Schema):
     status: str
+
+
+def preview_url(variants: dict | None, fallback: str | None, min_width: int = LIST_IMAGE_WIDTH) -> str | None:
+    """
+    Smallest image variant at least `min_width` wide (the widest one when all
+    are narrower), falling back to the original URL.
+    """
+    if not variants:
+        return fallback
+
+    for name in PREFERRED_IMAGE_FORMATS:
+        by_width = {int(width): url for width, url in (variants.get(name) or {}).items()}
+        if not by_width:
+            continue
+
+        wide_enough = [width for width in by_width if width >= min_width]
+        return by_width[min(wide_enough) if wide_enough else max(by_width)]
+
+    return fallback
@@ -1,11 +1,13 @@
-from sqlmodel import Field, SQLModel
+from pydantic import computed_field
+from sqlmodel import Field
 from app.schemas.update import LiveUpdatePublic, LiveUpdatePublicWithRel
 from datetime import datetime, timezone
 from app.schemas.like import LikePublic
 from app.schemas.comment import CommentPublic
+from app.schemas.common import Schema, preview_url
 
 
-class EventCreate(SQLModel):
+class EventCreate(Schema):
     title: str
     details: str
     status: str = 'live'  # live or ended
@@ -14,9 +16,10 @@ class EventCreate(SQLModel):
 class EventBase(EventCreate):
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     image_url: str | None = None
+    image_variants: dict | None = None
 
 
-class EventUpdate(SQLModel):
+class EventUpdate(Schema):
     title: str | None = None
     details: str | None = None
     status: str | None = None
@@ -25,6 +28,11 @@ class EventUpdate(SQLModel):
 class EventPublic(EventBase):
     id: int
 
+    @computed_field
+    @property
+    def image_preview_url(self) -> str | None:
+        return preview_url(self.image_variants, self.image_url)
+
 
 class EventPublicWithRel(EventPublic):
     updates: list[LiveUpdatePublic]
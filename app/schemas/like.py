@@ -1,12 +1,13 @@
-from sqlmodel import Field, SQLModel
+from sqlmodel import Field
 from datetime import timezone, datetime
+from app.schemas.common import Schema
 
 
-class LikeBase(SQLModel):
+class LikeBase(Schema):
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    event_id: int | None = Field(default=None, foreign_key="events.id", ondelete='CASCADE')
-    update_id: int | None = Field(default=None, foreign_key="liveupdates.id", ondelete='CASCADE')
-    video_id: int | None = Field(default=None, foreign_key="videos.id", ondelete='CASCADE')
+    event_id: int | None = Field(default=None, foreign_key="events.id", ondelete='CASCADE', index=True)
+    update_id: int | None = Field(default=None, foreign_key="liveupdates.id", ondelete='CASCADE', index=True)
+    video_id: int | None = Field(default=None, foreign_key="videos.id", ondelete='CASCADE', index=True)
 
 
 class LikePublic(LikeBase):
@@ -1,10 +1,12 @@
-from sqlmodel import Field, SQLModel
+from pydantic import computed_field
+from sqlmodel import Field
 from datetime import timezone, datetime
 from app.schemas.like import LikePublic
 from app.schemas.comment import CommentPublic
+from app.schemas.common import Schema, preview_url
 
 
-class LiveUpdateCreate(SQLModel):
+class LiveUpdateCreate(Schema):
     title: str
     details: str
 
@@ -13,9 +15,10 @@ class LiveUpdateBase(LiveUpdateCreate):
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     event_id: int = Field(foreign_key="events.id", ondelete='CASCADE')
     image_url: str | None = None
+    image_variants: dict | None = None
 
 
-class LiveUpdateUpdate(SQLModel):
+class LiveUpdateUpdate(Schema):
     title: str | None = None
     details: str | None = None
 
@@ -23,6 +26,11 @@ class LiveUpdateUpdate(SQLModel):
 class LiveUpdatePublic(LiveUpdateBase):
     id: int
 
+    @computed_field
+    @property
+    def image_preview_url(self) -> str | None:
+        return preview_url(self.image_variants, self.image_url)
+
 
 class LiveUpdatePublicWithRel(LiveUpdatePublic):
     comments: list[CommentPublic]
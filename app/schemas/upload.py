@@ -0,0 +1,45 @@
+from sqlmodel import Field
+from app.schemas.common import Schema
+from datetime import timezone, datetime
+
+
+class ImageUploadRequest(Schema):
+    filename: str
+    content_type: str
+    size: int
+    method: str = "PUT"  # PUT or POST
+
+
+class ImageUploadFinalize(Schema):
+    key: str
+    target: str  # event, update or video
+    target_id: int
+
+
+class UploadSessionBase(Schema):
+    key: str = Field(index=True, unique=True)
+    upload_id: str
+    content_type: str
+    parts_expected: int | None = None
+    parts_received: int = 0
+    status: str = 'uploading'  # uploading, completed or aborted
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class UploadSessionPublic(UploadSessionBase):
+    id: int
+
+
+class PartSignRequest(Schema):
+    key: str
+    upload_id: str
+    part_numbers: list[int] | None = None
+    start: int | None = None
+    end: int | None = None  # inclusive
+
+
+class UploadResumeRequest(Schema):
+    key: str
+    upload_id: str
+    sign_missing: bool = False
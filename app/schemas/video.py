@@ -1,23 +1,30 @@
-from sqlmodel import Field, SQLModel
+from sqlmodel import Field
 from datetime import timezone, datetime
-from pydantic import BaseModel
+from pydantic import computed_field
 from app.schemas.like import LikePublic
 from app.schemas.comment import CommentPublic
 from app.schemas.category import CategoryPublic
+from app.schemas.common import Schema, preview_url
 
 
-class VideoBase(SQLModel):
+class VideoBase(Schema):
     title: str
     description: str
     views: int = 0
     url: str
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     thumbnail_url: str | None = None
+    thumbnail_variants: dict | None = None
 
 
 class VideoPublic(VideoBase):
     id: int
 
+    @computed_field
+    @property
+    def thumbnail_preview_url(self) -> str | None:
+        return preview_url(self.thumbnail_variants, self.thumbnail_url)
+
 
 class VideoPublicWithRel(VideoPublic):
     comments: list[CommentPublic]
@@ -25,7 +32,7 @@ class VideoPublicWithRel(VideoPublic):
     categories: list[CategoryPublic]
 
 
-class VideoCombined(BaseModel):
+class VideoCombined(Schema):
     video: VideoPublicWithRel
     related_videos: list[VideoPublicWithRel]
 
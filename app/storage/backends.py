@@ -0,0 +1,532 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import mimetypes
+
+from abc import ABC, abstractmethod
+from uuid import uuid4
+from functools import lru_cache
+from datetime import datetime, timezone
+from itsdangerous import URLSafeSerializer, BadSignature
+from werkzeug.security import safe_join
+from app.storage import r2
+from config import get_settings
+
+settings = get_settings()
+
+# Bookkeeping directories under the local root; keys never start with a dot
+META_DIR = ".meta"
+
+# put_object(**extra) arguments kept by the local backend as response headers
+HEADER_ARGS = {"CacheControl": "Cache-Control", "ContentEncoding": "Content-Encoding"}
+UPLOADS_DIR = ".uploads"
+
+
+class StorageError(Exception):
+    """A storage operation was refused (bad key, invalid upload grant...)."""
+
+
+class StorageNotSupported(StorageError):
+    """The configured backend cannot perform this operation."""
+
+
+class _ConcatStream:
+    """Read several files back to back as one stream."""
+
+    def __init__(self, paths):
+        self.paths = iter(paths)
+        self.current = None
+
+    def read(self, size: int) -> bytes:
+        while True:
+            if self.current is None:
+                path = next(self.paths, None)
+                if path is None:
+                    return b""
+                self.current = open(path, "rb")
+
+            chunk = self.current.read(size)
+            if chunk:
+                return chunk
+            self.current.close()
+            self.current = None
+
+
+class StorageBackend(ABC):
+    """
+    Object storage used for media. Keys are `/`-separated paths such as
+    `images/<sha256>.jpg`; every backend exposes them under `base_url`.
+
+    Backends must implement the abstract methods; multipart and presigned
+    uploads are optional and raise `StorageNotSupported` by default.
+    """
+
+    name = "base"
+
+    @property
+    @abstractmethod
+    def base_url(self) -> str:
+        ...
+
+    def public_url(self, key: str) -> str:
+        return f"{self.base_url.rstrip('/')}/{key}"
+
+    def local_path(self, key: str) -> str | None:
+        """Path of a local copy of `key` that can be served directly, if any."""
+        return None
+
+    def content_type(self, key: str) -> str:
+        """Content type of the local copy of `key`."""
+        return mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+    def object_headers(self, key: str) -> dict:
+        """Extra response headers stored with the local copy of `key`."""
+        return {}
+
+    @abstractmethod
+    def upload_fileobj(self, fileobj, key: str, content_type: str):
+        ...
+
+    @abstractmethod
+    def put_object(self, key: str, body: bytes, content_type: str, **extra):
+        ...
+
+    @abstractmethod
+    def get_object_bytes(self, key: str) -> bytes:
+        ...
+
+    @abstractmethod
+    def head_object(self, key: str) -> dict | None:
+        ...
+
+    def delete_object(self, key: str):
+        self.delete_objects([key])
+
+    @abstractmethod
+    def delete_objects(self, keys: list[str]) -> dict:
+        ...
+
+    @abstractmethod
+    def list_objects(self, prefix: str):
+        ...
+
+    def list_multipart_uploads(self, prefix: str):
+        return iter(())
+
+    def create_multipart_upload(self, key: str, content_type: str) -> str:
+        raise StorageNotSupported(f"{self.name} storage has no multipart uploads")
+
+    def complete_multipart_upload(self, key: str, upload_id: str, parts: list[dict]):
+        raise StorageNotSupported(f"{self.name} storage has no multipart uploads")
+
+    def abort_multipart_upload(self, key: str, upload_id: str):
+        raise StorageNotSupported(f"{self.name} storage has no multipart uploads")
+
+    def list_parts(self, key: str, upload_id: str) -> list[dict]:
+        raise StorageNotSupported(f"{self.name} storage has no multipart uploads")
+
+    def presign_part(self, key: str, upload_id: str, part_number: int, expires_in: int = 3600) -> str:
+        raise StorageNotSupported(f"{self.name} storage has no presigned uploads")
+
+    def presign_put(self, key: str, content_type: str, size: int, expires_in: int) -> str:
+        raise StorageNotSupported(f"{self.name} storage has no presigned uploads")
+
+    def presign_post(self, key: str, content_type: str, max_bytes: int, expires_in: int) -> dict:
+        raise StorageNotSupported(f"{self.name} storage has no presigned POST uploads")
+
+
+class R2Backend(StorageBackend):
+    """
+    Cloudflare R2 through the shared boto3 client.
+
+    With a `mirror`, images are also written to local disk so the media
+    route can keep serving thumbnails while the object store is degraded.
+    """
+
+    name = "r2"
+
+    def __init__(self, mirror: "LocalBackend | None" = None):
+        self.mirror = mirror
+
+    @property
+    def base_url(self) -> str:
+        return settings.r2_public_url
+
+    def _mirrored(self, key: str) -> bool:
+        return self.mirror is not None and key.startswith("images/")
+
+    def local_path(self, key: str) -> str | None:
+        return self.mirror.local_path(key) if self.mirror else None
+
+    def content_type(self, key: str) -> str:
+        return self.mirror.content_type(key) if self.mirror else super().content_type(key)
+
+    def upload_fileobj(self, fileobj, key: str, content_type: str):
+        r2.upload_fileobj(fileobj, key, content_type)
+        if self._mirrored(key) and fileobj.seekable():
+            fileobj.seek(0)
+            self._mirror(self.mirror.upload_fileobj, fileobj, key, content_type)
+
+    def put_object(self, key: str, body: bytes, content_type: str, **extra):
+        r2.put_object(key, body, content_type, **extra)
+        if self._mirrored(key):
+            self._mirror(self.mirror.put_object, key, body, content_type)
+
+    def _mirror(self, write, *args):
+        try:
+            write(*args)
+        except Exception as e:
+            logging.warning(f"Storage mirror write failed: {e}")
+
+    def get_object_bytes(self, key: str) -> bytes:
+        return r2.get_object_bytes(key)
+
+    def head_object(self, key: str) -> dict | None:
+        return r2.head_object(key)
+
+    def delete_objects(self, keys: list[str]) -> dict:
+        result = r2.delete_objects(keys)
+        if self.mirror and result["deleted"]:
+            self.mirror.delete_objects(result["deleted"])
+        return result
+
+    def list_objects(self, prefix: str):
+        return r2.list_objects(prefix)
+
+    def list_multipart_uploads(self, prefix: str):
+        return r2.list_multipart_uploads(prefix)
+
+    def create_multipart_upload(self, key: str, content_type: str) -> str:
+        return r2.create_multipart_upload(key, content_type)
+
+    def complete_multipart_upload(self, key: str, upload_id: str, parts: list[dict]):
+        r2.complete_multipart_upload(key, upload_id, parts)
+
+    def abort_multipart_upload(self, key: str, upload_id: str):
+        r2.abort_multipart_upload(key, upload_id)
+
+    def list_parts(self, key: str, upload_id: str) -> list[dict]:
+        return r2.list_parts(key, upload_id)
+
+    def presign_part(self, key: str, upload_id: str, part_number: int, expires_in: int = 3600) -> str:
+        return r2.presign_part(key, upload_id, part_number, expires_in)
+
+    def presign_put(self, key: str, content_type: str, size: int, expires_in: int) -> str:
+        return r2.presign_put(key, content_type, size, expires_in)
+
+    def presign_post(self, key: str, content_type: str, max_bytes: int, expires_in: int) -> dict:
+        return r2.presign_post(key, content_type, max_bytes, expires_in)
+
+
+class LocalBackend(StorageBackend):
+    """
+    Files under a local directory, for development, load tests and as a
+    fallback origin.
+
+    Writes are streamed through a fixed-size buffer into a temporary file
+    that is renamed into place, so readers never see a partial object.
+    Presigned and multipart uploads are emulated with signed upload grants
+    accepted by the media blueprint.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str, url: str, chunk_size: int = 256 * 1024):
+        self.root = os.path.abspath(root)
+        self.url = url
+        self.chunk_size = chunk_size
+        self.signer = URLSafeSerializer(settings.secret_key, salt="local-storage-upload")
+
+    @property
+    def base_url(self) -> str:
+        return self.url
+
+    # Paths
+    def _path(self, key: str, root: str | None = None) -> str:
+        if not key or any(part.startswith(".") for part in key.split("/")):
+            raise StorageError(f"Invalid key: {key!r}")
+
+        path = safe_join(root or self.root, key)
+        if path is None:
+            raise StorageError(f"Invalid key: {key!r}")
+        return path
+
+    def _meta_path(self, key: str) -> str:
+        return self._path(key, os.path.join(self.root, META_DIR)) + ".json"
+
+    def _upload_dir(self, upload_id: str) -> str:
+        if not upload_id.isalnum():
+            raise StorageError("Invalid upload id")
+        return os.path.join(self.root, UPLOADS_DIR, upload_id)
+
+    def local_path(self, key: str) -> str | None:
+        try:
+            path = self._path(key)
+        except StorageError:
+            return None
+        return path if os.path.isfile(path) else None
+
+    # Writes
+    def write_stream(self, stream, path: str, max_bytes: int | None = None) -> tuple[int, str]:
+        """
+        Copy `stream` into `path` one chunk at a time.
+
+        Returns:
+            tuple[int, str]: Bytes written and their MD5 hex digest (ETag).
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid4().hex}.tmp"
+        digest = hashlib.md5()
+        size = 0
+        try:
+            with open(tmp, "wb") as out:
+                while chunk := stream.read(self.chunk_size):
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise StorageError("Upload exceeds the allowed size")
+                    digest.update(chunk)
+                    out.write(chunk)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        return size, digest.hexdigest()
+
+    def _write_meta(self, key: str, content_type: str, headers: dict | None = None):
+        path = self._meta_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as meta:
+            json.dump({"content_type": content_type, "headers": headers or {}}, meta)
+
+    def upload_fileobj(self, fileobj, key: str, content_type: str, max_bytes: int | None = None) -> str:
+        _, etag = self.write_stream(fileobj, self._path(key), max_bytes)
+        self._write_meta(key, content_type)
+        return etag
+
+    def put_object(self, key: str, body: bytes, content_type: str, **extra):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid4().hex}.tmp"
+        with open(tmp, "wb") as out:
+            out.write(body)
+        os.replace(tmp, path)
+        self._write_meta(key, content_type, {
+            header: extra[arg] for arg, header in HEADER_ARGS.items() if arg in extra
+        })
+
+    # Reads
+    def get_object_bytes(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def content_type(self, key: str) -> str:
+        try:
+            with open(self._meta_path(key)) as meta:
+                return json.load(meta)["content_type"]
+        except (OSError, ValueError, KeyError, StorageError):
+            return super().content_type(key)
+
+    def object_headers(self, key: str) -> dict:
+        try:
+            with open(self._meta_path(key)) as meta:
+                return json.load(meta).get("headers", {})
+        except (OSError, ValueError, StorageError):
+            return {}
+
+    def head_object(self, key: str) -> dict | None:
+        try:
+            size = os.path.getsize(self._path(key))
+        except OSError:
+            return None
+
+        return {"size": size, "content_type": self.content_type(key)}
+
+    def delete_objects(self, keys: list[str]) -> dict:
+        deleted, errors = [], {}
+        for key in keys:
+            try:
+                for path in (self._path(key), self._meta_path(key)):
+                    if os.path.exists(path):
+                        os.remove(path)
+                deleted.append(key)
+            except (OSError, StorageError) as e:
+                errors[key] = str(e)
+
+        return {"deleted": deleted, "errors": errors}
+
+    def list_objects(self, prefix: str):
+        top = prefix.split("/", 1)[0]
+        if not top or top.startswith("."):
+            return
+
+        for dirpath, _, filenames in os.walk(os.path.join(self.root, top)):
+            for filename in filenames:
+                if filename.endswith(".tmp"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if not key.startswith(prefix):
+                    continue
+                stat = os.stat(path)
+                yield {
+                    "Key": key,
+                    "Size": stat.st_size,
+                    "LastModified": datetime.fromtimestamp(stat.st_mtime, timezone.utc)
+                }
+
+    # Presigned and multipart uploads
+    def _grant_url(self, grant: dict, expires_in: int) -> str:
+        grant["exp"] = int(time.time()) + expires_in
+        return f"{self.base_url.rstrip('/')}/_upload?token={self.signer.dumps(grant)}"
+
+    def verify_grant(self, token: str) -> dict:
+        """Decode an upload grant issued by `presign_put` or `presign_part`."""
+        try:
+            grant = self.signer.loads(token)
+        except BadSignature:
+            raise StorageError("Invalid upload token")
+
+        if grant.get("exp", 0) < time.time():
+            raise StorageError("Upload token expired")
+        return grant
+
+    def presign_put(self, key: str, content_type: str, size: int, expires_in: int) -> str:
+        self._path(key)
+        return self._grant_url(
+            {"key": key, "content_type": content_type, "size": size},
+            expires_in
+        )
+
+    def presign_part(self, key: str, upload_id: str, part_number: int, expires_in: int = 3600) -> str:
+        return self._grant_url(
+            {"key": key, "upload_id": upload_id, "part": part_number},
+            expires_in
+        )
+
+    def upload_part(self, upload_id: str, part_number: int, stream, max_bytes: int | None = None) -> str:
+        upload_dir = self._upload_dir(upload_id)
+        if not os.path.isdir(upload_dir):
+            raise StorageError("Upload not found")
+
+        _, etag = self.write_stream(
+            stream,
+            os.path.join(upload_dir, f"{part_number:05d}.part"),
+            max_bytes
+        )
+        return f'"{etag}"'
+
+    def create_multipart_upload(self, key: str, content_type: str) -> str:
+        self._path(key)
+        upload_id = uuid4().hex
+        upload_dir = self._upload_dir(upload_id)
+        os.makedirs(upload_dir)
+        with open(os.path.join(upload_dir, "upload.json"), "w") as meta:
+            json.dump({
+                "key": key,
+                "content_type": content_type,
+                "initiated": time.time()
+            }, meta)
+
+        return upload_id
+
+    def _upload_meta(self, key: str, upload_id: str) -> dict:
+        try:
+            with open(os.path.join(self._upload_dir(upload_id), "upload.json")) as meta:
+                upload = json.load(meta)
+        except OSError:
+            raise StorageError("Upload not found")
+
+        if upload["key"] != key:
+            raise StorageError("Upload not found")
+        return upload
+
+    def list_parts(self, key: str, upload_id: str) -> list[dict]:
+        self._upload_meta(key, upload_id)
+        upload_dir = self._upload_dir(upload_id)
+        parts = []
+        for filename in sorted(os.listdir(upload_dir)):
+            if not filename.endswith(".part"):
+                continue
+
+            path = os.path.join(upload_dir, filename)
+            digest = hashlib.md5()
+            with open(path, "rb") as f:
+                while chunk := f.read(self.chunk_size):
+                    digest.update(chunk)
+            parts.append({
+                "PartNumber": int(filename[:-len(".part")]),
+                "ETag": f'"{digest.hexdigest()}"',
+                "Size": os.path.getsize(path)
+            })
+
+        return parts
+
+    def complete_multipart_upload(self, key: str, upload_id: str, parts: list[dict]):
+        upload = self._upload_meta(key, upload_id)
+        upload_dir = self._upload_dir(upload_id)
+        received = {part["PartNumber"]: part["ETag"] for part in self.list_parts(key, upload_id)}
+
+        ordered = sorted(parts, key=lambda part: int(part["PartNumber"]))
+        for part in ordered:
+            etag = received.get(int(part["PartNumber"]), "")
+            if etag.strip('"') != str(part["ETag"]).strip('"'):
+                raise StorageError(f"Invalid part {part['PartNumber']}")
+
+        stream = _ConcatStream(
+            os.path.join(upload_dir, f"{int(part['PartNumber']):05d}.part")
+            for part in ordered
+        )
+        self.write_stream(stream, self._path(key))
+        self._write_meta(key, upload["content_type"])
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+    def abort_multipart_upload(self, key: str, upload_id: str):
+        self._upload_meta(key, upload_id)
+        shutil.rmtree(self._upload_dir(upload_id), ignore_errors=True)
+
+    def list_multipart_uploads(self, prefix: str):
+        uploads_root = os.path.join(self.root, UPLOADS_DIR)
+        if not os.path.isdir(uploads_root):
+            return
+
+        for upload_id in os.listdir(uploads_root):
+            try:
+                with open(os.path.join(uploads_root, upload_id, "upload.json")) as meta:
+                    upload = json.load(meta)
+            except (OSError, ValueError):
+                continue
+
+            if upload["key"].startswith(prefix):
+                yield {
+                    "Key": upload["key"],
+                    "UploadId": upload_id,
+                    "Initiated": datetime.fromtimestamp(upload["initiated"], timezone.utc)
+                }
+
+
+@lru_cache
+def get_storage() -> StorageBackend:
+    """The configured storage backend (`STORAGE_BACKEND`: r2 or local)."""
+    if settings.storage_backend == "local":
+        return LocalBackend(
+            settings.local_storage_dir,
+            settings.local_storage_url,
+            settings.local_storage_chunk_bytes
+        )
+
+    if settings.storage_backend != "r2":
+        raise ValueError(f"Unknown storage backend: {settings.storage_backend}")
+
+    mirror = None
+    if settings.storage_mirror_dir:
+        mirror = LocalBackend(
+            settings.storage_mirror_dir,
+            settings.local_storage_url,
+            settings.local_storage_chunk_bytes
+        )
+    return R2Backend(mirror)
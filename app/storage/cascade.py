@@ -0,0 +1,183 @@
+from sqlalchemy import delete, func, and_, or_, select as sa_select
+from sqlmodel import Session, select
+from app.storage.models import (
+    Event,
+    LiveUpdate,
+    Video,
+    Comment,
+    Like,
+    VideoCategoryLink,
+    EngagementRollup,
+    TrendingScore,
+    UniqueViewSketch,
+    schedule_deletion
+)
+from app.storage import changes
+from config import get_settings
+
+settings = get_settings()
+
+# Events that are being purged in the background are hidden with this status
+DELETING = "deleting"
+
+
+def open_event(db: Session, event_id: int) -> Event | None:
+    """
+    The event, unless it is gone or being deleted, share-locked until the
+    transaction ends so it can't switch to deleting before rows added to it
+    are committed.
+    """
+    event = db.get(Event, event_id, with_for_update={"read": True})
+    if event is None or event.status == DELETING:
+        return None
+
+    return event
+
+
+def delete_chunked(db: Session, model, condition, limit: int | None = None) -> int:
+    """
+    Delete the rows of `model` matching `condition` by primary key, at most
+    one chunk per statement and `limit` rows in total (all when None).
+
+    Returns:
+        int: Rows deleted.
+    """
+    chunk = settings.cascade_delete_chunk_size
+    deleted = 0
+    while limit is None or deleted < limit:
+        size = chunk if limit is None else min(chunk, limit - deleted)
+        ids = db.exec(select(model.id).where(condition).limit(size)).all()
+        if not ids:
+            break
+
+        db.exec(delete(model).where(model.id.in_(ids)))
+        deleted += len(ids)
+
+    return deleted
+
+
+def forget_items(db: Session, entity_type: str, ids: list[int]):
+    """
+    Drop the engagement buckets and trending scores of deleted items, take
+    them out of the search index and mark them changed.
+    """
+    for model in (EngagementRollup, TrendingScore):
+        delete_chunked(db, model, and_(
+            model.entity_type == entity_type,
+            model.entity_id.in_(ids)
+        ))
+    changes.mark_changed(db, entity_type, ids)
+
+
+def delete_updates(db: Session, condition, limit: int | None = None) -> int:
+    """
+    Delete live updates matching `condition` in chunks; each chunk's images
+    come back with its ids, in the same query, and are queued for deletion.
+    """
+    chunk = settings.cascade_delete_chunk_size
+    deleted = 0
+    while limit is None or deleted < limit:
+        size = chunk if limit is None else min(chunk, limit - deleted)
+        rows = db.exec(
+            select(LiveUpdate.id, LiveUpdate.image_url, LiveUpdate.image_variants)
+            .where(condition)
+            .limit(size)
+        ).all()
+        if not rows:
+            break
+
+        for _, image_url, image_variants in rows:
+            schedule_deletion(db, image_url)
+            schedule_deletion(db, image_variants)
+
+        ids = [row_id for row_id, _, _ in rows]
+        for model in (Comment, Like):
+            delete_chunked(db, model, model.update_id.in_(ids))
+        forget_items(db, "update", ids)
+        db.exec(delete(LiveUpdate).where(LiveUpdate.id.in_(ids)))
+        deleted += len(rows)
+
+    return deleted
+
+
+def _event_children(event_id: int) -> list[tuple]:
+    update_ids = sa_select(LiveUpdate.id).where(LiveUpdate.event_id == event_id)
+    return [
+        (model, or_(model.event_id == event_id, model.update_id.in_(update_ids)))
+        for model in (Comment, Like)
+    ]
+
+
+def count_event_rows(db: Session, event_id: int) -> int:
+    """Updates, comments and likes hanging off an event, in one query."""
+    (comments, comment_condition), (likes, like_condition) = _event_children(event_id)
+    total = (
+        sa_select(func.count()).select_from(LiveUpdate)
+        .where(LiveUpdate.event_id == event_id).scalar_subquery()
+        + sa_select(func.count()).select_from(comments).where(comment_condition).scalar_subquery()
+        + sa_select(func.count()).select_from(likes).where(like_condition).scalar_subquery()
+    )
+    return db.scalar(sa_select(total))
+
+
+def purge_event(db: Session, event_id: int, limit: int | None = None) -> bool:
+    """
+    Delete an event's comments, likes and updates with set-based statements,
+    then the event itself.
+
+    Args:
+        limit (int | None): Child rows to delete in this call; all when None.
+
+    Returns:
+        bool: Whether the event is gone. False means rows remain and the
+        caller should commit and call again.
+    """
+    remaining = limit
+    for model, condition in _event_children(event_id):
+        deleted = delete_chunked(db, model, condition, remaining)
+        if remaining is not None:
+            remaining -= deleted
+            if remaining <= 0:
+                return False
+
+    deleted = delete_updates(db, LiveUpdate.event_id == event_id, remaining)
+    if remaining is not None and deleted >= remaining:
+        return False
+
+    # Children are gone, so the ORM delete loads nothing; its after_delete
+    # listener queues the event's own image
+    forget_items(db, "event", [event_id])
+    event = db.get(Event, event_id)
+    if event:
+        db.delete(event)
+    return True
+
+
+def purge_update(db: Session, update: LiveUpdate):
+    """Delete a live update's comments and likes in bulk, then the update."""
+    for model in (Comment, Like):
+        delete_chunked(db, model, model.update_id == update.id)
+    forget_items(db, "update", [update.id])
+    db.delete(update)
+
+
+def purge_video(db: Session, video: Video):
+    """Delete a video's comments, likes and category links in bulk, then the video."""
+    for model in (Comment, Like):
+        delete_chunked(db, model, model.video_id == video.id)
+    db.exec(delete(VideoCategoryLink).where(VideoCategoryLink.video_id == video.id))
+    forget_items(db, "video", [video.id])
+    delete_chunked(db, UniqueViewSketch, UniqueViewSketch.video_id == video.id)
+    db.delete(video)
+
+
+def purge_event_job(event_id: int):
+    """Background job: purge a large event one chunk, and one transaction, at a time."""
+    from app.core.dependencies import safe_db_operation
+
+    while not safe_db_operation(purge_event, event_id, settings.cascade_delete_chunk_size):
+        pass
+
+
+def get_deleting_event_ids(db: Session) -> list[int]:
+    return db.exec(select(Event.id).where(Event.status == DELETING)).all()
@@ -0,0 +1,72 @@
+from collections import defaultdict
+from blinker import Namespace
+from sqlalchemy import event, insert, update
+from sqlalchemy.orm import Session as SASession
+from sqlmodel import Session, select
+from app.storage import search
+from app.storage.database import run_after_commit, read_only
+from app.storage.models import ContentGeneration
+
+GENERATION_ID = 1
+
+_signals = Namespace()
+
+# Sent after a commit that changed admin-managed content, once per entity
+# type: content_changed.send("video", ids={3, 4}). Only this process hears it.
+content_changed = _signals.signal("content-changed")
+
+
+def mark_changed(db: Session, entity_type: str, ids):
+    """
+    Record that videos, events or updates were created, edited or deleted
+    in this session.
+
+    The items are re-indexed for search and, when the session commits, the
+    shared content generation is bumped in the same transaction so other
+    workers can notice, then `content_changed` is sent.
+    """
+    search.schedule_index(db, entity_type, ids)
+    db.info.setdefault("content_changes", defaultdict(set))[entity_type].update(ids)
+
+
+def _announce(changes: dict):
+    for entity_type, ids in changes.items():
+        content_changed.send(entity_type, ids=ids)
+
+
+def _bump_generation(session: SASession):
+    changes = session.info.pop("content_changes", None)
+    if not changes:
+        return
+
+    conn = session.connection()
+    table = ContentGeneration.__table__
+    bumped = conn.execute(
+        update(table)
+        .where(table.c.id == GENERATION_ID)
+        .values(generation=table.c.generation + 1)
+    ).rowcount
+    if not bumped:
+        conn.execute(
+            insert(table)
+            .prefix_with("IGNORE", dialect="mysql")
+            .prefix_with("OR IGNORE", dialect="sqlite"),
+            {"id": GENERATION_ID, "generation": 1}
+        )
+
+    run_after_commit(session, _announce, changes)
+
+
+event.listen(SASession, "before_commit", _bump_generation)
+
+
+@event.listens_for(SASession, "after_rollback")
+def _drop_changes(session: SASession):
+    session.info.pop("content_changes", None)
+
+
+@read_only
+def current_generation(db: Session) -> int:
+    return db.exec(
+        select(ContentGeneration.generation).where(ContentGeneration.id == GENERATION_ID)
+    ).first() or 0
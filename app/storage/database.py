@@ -1,10 +1,17 @@
 import os
 import time
 import logging
+import itertools
+import threading
 
-from app.storage.models import SQLModel
+from datetime import datetime, timezone
+from flask import g, has_request_context
+from app.core import timing
+from app.storage.models import SQLModel, ReplicaHeartbeat
 from config import get_settings
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, text, event, inspect, select, update, insert, exc
+from sqlalchemy.orm import Session as SASession
+from sqlalchemy.pool import NullPool
 from sqlmodel import Session
 from contextlib import contextmanager
 from typing import Generator
@@ -14,6 +21,9 @@ class DatabaseConfig:
     def __init__(self, database_url: str):
         self.database_url = database_url
         self.is_production = os.getenv('CONFIG') == 'deployment'
+        self._engine = None
+        self._engine_pid = None
+        self._lock = threading.Lock()
 
     def create_engine(self):
         """Create a new engine instance - no connection pooling for shared hosting"""
@@ -21,7 +31,7 @@ class DatabaseConfig:
             # Production settings for shared hosting - NO POOLING
             return create_engine(
                 self.database_url,
-                poolclass=None,  # No connection pool
+                poolclass=NullPool,  # No connection pool
                 # Connection settings for shared hosting
                 connect_args={
                     "charset": "utf8mb4",
@@ -44,25 +54,235 @@ class DatabaseConfig:
             )
 
 
+    def get_engine(self):
+        """
+        This process's engine, created on first use. Engines must not
+        cross a fork, so a worker that inherited one builds its own.
+        """
+        if self._engine is None or self._engine_pid != os.getpid():
+            with self._lock:
+                if self._engine is None or self._engine_pid != os.getpid():
+                    self._engine = self.create_engine()
+                    self._engine_pid = os.getpid()
+
+        return self._engine
+
+    def dispose_engine(self):
+        """Drop the engine, leaving connections a parent process still owns open."""
+        with self._lock:
+            if self._engine is not None:
+                self._engine.dispose(close=False)
+            self._engine = None
+            self._engine_pid = None
+
+
+def _utc_naive(value: datetime) -> datetime:
+    # SQLite hands datetimes back without tzinfo
+    if value.tzinfo:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class _Replica:
+    def __init__(self, index: int, database_url: str):
+        self.index = index
+        self.config = DatabaseConfig(database_url)
+        self.lag: float | None = None  # None: not measured yet or unreachable
+        self.checked_at = float("-inf")
+
+
+class ReplicaMonitor(threading.Thread):
+    """Background thread refreshing a router's replica lags."""
+
+    def __init__(self, router: "ReplicaRouter"):
+        super().__init__(name="replica-monitor", daemon=True)
+        self.router = router
+        self.stopped = threading.Event()
+
+    def run(self):
+        while True:
+            try:
+                self.router.check_replicas()
+            except Exception as e:
+                logging.warning(f"Replica health checks failed: {e}")
+            if self.stopped.wait(self.router.check_interval):
+                return
+
+
+class ReplicaRouter:
+    """
+    Picks the database for read-only work.
+
+    Replicas take turns. A background thread per process checks them every
+    `check_interval` seconds: the primary's heartbeat row is read and
+    refreshed, then compared with each replica's copy of it. Reads only use
+    the last measured lags, and skip a replica that is unreachable or trails
+    by more than `max_lag` seconds; with no healthy replica, reads go to the
+    primary.
+    """
+
+    def __init__(
+        self,
+        primary: DatabaseConfig,
+        replica_urls: list[str],
+        max_lag: float,
+        check_interval: float
+    ):
+        self.primary = primary
+        self.replicas = [_Replica(i, url) for i, url in enumerate(replica_urls)]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._turn = itertools.count()
+        self._monitor: ReplicaMonitor | None = None
+        self._monitor_pid: int | None = None
+        self._monitor_lock = threading.Lock()
+
+    @staticmethod
+    def _heartbeat(engine) -> datetime | None:
+        with engine.connect() as conn:
+            beat = conn.execute(
+                select(ReplicaHeartbeat.beat_at).where(ReplicaHeartbeat.id == 1)
+            ).scalar()
+        return _utc_naive(beat) if beat else None
+
+    def _beat(self, now: datetime):
+        with self.primary.get_engine().begin() as conn:
+            table = ReplicaHeartbeat.__table__
+            updated = conn.execute(
+                update(table).where(table.c.id == 1).values(beat_at=now)
+            ).rowcount
+            if not updated:
+                conn.execute(insert(table).values(id=1, beat_at=now))
+
+    def _check(self, replica: _Replica, primary_beat: datetime | None, now: datetime):
+        lag = None
+        try:
+            replica_beat = self._heartbeat(replica.config.get_engine())
+            if primary_beat is None or replica_beat is None:
+                lag = None
+            elif replica_beat >= primary_beat:
+                lag = 0.0
+            else:
+                # Caught up to `replica_beat` at best
+                lag = (_utc_naive(now) - replica_beat).total_seconds()
+        except Exception as e:
+            logging.warning(f"Replica {replica.index} health check failed: {e}")
+
+        healthy = lag is not None and lag <= self.max_lag
+        was_healthy = replica.lag is not None and replica.lag <= self.max_lag
+        if healthy != was_healthy and replica.checked_at != float("-inf"):
+            logging.warning(
+                f"Replica {replica.index} {'back in rotation' if healthy else 'out of rotation'} "
+                f"(lag: {lag})"
+            )
+
+        replica.lag = lag
+        replica.checked_at = time.monotonic()
+
+    def check_replicas(self):
+        """Measure every replica's lag against one primary heartbeat."""
+        now = datetime.now(timezone.utc)
+        primary_beat = None
+        try:
+            primary_beat = self._heartbeat(self.primary.get_engine())
+            self._beat(now)
+        except Exception as e:
+            # Without the primary's beat no lag is known; reads stay on the primary
+            logging.warning(f"Replica heartbeat on the primary failed: {e}")
+
+        for replica in self.replicas:
+            self._check(replica, primary_beat, now)
+
+    def _ensure_monitor(self):
+        # Threads don't survive a fork, so every worker starts its own
+        if self._monitor is None or self._monitor_pid != os.getpid():
+            with self._monitor_lock:
+                if self._monitor is None or self._monitor_pid != os.getpid():
+                    self._monitor = ReplicaMonitor(self)
+                    self._monitor_pid = os.getpid()
+                    self._monitor.start()
+
+    def config_for_read(self) -> DatabaseConfig:
+        """A healthy replica, or the primary when there is none."""
+        if not self.replicas:
+            return self.primary
+
+        self._ensure_monitor()
+        start = next(self._turn)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if replica.lag is not None and replica.lag <= self.max_lag:
+                return replica.config
+
+        return self.primary
+
+    def dispose_engines(self):
+        for replica in self.replicas:
+            replica.config.dispose_engine()
+
+    def stats(self) -> list[dict]:
+        return [
+            {"replica": replica.index, "lag_seconds": replica.lag}
+            for replica in self.replicas
+        ]
+
+
 # Global database configuration
 db_config = DatabaseConfig(get_settings().database_uri)
+router = ReplicaRouter(
+    db_config,
+    get_settings().database_replica_uris,
+    max_lag=get_settings().replica_max_lag_seconds,
+    check_interval=get_settings().replica_check_interval
+)
+
+
+def read_only(func):
+    """Mark a CRUD function as safe to run on a read replica."""
+    func.read_only = True
+    return func
+
+
+# Read-after-write: once a request has written, its later reads must see
+# the write, so they stay on the primary
+def _flag_request_write():
+    if has_request_context():
+        g.db_wrote = True
+
+
+@event.listens_for(SASession, "after_flush")
+def _flag_flush(session, flush_context):
+    _flag_request_write()
+
+
+@event.listens_for(SASession, "do_orm_execute")
+def _flag_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _flag_request_write()
 
 
 @contextmanager
-def get_db() -> Generator[Session, None, None]:
+def get_db(read_only: bool = False) -> Generator[Session, None, None]:
     """
-    Get a fresh database session for each request.
-    This completely avoids connection pooling issues.
+    Get a fresh database session for each request, on the worker's engine.
+    In production the engine does not pool, so every session gets its own
+    connection.
+
+    Read-only work goes to a healthy replica when one is configured, unless
+    the current request has already written.
     """
-    engine = None
     session = None
 
     try:
-        # Create a fresh engine for each request
-        engine = db_config.create_engine()
+        config = db_config
+        if read_only and not (has_request_context() and g.get("db_wrote")):
+            config = router.config_for_read()
+
+        with timing.timed("db-engine"):
+            engine = config.get_engine()
 
         # Test the connection before creating session
-        with engine.connect() as conn:
+        with timing.timed("db-probe"), engine.connect() as conn:
             conn.execute(text("SELECT 1"))
 
         # Create session
@@ -70,7 +290,7 @@ def get_db() -> Generator[Session, None, None]:
 
         yield session
 
-        # Commit if no errors
+        # Commit if no errors (a no-op for read-only work)
         session.commit()
 
     except Exception as e:
@@ -89,11 +309,28 @@ def get_db() -> Generator[Session, None, None]:
             except:
                 pass  # Ignore close errors
 
-        if engine:
-            try:
-                engine.dispose()
-            except:
-                pass  # Ignore disposal errors
+
+def run_after_commit(session: Session, callback, *args):
+    """
+    Run `callback(*args)` once the session's transaction has committed.
+    Nothing runs if the transaction rolls back.
+    """
+    session.info.setdefault("after_commit", []).append((callback, args))
+
+
+@event.listens_for(SASession, "after_commit")
+def _run_after_commit_callbacks(session):
+    callbacks = session.info.pop("after_commit", [])
+    for callback, args in callbacks:
+        try:
+            callback(*args)
+        except Exception as e:
+            logging.warning(f"After-commit callback {callback.__name__} failed: {e}")
+
+
+@event.listens_for(SASession, "after_rollback")
+def _drop_after_commit_callbacks(session):
+    session.info.pop("after_commit", None)
 
 
 # Alternative function for dependency injection
@@ -128,7 +365,8 @@ def db_retry(max_attempts=5, delay=1):
                     is_retryable = any(error in error_message for error in retryable_errors)
                     if is_retryable and attempt < max_attempts - 1:
                         logging.warning(f"Database error on attempt {attempt + 1}: {e}")
-                        time.sleep(delay * (2 ** attempt))  # Exponential backoff
+                        with timing.timed("db-retry"):
+                            time.sleep(delay * (2 ** attempt))  # Exponential backoff
                         continue
                     else:
                         break
@@ -138,5 +376,117 @@ def db_retry(max_attempts=5, delay=1):
     return decorator
 
 
+# MySQL client errors meaning the server can't be reached or won't take
+# connections (as opposed to errors in a statement)
+UNAVAILABLE_ERROR_CODES = {1040, 1203, 2002, 2003, 2005, 2006, 2013, 2055}
+
+
+def is_unavailable_error(error: Exception) -> bool:
+    """Whether an error means the database itself is down or unreachable."""
+    if isinstance(error, exc.InterfaceError):
+        return True
+    if not isinstance(error, exc.OperationalError):
+        return False
+
+    args = getattr(error.orig, "args", ())
+    if args and args[0] in UNAVAILABLE_ERROR_CODES:
+        return True
+
+    return "unable to open database" in str(error).lower()
+
+
+def add_missing_columns(engine):
+    """
+    Add nullable columns introduced after a table was first created;
+    `create_all` only creates missing tables.
+    """
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+
+                # Names are quoted: reserved words such as `key` are valid columns
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(
+                    f"ALTER TABLE {preparer.format_table(table)} "
+                    f"ADD COLUMN {preparer.quote(column.name)} {column_type}"
+                ))
+                logging.info(f"Added column {table.name}.{column.name}")
+
+
+def increment_upsert(dialect: str, table, key_columns: list[str], counters: list[str]):
+    """
+    INSERT whose `counters` are added to those of an existing row with the
+    same `key_columns` (MySQL ON DUPLICATE KEY UPDATE, SQLite ON CONFLICT).
+    """
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+
+        stmt = dialect_insert(table)
+        return stmt.on_duplicate_key_update({
+            column: table.c[column] + stmt.inserted[column] for column in counters
+        })
+
+    from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+    stmt = dialect_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={column: table.c[column] + stmt.excluded[column] for column in counters}
+    )
+
+
+def add_missing_indexes(engine):
+    """Create indexes declared after a table was first created."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(conn)
+                    logging.info(f"Added index {index.name}")
+
+
+@contextmanager
+def advisory_lock(name: str, timeout: int):
+    """
+    Hold a named, server-wide lock (MySQL `GET_LOCK`) for the block.
+
+    Other databases have no advisory locks; callers there rely on unique
+    constraints and on the host-wide lock of the bootstrap.
+    """
+    engine = db_config.get_engine()
+    if engine.dialect.name != "mysql":
+        yield
+        return
+
+    with engine.connect() as conn:
+        acquired = conn.execute(
+            text("SELECT GET_LOCK(:name, :timeout)"),
+            {"name": name, "timeout": timeout}
+        ).scalar()
+        if acquired != 1:
+            raise TimeoutError(f"Could not acquire database lock '{name}'")
+
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": name})
+
+
 def create_db():
-    SQLModel.metadata.create_all(db_config.create_engine())
+    engine = db_config.get_engine()
+    SQLModel.metadata.create_all(engine)
+    add_missing_columns(engine)
+    add_missing_indexes(engine)
@@ -0,0 +1,116 @@
+import os
+import re
+
+from collections import Counter
+from sqlalchemy import update, delete, or_, select as sa_select
+from sqlalchemy.engine import Connection
+from sqlmodel import Session, select
+from werkzeug.datastructures import FileStorage
+from app.storage.models import StoredObject, StorageDeletion
+from app.core.utils import spool_and_hash, upload_stream, file_url
+from app.storage.backends import get_storage
+
+# `<prefix>/<sha256>[.w<width>].<ext>`: an original or one of its variants
+CONTENT_KEY = re.compile(r"^[^/]+/(?P<digest>[0-9a-f]{64})(?:\.w\d+)?(?:\.[A-Za-z0-9]+)?$")
+
+
+def content_digest(key: str) -> str | None:
+    """Digest of a content-addressed key, None for any other key."""
+    match = CONTENT_KEY.match(key)
+    return match.group("digest") if match else None
+
+
+def content_key(file_type: str, digest: str, filename: str | None) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    if not re.fullmatch(r"\.[a-z0-9]{1,8}", ext):
+        ext = ""
+
+    return f"{file_type}/{digest}{ext}"
+
+
+def store_file(db: Session, file: FileStorage, file_type: str = "images") -> str:
+    """
+    Upload a file under a key derived from its SHA-256 and return its URL.
+
+    The upload is hashed while it is spooled. When the hash index already
+    knows the content and a HEAD confirms the object is still there, the
+    transfer is skipped. Either way the caller's new reference is counted,
+    so the object outlives every row pointing at it.
+    """
+    spool, digest, size = spool_and_hash(file.stream)
+    with spool:
+        stored = db.exec(
+            select(StoredObject).where(StoredObject.sha256 == digest)
+        ).first()
+
+        if stored and get_storage().head_object(stored.key):
+            key = stored.key
+        else:
+            key = content_key(file_type, digest, file.filename)
+            upload_stream(spool, key, file.mimetype)
+
+            if stored is None:
+                stored = StoredObject(
+                    sha256=digest,
+                    key=key,
+                    size=size,
+                    content_type=file.mimetype
+                )
+            stored.key = key
+
+    db.add(stored)
+    db.flush()
+    stored.ref_count = StoredObject.ref_count + 1
+    db.add(stored)
+
+    # A deletion queued for this content (or its variants) is void now
+    db.exec(delete(StorageDeletion).where(or_(
+        StorageDeletion.key == key,
+        StorageDeletion.key.like(f"{file_type}/{digest}.w%")
+    )))
+
+    return file_url(key)
+
+
+def live_digests(conn: Connection, digests) -> set[str]:
+    """Digests that are still referenced by at least one row."""
+    digests = set(digests)
+    if not digests:
+        return set()
+
+    table = StoredObject.__table__
+    return set(conn.execute(
+        sa_select(table.c.sha256).where(
+            table.c.sha256.in_(digests),
+            table.c.ref_count > 0
+        )
+    ).scalars())
+
+
+def release_keys(conn: Connection, keys: list[str]) -> set[str]:
+    """
+    Drop one reference per occurrence of a content-addressed key and return
+    the keys that may really be deleted: plain keys, and content-addressed
+    keys (originals and variants) whose content is no longer referenced.
+    """
+    counts = Counter(keys)
+    digests = {content_digest(key) for key in counts} - {None}
+    if not digests:
+        return set(counts)
+
+    table = StoredObject.__table__
+    for key, releases in counts.items():
+        # Only originals have a row; variants share their original's count
+        conn.execute(
+            update(table)
+            .where(table.c.key == key)
+            .values(ref_count=table.c.ref_count - releases)
+        )
+
+    live = live_digests(conn, digests)
+    conn.execute(delete(table).where(
+        table.c.sha256.in_(digests),
+        table.c.ref_count <= 0
+    ))
+
+    return {key for key in counts if content_digest(key) not in live}
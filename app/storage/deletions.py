@@ -0,0 +1,167 @@
+import os
+import logging
+import threading
+
+from uuid import uuid4
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event, insert, update, delete, or_
+from sqlalchemy.orm import Session as SASession
+from sqlmodel import Session, select
+from app.storage.models import StorageDeletion
+from app.storage.database import run_after_commit
+from app.storage.dedup import release_keys, live_digests, content_digest
+from app.storage.backends import get_storage
+from app.storage.r2 import DELETE_BATCH_SIZE
+from config import get_settings
+
+settings = get_settings()
+
+
+# Outbox: pending keys collected during the transaction are inserted into
+# `storagedeletions` before it commits. INSERT IGNORE keeps one row per key.
+def _enqueue_pending(session: SASession, *args):
+    pending = session.info.pop("storage_deletions", None)
+    if not pending:
+        return
+
+    # Shared content is only deleted with its last reference
+    keys = release_keys(session.connection(), pending)
+    if not keys:
+        return
+
+    stmt = (
+        insert(StorageDeletion.__table__)
+        .prefix_with("IGNORE", dialect="mysql")
+        .prefix_with("OR IGNORE", dialect="sqlite")
+    )
+    now = datetime.now(timezone.utc)
+    session.connection().execute(stmt, [
+        {"key": key, "attempts": 0, "next_attempt_at": now, "created_at": now}
+        for key in sorted(keys)
+    ])
+    run_after_commit(session, wake_worker)
+
+
+# Deletes discovered by a flush (after_delete listeners) and keys scheduled
+# without any pending flush are both covered
+event.listen(SASession, "after_flush_postexec", _enqueue_pending)
+event.listen(SASession, "before_commit", _enqueue_pending)
+
+
+@event.listens_for(SASession, "after_rollback")
+def _drop_pending(session: SASession):
+    session.info.pop("storage_deletions", None)
+
+
+def claim_batch(db: Session, token: str, limit: int = DELETE_BATCH_SIZE) -> list[str]:
+    """Lease up to `limit` due keys to the caller identified by `token`."""
+    now = datetime.now(timezone.utc)
+    unclaimed = or_(
+        StorageDeletion.claimed_until.is_(None),
+        StorageDeletion.claimed_until < now
+    )
+    ids = db.exec(
+        select(StorageDeletion.id)
+        .where(StorageDeletion.next_attempt_at <= now, unclaimed)
+        .order_by(StorageDeletion.next_attempt_at)
+        .limit(limit)
+    ).all()
+    if not ids:
+        return []
+
+    # Conditional update, so concurrent workers never lease the same row
+    db.exec(
+        update(StorageDeletion)
+        .where(StorageDeletion.id.in_(ids), unclaimed)
+        .values(
+            claimed_by=token,
+            claimed_until=now + timedelta(seconds=settings.storage_delete_lease_seconds)
+        )
+    )
+
+    keys = db.exec(
+        select(StorageDeletion.key).where(StorageDeletion.claimed_by == token)
+    ).all()
+
+    # Content re-uploaded since it was queued must survive
+    live = live_digests(db.connection(), {content_digest(key) for key in keys} - {None})
+    revived = [key for key in keys if content_digest(key) in live]
+    if revived:
+        db.exec(delete(StorageDeletion).where(StorageDeletion.key.in_(revived)))
+
+    return [key for key in keys if key not in revived]
+
+
+def finish_batch(db: Session, token: str, deleted: list[str], errors: dict[str, str]):
+    """Drop deleted keys from the queue and back off the failed ones."""
+    if deleted:
+        db.exec(delete(StorageDeletion).where(StorageDeletion.key.in_(deleted)))
+
+    now = datetime.now(timezone.utc)
+    failed = db.exec(
+        select(StorageDeletion).where(StorageDeletion.claimed_by == token)
+    ).all()
+    for row in failed:
+        row.attempts += 1
+        delay = min(
+            settings.storage_delete_backoff_seconds * (2 ** (row.attempts - 1)),
+            settings.storage_delete_max_backoff_seconds
+        )
+        row.next_attempt_at = now + timedelta(seconds=delay)
+        row.claimed_by = None
+        row.claimed_until = None
+        row.last_error = errors.get(row.key, "not deleted")[:255]
+        db.add(row)
+
+
+def drain_once() -> dict:
+    """Delete one batch of due keys; returns how many were claimed and deleted."""
+    from app.core.dependencies import safe_db_operation
+
+    token = uuid4().hex
+    keys = safe_db_operation(claim_batch, token)
+    if not keys:
+        return {"claimed": 0, "deleted": 0}
+
+    result = get_storage().delete_objects(keys)
+    safe_db_operation(finish_batch, token, result["deleted"], result["errors"])
+    if result["errors"]:
+        logging.warning(f"{len(result['errors'])} storage deletions failed, will retry")
+
+    return {"claimed": len(keys), "deleted": len(result["deleted"])}
+
+
+class DeletionWorker(threading.Thread):
+    """Background thread draining the deletion queue in batches."""
+
+    def __init__(self):
+        super().__init__(name="storage-deletion-worker", daemon=True)
+        self.wakeup = threading.Event()
+
+    def run(self):
+        while True:
+            self.wakeup.wait(settings.storage_delete_poll_seconds)
+            self.wakeup.clear()
+            try:
+                while drain_once()["claimed"] == DELETE_BATCH_SIZE:
+                    pass
+            except Exception as e:
+                logging.warning(f"Storage deletion worker error: {e}")
+
+
+_worker: DeletionWorker | None = None
+_worker_pid: int | None = None
+_worker_lock = threading.Lock()
+
+
+def wake_worker():
+    """Start this process's worker if needed and let it drain now."""
+    global _worker, _worker_pid
+
+    with _worker_lock:
+        if _worker is None or _worker_pid != os.getpid():
+            _worker = DeletionWorker()
+            _worker_pid = os.getpid()
+            _worker.start()
+
+    _worker.wakeup.set()
@@ -1,19 +1,16 @@
-import boto3
-
-from botocore.client import Config
-from sqlmodel import SQLModel, Field, create_engine, Relationship
-from sqlalchemy import Column, TEXT, event
-from urllib.parse import urlparse
-from config import get_settings
+from datetime import datetime, timezone
+from sqlmodel import SQLModel, Field, Relationship, Session
+from sqlalchemy import Column, TEXT, JSON, LargeBinary, Index, UniqueConstraint, event
+from sqlalchemy.orm import object_session
 from app.schemas.event import EventBase
 from app.schemas.update import LiveUpdateBase
 from app.schemas.comment import CommentBase
 from app.schemas.like import LikeBase
 from app.schemas.video import VideoBase
 from app.schemas.category import CategoryBase
+from app.schemas.upload import UploadSessionBase
+from app.core.utils import key_from_url, media_urls
 
-settings = get_settings()
-engine = create_engine(settings.database_uri)
 
 class VideoCategoryLink(SQLModel, table=True):
     video_id: int | None = Field(default=None, foreign_key="videos.id", primary_key=True)
@@ -33,10 +30,11 @@ class Event(EventBase, table=True):
 
     id: int | None = Field(default=None, primary_key=True)
     details: str = Field(sa_column=Column(TEXT, nullable=False))
+    image_variants: dict | None = Field(default=None, sa_column=Column(JSON(none_as_null=True)))
 
-    updates: list["LiveUpdate"] = Relationship(back_populates="event", cascade_delete=True)
-    comments: list["Comment"] = Relationship(back_populates="event", cascade_delete=True)
-    likes: list["Like"] = Relationship(back_populates="event", cascade_delete=True)
+    updates: list["LiveUpdate"] = Relationship(back_populates="event", cascade_delete=True, passive_deletes=True)
+    comments: list["Comment"] = Relationship(back_populates="event", cascade_delete=True, passive_deletes=True)
+    likes: list["Like"] = Relationship(back_populates="event", cascade_delete=True, passive_deletes=True)
 
 
 class LiveUpdate(LiveUpdateBase, table=True):
@@ -44,10 +42,11 @@ class LiveUpdate(LiveUpdateBase, table=True):
 
     id: int | None = Field(default=None, primary_key=True)
     details: str = Field(sa_column=Column(TEXT, nullable=False))
+    image_variants: dict | None = Field(default=None, sa_column=Column(JSON(none_as_null=True)))
 
     event: Event | None = Relationship(back_populates="updates")
-    comments: list["Comment"] = Relationship(back_populates="update", cascade_delete=True)
-    likes: list["Like"] = Relationship(back_populates="update", cascade_delete=True)
+    comments: list["Comment"] = Relationship(back_populates="update", cascade_delete=True, passive_deletes=True)
+    likes: list["Like"] = Relationship(back_populates="update", cascade_delete=True, passive_deletes=True)
 
 
 class Video(VideoBase, table=True):
@@ -55,9 +54,10 @@ class Video(VideoBase, table=True):
 
     id: int | None = Field(default=None, primary_key=True)
     description: str = Field(sa_column=Column(TEXT, nullable=False))
+    thumbnail_variants: dict | None = Field(default=None, sa_column=Column(JSON(none_as_null=True)))
 
-    comments: list["Comment"] = Relationship(back_populates="video", cascade_delete=True)
-    likes: list["Like"] = Relationship(back_populates="video", cascade_delete=True)
+    comments: list["Comment"] = Relationship(back_populates="video", cascade_delete=True, passive_deletes=True)
+    likes: list["Like"] = Relationship(back_populates="video", cascade_delete=True, passive_deletes=True)
     categories: list["Category"] = Relationship(back_populates="videos", link_model=VideoCategoryLink)
 
 
@@ -88,40 +88,153 @@ class Like(LikeBase, table=True):
     video: Video | None = Relationship(back_populates="likes")
 
 
-r2_client = boto3.client(
-    "s3",
-    endpoint_url=settings.r2_endpoint_url_s3,
-    aws_access_key_id=settings.r2_access_key_id,
-    aws_secret_access_key=settings.r2_secret_access_key,
-    config=Config(signature_version="s3v4")
-)
+class UploadSession(UploadSessionBase, table=True):
+    __tablename__ = 'uploadsessions'
+
+    id: int | None = Field(default=None, primary_key=True)
+    upload_id: str = Field(sa_column=Column(TEXT, nullable=False))
+
+
+class ImageUpload(SQLModel, table=True):
+    """Presigned image upload issued by the API and not finalized yet"""
+    __tablename__ = 'imageuploads'
+
+    id: int | None = Field(default=None, primary_key=True)
+    key: str = Field(index=True, unique=True)
+    content_type: str
+    size: int
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), index=True)
+
+
+class StorageDeletion(SQLModel, table=True):
+    """Durable outbox of object keys waiting to be removed from storage"""
+    __tablename__ = 'storagedeletions'
+
+    id: int | None = Field(default=None, primary_key=True)
+    key: str = Field(index=True, unique=True)
+    attempts: int = 0
+    next_attempt_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), index=True)
+    claimed_by: str | None = Field(default=None, index=True)
+    claimed_until: datetime | None = None
+    last_error: str | None = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class ReplicaHeartbeat(SQLModel, table=True):
+    """Timestamp written on the primary; how far a replica's copy trails it is its lag"""
+    __tablename__ = 'replicaheartbeats'
+
+    id: int | None = Field(default=None, primary_key=True)
+    beat_at: datetime
+
+
+class EngagementRollup(SQLModel, table=True):
+    """Views, likes and comments of one video, event or update in one hour or day"""
+    __tablename__ = 'engagementrollups'
+    __table_args__ = (
+        UniqueConstraint("granularity", "entity_type", "entity_id", "bucket"),
+        Index("ix_engagementrollups_range", "granularity", "entity_type", "bucket"),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    granularity: str = Field(max_length=8)
+    entity_type: str = Field(max_length=16)
+    entity_id: int
+    bucket: datetime
+    views: int = 0
+    likes: int = 0
+    comments: int = 0
+
+
+class TrendingScore(SQLModel, table=True):
+    """
+    Forward-decayed engagement score: each interaction weighs exp(rate * age
+    of the landmark at that time), so newer ones count more and scores stay
+    comparable without ever being decayed in place
+    """
+    __tablename__ = 'trendingscores'
+    __table_args__ = (
+        UniqueConstraint("entity_type", "entity_id"),
+        Index("ix_trendingscores_rank", "entity_type", "score"),
+    )
 
-# Utility to delete a file from R2 given its public URL
-def delete_r2_file_from_url(url: str):
-    """Delete a file from Cloudflare R2 given its public URL."""
-    if not url:
+    id: int | None = Field(default=None, primary_key=True)
+    entity_type: str = Field(max_length=16)
+    entity_id: int
+    score: float = 0.0
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class TrendingLandmark(SQLModel, table=True):
+    """Reference time of every trending score, moved forward by each rebase"""
+    __tablename__ = 'trendinglandmarks'
+
+    id: int | None = Field(default=None, primary_key=True)
+    landmark: datetime
+
+
+class UniqueViewSketch(SQLModel, table=True):
+    """HyperLogLog sketch of a video's distinct viewers on one day, or of all time"""
+    __tablename__ = 'uniqueviewsketches'
+    __table_args__ = (UniqueConstraint("video_id", "period"),)
+
+    id: int | None = Field(default=None, primary_key=True)
+    video_id: int = Field(index=True)
+    period: str = Field(max_length=10)  # YYYY-MM-DD, or "all"
+    registers: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    estimate: int = 0
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class ContentGeneration(SQLModel, table=True):
+    """Counter bumped by every commit that changes admin-managed content"""
+    __tablename__ = 'contentgenerations'
+
+    id: int | None = Field(default=None, primary_key=True)
+    generation: int = 0
+
+
+class StoredObject(SQLModel, table=True):
+    """Hash index and reference count of content-addressed uploads"""
+    __tablename__ = 'storedobjects'
+
+    id: int | None = Field(default=None, primary_key=True)
+    sha256: str = Field(index=True, unique=True)
+    key: str = Field(index=True)
+    size: int
+    content_type: str
+    ref_count: int = 0
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+def schedule_deletion(session: Session | None, url: str | dict | None):
+    """
+    Queue a stored file (or every URL of an image variants mapping) for
+    deletion once the session commits.
+
+    The key is written to the `storagedeletions` outbox in the same
+    transaction, so a rollback keeps the file and a commit hands it to the
+    deletion worker. Every call drops one reference to a content-addressed
+    file; it is only deleted once no row references it.
+    """
+    if not url or session is None:
         return
-    try:
-        parsed = urlparse(url)
-        key = parsed.path.lstrip("/")
-        r2_client.delete_object(
-            Bucket=settings.r2_bucket_name,
-            Key=key
-        )
-    except Exception as e:
-        print(f"[R2 DELETE ERROR] Could not delete {url}: {e}")
+
+    session.info.setdefault("storage_deletions", []).extend(
+        key_from_url(media_url) for media_url in media_urls(url)
+    )
 
 
 # Generic cleanup event registration
 def register_r2_cleanup(model, url_fields: list[str]):
     @event.listens_for(model, "after_delete")
     def _cleanup_media(mapper, connection, target):
+        session = object_session(target)
         for field in url_fields:
-            url = getattr(target, field, None)
-            delete_r2_file_from_url(url)
+            schedule_deletion(session, getattr(target, field, None))
 
 
 # Attach cleanup to models
-register_r2_cleanup(Video, ["thumbnail_url", "url"])
-register_r2_cleanup(LiveUpdate, ["image_url"])
-register_r2_cleanup(Event, ["image_url"])
+register_r2_cleanup(Video, ["thumbnail_url", "url", "thumbnail_variants"])
+register_r2_cleanup(LiveUpdate, ["image_url", "image_variants"])
+register_r2_cleanup(Event, ["image_url", "image_variants"])
@@ -0,0 +1,318 @@
+import os
+import time
+import logging
+import threading
+
+from app.core import timing
+from config import get_settings
+
+settings = get_settings()
+
+DELETE_BATCH_SIZE = 1000  # S3 delete_objects limit
+
+_client = None
+_client_pid: int | None = None
+_client_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {"in_flight": 0, "peak_in_flight": 0, "operations": {}}
+
+
+def _before_call(model, context, **kwargs):
+    context["r2_started"] = time.perf_counter()
+    with _stats_lock:
+        _stats["in_flight"] += 1
+        _stats["peak_in_flight"] = max(_stats["peak_in_flight"], _stats["in_flight"])
+
+
+def _record_call(operation: str, context: dict, failed: bool):
+    started = context.pop("r2_started", None)
+    if started is None:
+        return
+
+    elapsed = time.perf_counter() - started
+    timing.record("r2", elapsed)
+    with _stats_lock:
+        _stats["in_flight"] -= 1
+        op = _stats["operations"].setdefault(
+            operation,
+            {"calls": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+        )
+        op["calls"] += 1
+        op["errors"] += int(failed)
+        op["total_seconds"] += elapsed
+        op["max_seconds"] = max(op["max_seconds"], elapsed)
+
+
+def _after_call(model, context, parsed=None, **kwargs):
+    failed = bool(parsed and parsed.get("Error"))
+    _record_call(model.name, context, failed)
+
+
+def _after_call_error(context, **kwargs):
+    _record_call(context.get("r2_operation", "unknown"), context, True)
+
+
+def _remember_operation(model, context, **kwargs):
+    context["r2_operation"] = model.name
+
+
+def _build_client():
+    import boto3
+    from botocore.config import Config
+
+    client = boto3.client(
+        "s3",
+        endpoint_url=settings.r2_endpoint_url_s3,
+        aws_access_key_id=settings.r2_access_key_id,
+        aws_secret_access_key=settings.r2_secret_access_key,
+        config=Config(
+            signature_version="s3v4",
+            max_pool_connections=settings.r2_max_pool_connections,
+            connect_timeout=settings.r2_connect_timeout,
+            read_timeout=settings.r2_read_timeout,
+            tcp_keepalive=settings.r2_tcp_keepalive,
+            retries={
+                "mode": settings.r2_retry_mode,
+                "max_attempts": settings.r2_max_attempts
+            }
+        )
+    )
+
+    events = client.meta.events
+    events.register("before-call.s3", _before_call)
+    events.register("before-call.s3", _remember_operation)
+    events.register("after-call.s3", _after_call)
+    events.register("after-call-error.s3", _after_call_error)
+    return client
+
+
+def get_client():
+    """
+    The process-wide R2 client, built on first use.
+
+    boto3 clients are thread-safe but must not cross a fork, so a worker
+    process that inherited a client from its parent builds its own.
+    """
+    global _client, _client_pid
+
+    if _client is not None and _client_pid == os.getpid():
+        return _client
+
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = _build_client()
+            _client_pid = os.getpid()
+
+        return _client
+
+
+def reset_client():
+    """Drop the client so the next call builds a fresh one (e.g. after fork)."""
+    global _client, _client_pid
+
+    with _client_lock:
+        _client = None
+        _client_pid = None
+
+
+def stats() -> dict:
+    """Request counters and latency per operation, plus pool utilization."""
+    with _stats_lock:
+        operations = {
+            name: {
+                **op,
+                "avg_seconds": op["total_seconds"] / op["calls"] if op["calls"] else 0.0
+            }
+            for name, op in _stats["operations"].items()
+        }
+        return {
+            "max_pool_connections": settings.r2_max_pool_connections,
+            "in_flight": _stats["in_flight"],
+            "peak_in_flight": _stats["peak_in_flight"],
+            "pool_utilization": _stats["in_flight"] / settings.r2_max_pool_connections,
+            "operations": operations
+        }
+
+
+def upload_fileobj(fileobj, key: str, content_type: str):
+    get_client().upload_fileobj(
+        Fileobj=fileobj,
+        Bucket=settings.r2_bucket_name,
+        Key=key,
+        ExtraArgs={"ContentType": content_type}
+    )
+
+
+def put_object(key: str, body: bytes, content_type: str, **extra):
+    get_client().put_object(
+        Bucket=settings.r2_bucket_name,
+        Key=key,
+        Body=body,
+        ContentType=content_type,
+        **extra
+    )
+
+
+def get_object_bytes(key: str) -> bytes:
+    obj = get_client().get_object(Bucket=settings.r2_bucket_name, Key=key)
+    return obj["Body"].read()
+
+
+def head_object(key: str) -> dict | None:
+    """Size and content type of an object, or None if it does not exist."""
+    client = get_client()
+    try:
+        head = client.head_object(Bucket=settings.r2_bucket_name, Key=key)
+    except client.exceptions.ClientError:
+        return None
+
+    return {
+        "size": head["ContentLength"],
+        "content_type": head.get("ContentType", "")
+    }
+
+
+def delete_object(key: str):
+    get_client().delete_object(Bucket=settings.r2_bucket_name, Key=key)
+
+
+def delete_objects(keys: list[str], client=None, bucket: str | None = None) -> dict:
+    """
+    Delete objects in batches of up to 1000 keys per `delete_objects` call.
+
+    Args:
+        keys (list[str]): Object keys to delete.
+        client: S3-compatible client, defaults to the shared R2 client.
+        bucket (str): Bucket name, defaults to the configured R2 bucket.
+
+    Returns:
+        dict: `deleted` keys and per-key `errors`.
+    """
+    client = client or get_client()
+    bucket = bucket or settings.r2_bucket_name
+    deleted, errors = [], {}
+
+    for start in range(0, len(keys), DELETE_BATCH_SIZE):
+        batch = keys[start:start + DELETE_BATCH_SIZE]
+        try:
+            response = client.delete_objects(
+                Bucket=bucket,
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
+            )
+        except Exception as e:
+            logging.warning(f"R2 batch delete failed: {e}")
+            errors.update({key: str(e) for key in batch})
+            continue
+
+        failed = {
+            error["Key"]: error.get("Message", error.get("Code", "error"))
+            for error in response.get("Errors", [])
+        }
+        errors.update(failed)
+        deleted.extend(key for key in batch if key not in failed)
+
+    return {"deleted": deleted, "errors": errors}
+
+
+def create_multipart_upload(key: str, content_type: str) -> str:
+    """Start a multipart upload and return its upload id."""
+    response = get_client().create_multipart_upload(
+        Bucket=settings.r2_bucket_name,
+        Key=key,
+        ContentType=content_type
+    )
+    return response["UploadId"]
+
+
+def complete_multipart_upload(key: str, upload_id: str, parts: list[dict]):
+    get_client().complete_multipart_upload(
+        Bucket=settings.r2_bucket_name,
+        Key=key,
+        UploadId=upload_id,
+        MultipartUpload={"Parts": parts}
+    )
+
+
+def abort_multipart_upload(key: str, upload_id: str):
+    get_client().abort_multipart_upload(
+        Bucket=settings.r2_bucket_name,
+        Key=key,
+        UploadId=upload_id
+    )
+
+
+def list_parts(key: str, upload_id: str) -> list[dict]:
+    """Every part R2 already holds for a multipart upload."""
+    parts = []
+    paginator = get_client().get_paginator("list_parts")
+    for page in paginator.paginate(
+        Bucket=settings.r2_bucket_name,
+        Key=key,
+        UploadId=upload_id
+    ):
+        for part in page.get("Parts", []):
+            parts.append({
+                "PartNumber": part["PartNumber"],
+                "ETag": part["ETag"],
+                "Size": part["Size"]
+            })
+
+    return parts
+
+
+def list_objects(prefix: str, client=None, bucket: str | None = None):
+    """Yield `Key`, `Size` and `LastModified` of every object under `prefix`."""
+    client = client or get_client()
+    paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket or settings.r2_bucket_name, Prefix=prefix):
+        yield from page.get("Contents", [])
+
+
+def list_multipart_uploads(prefix: str, client=None, bucket: str | None = None):
+    """Yield `Key`, `UploadId` and `Initiated` of unfinished uploads under `prefix`."""
+    client = client or get_client()
+    paginator = client.get_paginator("list_multipart_uploads")
+    for page in paginator.paginate(Bucket=bucket or settings.r2_bucket_name, Prefix=prefix):
+        yield from page.get("Uploads", [])
+
+
+def presign_part(key: str, upload_id: str, part_number: int, expires_in: int = 3600) -> str:
+    return get_client().generate_presigned_url(
+        "upload_part",
+        Params={
+            "Bucket": settings.r2_bucket_name,
+            "Key": key,
+            "UploadId": upload_id,
+            "PartNumber": part_number
+        },
+        ExpiresIn=expires_in
+    )
+
+
+def presign_put(key: str, content_type: str, size: int, expires_in: int) -> str:
+    """Presigned PUT with the content type and length signed into the URL."""
+    return get_client().generate_presigned_url(
+        "put_object",
+        Params={
+            "Bucket": settings.r2_bucket_name,
+            "Key": key,
+            "ContentType": content_type,
+            "ContentLength": size
+        },
+        ExpiresIn=expires_in
+    )
+
+
+def presign_post(key: str, content_type: str, max_bytes: int, expires_in: int) -> dict:
+    """Presigned POST policy enforcing the content type and a size range."""
+    return get_client().generate_presigned_post(
+        Bucket=settings.r2_bucket_name,
+        Key=key,
+        Fields={"Content-Type": content_type},
+        Conditions=[
+            {"Content-Type": content_type},
+            ["content-length-range", 1, max_bytes],
+        ],
+        ExpiresIn=expires_in
+    )
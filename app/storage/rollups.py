@@ -0,0 +1,204 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event, update, delete
+from sqlalchemy.orm import Session as SASession
+from sqlmodel import Session, select, func
+from app.storage import trending
+from app.storage.database import increment_upsert
+from app.storage.models import (
+    EngagementRollup,
+    VideoCategoryLink,
+    Category,
+    Comment,
+    Like
+)
+
+ENTITY_TYPES = ("video", "event", "update")
+METRICS = ("views", "likes", "comments")
+GRANULARITIES = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+
+def bucket_start(at: datetime, granularity: str) -> datetime:
+    """Start of the UTC hour or day containing `at`; naive values are taken as UTC."""
+    at = at.astimezone(timezone.utc) if at.tzinfo else at.replace(tzinfo=timezone.utc)
+    at = at.replace(minute=0, second=0, microsecond=0)
+    return at.replace(hour=0) if granularity == "day" else at
+
+
+def record_engagement(
+    db: Session,
+    entity_type: str,
+    entity_id: int,
+    at: datetime | None = None,
+    trend: bool = True,
+    **deltas: int
+):
+    """
+    Count views, likes or comments of a video, event or update towards its
+    hourly and daily buckets, e.g. `record_engagement(db, "video", 3, views=1)`,
+    and unless `trend` is False towards its trending score.
+
+    Increments are summed per session and upserted once, just before it
+    commits, so a rolled back request records nothing. Negative deltas
+    (unlikes) only adjust buckets that still exist.
+    """
+    at = at or datetime.now(timezone.utc)
+    if trend:
+        trending.add_engagement(db, entity_type, entity_id, at, deltas)
+
+    hour = bucket_start(at, "hour")
+    pending = db.info.setdefault("engagement", {})
+    counts = pending.setdefault((entity_type, entity_id, hour), dict.fromkeys(METRICS, 0))
+    for metric, delta in deltas.items():
+        counts[metric] += delta
+
+
+def _flush_engagement(session: SASession):
+    pending = session.info.pop("engagement", None)
+    if not pending:
+        return
+
+    buckets = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+    for (entity_type, entity_id, hour), counts in pending.items():
+        for granularity in GRANULARITIES:
+            key = (granularity, entity_type, entity_id, bucket_start(hour, granularity))
+            for metric, delta in counts.items():
+                buckets[key][metric] += delta
+
+    increments, decrements = [], []
+    # Sorted, so concurrent transactions lock buckets in the same order
+    for (granularity, entity_type, entity_id, bucket), counts in sorted(buckets.items()):
+        if not any(counts.values()):
+            continue
+
+        row = {
+            "granularity": granularity,
+            "entity_type": entity_type,
+            "entity_id": entity_id,
+            "bucket": bucket,
+            **counts
+        }
+        (decrements if min(counts.values()) < 0 else increments).append(row)
+
+    conn = session.connection()
+    if increments:
+        conn.execute(increment_upsert(
+            conn.dialect.name,
+            EngagementRollup.__table__,
+            ["granularity", "entity_type", "entity_id", "bucket"],
+            list(METRICS)
+        ), increments)
+
+    table = EngagementRollup.__table__
+    for row in decrements:
+        conn.execute(
+            update(table)
+            .where(
+                table.c.granularity == row["granularity"],
+                table.c.entity_type == row["entity_type"],
+                table.c.entity_id == row["entity_id"],
+                table.c.bucket == row["bucket"]
+            )
+            .values({metric: table.c[metric] + row[metric] for metric in METRICS})
+        )
+
+
+event.listen(SASession, "before_commit", _flush_engagement)
+
+
+@event.listens_for(SASession, "after_rollback")
+def _drop_engagement(session: SASession):
+    session.info.pop("engagement", None)
+
+
+def get_trend(
+    db: Session,
+    metric: str,
+    entity_type: str,
+    start: datetime,
+    end: datetime,
+    granularity: str = "day",
+    group_by: str | None = None
+) -> tuple[list[datetime], dict[str, list[int]]]:
+    """
+    Sum one metric per bucket over [start, end) from the rollups alone.
+
+    Args:
+        group_by (str | None): "category" (videos only) for one series per
+            category, "entity" for one per item, None for a single total.
+
+    Returns:
+        tuple: The bucket starts, and one zero-filled series per group.
+    """
+    start = bucket_start(start, granularity)
+    step = GRANULARITIES[granularity]
+    buckets = []
+    while start + step * len(buckets) < end:
+        buckets.append(start + step * len(buckets))
+
+    if group_by == "category":
+        group = Category.name
+    elif group_by == "entity":
+        group = EngagementRollup.entity_id
+    else:
+        group = None
+
+    columns = [EngagementRollup.bucket, func.sum(getattr(EngagementRollup, metric))]
+    stmt = select(*columns, *([group] if group is not None else [])).where(
+        EngagementRollup.granularity == granularity,
+        EngagementRollup.entity_type == entity_type,
+        EngagementRollup.bucket >= start,
+        EngagementRollup.bucket < end
+    )
+    if group_by == "category":
+        stmt = (
+            stmt.join(VideoCategoryLink, VideoCategoryLink.video_id == EngagementRollup.entity_id)
+            .join(Category, Category.id == VideoCategoryLink.category_id)
+        )
+    stmt = stmt.group_by(EngagementRollup.bucket, *([group] if group is not None else []))
+
+    # Drivers differ on whether tzinfo comes back, so index by naive UTC
+    index = {bucket.replace(tzinfo=None): i for i, bucket in enumerate(buckets)}
+    series = {} if group is not None else {"total": [0] * len(buckets)}
+    for bucket, total, *name in db.exec(stmt).all():
+        position = index.get(bucket_start(bucket, granularity).replace(tzinfo=None))
+        if position is not None:
+            values = series.setdefault(str(name[0]) if name else "total", [0] * len(buckets))
+            values[position] = int(total or 0)
+
+    return buckets, series
+
+
+def prune_hourly(db: Session, before: datetime) -> int:
+    """Delete hourly buckets older than `before`; daily buckets are kept."""
+    return db.exec(
+        delete(EngagementRollup).where(
+            EngagementRollup.granularity == "hour",
+            EngagementRollup.bucket < before
+        )
+    ).rowcount
+
+
+def rebuild_likes_and_comments(db: Session, since: datetime | None = None):
+    """
+    Recount the likes and comments buckets from the raw rows, e.g. after
+    the rollups were introduced. Views are only ever known from rollups,
+    so they are left alone; trending scores are not touched either.
+    """
+    reset = update(EngagementRollup).values(likes=0, comments=0)
+    if since is not None:
+        since = bucket_start(since, "day")
+        reset = reset.where(EngagementRollup.bucket >= since)
+    db.exec(reset)
+
+    for model, metric in ((Like, "likes"), (Comment, "comments")):
+        stmt = select(model.timestamp, model.video_id, model.event_id, model.update_id)
+        if since is not None:
+            stmt = stmt.where(model.timestamp >= since)
+
+        for timestamp, video_id, event_id, update_id in db.exec(stmt):
+            for entity_type, entity_id in zip(ENTITY_TYPES, (video_id, event_id, update_id)):
+                if entity_id is not None:
+                    record_engagement(
+                        db, entity_type, entity_id, at=timestamp, trend=False, **{metric: 1}
+                    )
@@ -0,0 +1,433 @@
+import re
+import math
+import time
+import threading
+
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict
+from functools import lru_cache
+from sqlalchemy import event, text, inspect, literal, union_all, column, table, func
+from sqlalchemy import select as sa_select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session as SASession
+from sqlmodel import Session, select
+from app.storage.database import db_config, run_after_commit
+from app.storage.models import Video, Event, LiveUpdate, VideoCategoryLink
+from config import get_settings
+
+settings = get_settings()
+
+# Searchable type -> (model, title field, body field)
+SEARCH_FIELDS = {
+    "video": (Video, "title", "description"),
+    "event": (Event, "title", "details"),
+    "update": (LiveUpdate, "title", "details"),
+}
+SEARCH_TYPES = tuple(SEARCH_FIELDS)
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(value: str | None) -> list[str]:
+    return [token.lower() for token in _TOKEN.findall(value or "")]
+
+
+def _visible(stmt, model):
+    """Leave out events being purged in the background."""
+    # cascade imports this module through changes, hence the late import
+    from app.storage.cascade import DELETING
+
+    return stmt.where(Event.status != DELETING) if model is Event else stmt
+
+
+def _documents_query(entity_type: str, id_column=None):
+    model, title, body = SEARCH_FIELDS[entity_type]
+    stmt = sa_select(
+        model.id if id_column is None else id_column(model),
+        getattr(model, title),
+        getattr(model, body)
+    )
+    return _visible(stmt, model)
+
+
+def load_documents(db: Session, keys: dict[str, set[int]]) -> dict[tuple[str, int], tuple | None]:
+    """
+    Current (title, body) of the given items by (type, id); None for items
+    that are gone or hidden, so the index drops them.
+    """
+    documents = {}
+    for entity_type, ids in keys.items():
+        model = SEARCH_FIELDS[entity_type][0]
+        documents.update({(entity_type, entity_id): None for entity_id in ids})
+        rows = db.execute(_documents_query(entity_type).where(model.id.in_(ids)))
+        for entity_id, title, body in rows:
+            documents[(entity_type, entity_id)] = (title, body)
+
+    return documents
+
+
+def schedule_index(db: Session, entity_type: str, ids):
+    """
+    Re-index items created, edited or deleted in this session. The index
+    catches up with their committed state: in the same transaction when it
+    lives in the database, right after the commit otherwise.
+    """
+    db.info.setdefault("search_index", defaultdict(set))[entity_type].update(ids)
+
+
+def _sync_index(session: SASession):
+    pending = session.info.pop("search_index", None)
+    if pending:
+        get_search_index().write(session, load_documents(session, pending))
+
+
+event.listen(SASession, "before_commit", _sync_index)
+
+
+@event.listens_for(SASession, "after_rollback")
+def _drop_pending(session: SASession):
+    session.info.pop("search_index", None)
+
+
+class SearchIndex(ABC):
+    """
+    Full-text index over video, event and update titles and bodies.
+
+    `search` takes tokenized terms, all of which must match (the last one
+    as a prefix, for search-as-you-type), and returns (type, id, score)
+    hits, best first. Scores are higher-is-better and only comparable
+    within one backend.
+    """
+
+    name = "base"
+
+    def ensure_schema(self, engine: Engine) -> bool:
+        """Create the index structures; True when they were just created."""
+        return False
+
+    def write(self, session: Session, documents: dict):
+        """Apply `load_documents` output on behalf of a committing session."""
+
+    @abstractmethod
+    def search(
+        self,
+        db: Session,
+        terms: list[str],
+        types: list[str],
+        category_ids: list[int] | None,
+        limit: int,
+        offset: int
+    ) -> list[tuple[str, int, float]]:
+        ...
+
+    @abstractmethod
+    def rebuild(self, db: Session) -> int:
+        """Re-index every item; returns how many are indexed."""
+
+
+class FTS5Index(SearchIndex):
+    """
+    SQLite FTS5 table ranked by its built-in BM25. Rows are keyed by
+    rowid = id * 4 + type code, so re-indexing an item never scans.
+    """
+
+    name = "fts5"
+    table = "search_index"
+    codes = {"video": 1, "event": 2, "update": 3}
+
+    @staticmethod
+    def available(engine: Engine) -> bool:
+        with engine.connect() as conn:
+            return bool(conn.execute(
+                text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            ).scalar())
+
+    def ensure_schema(self, engine: Engine) -> bool:
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE name = :name"),
+                {"name": self.table}
+            ).first()
+            if exists:
+                return False
+
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE {self.table} "
+                "USING fts5(title, body, tokenize = 'porter unicode61')"
+            ))
+            return True
+
+    def _rowid(self, entity_type: str, entity_id: int) -> int:
+        return entity_id * 4 + self.codes[entity_type]
+
+    def write(self, session: Session, documents: dict):
+        conn = session.connection()
+        conn.execute(
+            text(f"DELETE FROM {self.table} WHERE rowid = :rowid"),
+            [{"rowid": self._rowid(*key)} for key in documents]
+        )
+
+        rows = [
+            {"rowid": self._rowid(*key), "title": document[0], "body": document[1]}
+            for key, document in documents.items() if document is not None
+        ]
+        if rows:
+            conn.execute(
+                text(f"INSERT INTO {self.table} (rowid, title, body) VALUES (:rowid, :title, :body)"),
+                rows
+            )
+
+    def search(self, db, terms, types, category_ids, limit, offset):
+        params = {
+            "query": " ".join(f'"{term}"' for term in terms) + "*",
+            "limit": limit,
+            "offset": offset
+        }
+        filters = [f"rowid % 4 IN ({', '.join(str(self.codes[t]) for t in types)})"]
+        if category_ids:
+            params.update({f"category_{i}": value for i, value in enumerate(category_ids)})
+            placeholders = ", ".join(f":category_{i}" for i in range(len(category_ids)))
+            filters.append(
+                "rowid % 4 = 1 AND rowid / 4 IN (SELECT video_id FROM videocategorylink "
+                f"WHERE category_id IN ({placeholders}))"
+            )
+
+        rows = db.connection().execute(text(
+            f"SELECT rowid, bm25({self.table}, {float(settings.search_title_weight)}, 1.0) "
+            f"FROM {self.table} WHERE {self.table} MATCH :query AND {' AND '.join(filters)} "
+            "ORDER BY 2 LIMIT :limit OFFSET :offset"
+        ), params).all()
+
+        types_by_code = {code: entity_type for entity_type, code in self.codes.items()}
+        # bm25() is lower-is-better
+        return [(types_by_code[rowid % 4], rowid // 4, -rank) for rowid, rank in rows]
+
+    def rebuild(self, db: Session) -> int:
+        conn = db.connection()
+        target = table(self.table, column("rowid"), column("title"), column("body"))
+        conn.execute(target.delete())
+        for entity_type, code in self.codes.items():
+            conn.execute(target.insert().from_select(
+                ["rowid", "title", "body"],
+                _documents_query(entity_type, lambda model: model.id * 4 + code)
+            ))
+
+        return conn.execute(text(f"SELECT COUNT(*) FROM {self.table}")).scalar()
+
+
+class FulltextIndex(SearchIndex):
+    """
+    MySQL InnoDB FULLTEXT indexes on the content tables themselves, which
+    InnoDB keeps current on every write. Queries run in boolean mode, and
+    InnoDB ranks matches with its BM25-style relevance.
+    """
+
+    name = "fulltext"
+
+    def ensure_schema(self, engine: Engine) -> bool:
+        inspector = inspect(engine)
+        created = False
+        with engine.begin() as conn:
+            for model, title, body in SEARCH_FIELDS.values():
+                name = f"ft_{model.__tablename__}"
+                existing = {index["name"] for index in inspector.get_indexes(model.__tablename__)}
+                if name not in existing:
+                    conn.execute(text(
+                        f"CREATE FULLTEXT INDEX {name} ON {model.__tablename__} ({title}, {body})"
+                    ))
+                    created = True
+
+        return created
+
+    def search(self, db, terms, types, category_ids, limit, offset):
+        from sqlalchemy.dialects.mysql import match
+
+        # Words shorter than innodb_ft_min_token_size are not indexed
+        terms = [term for term in terms if len(term) >= settings.search_min_token_size]
+        if not terms:
+            return []
+
+        query = " ".join(f"+{term}" for term in terms) + "*"
+        selects = []
+        for entity_type in types:
+            if category_ids and entity_type != "video":
+                continue
+
+            model, title, body = SEARCH_FIELDS[entity_type]
+            relevance = match(getattr(model, title), getattr(model, body), against=query).in_boolean_mode()
+            stmt = (
+                sa_select(
+                    literal(entity_type).label("entity_type"),
+                    model.id.label("entity_id"),
+                    relevance.label("score")
+                )
+                .where(relevance)
+            )
+            stmt = _visible(stmt, model)
+            if category_ids:
+                stmt = stmt.where(model.id.in_(
+                    sa_select(VideoCategoryLink.video_id)
+                    .where(VideoCategoryLink.category_id.in_(category_ids))
+                ))
+            selects.append(stmt)
+
+        if not selects:
+            return []
+
+        hits = union_all(*selects).subquery()
+        rows = db.execute(
+            sa_select(hits).order_by(hits.c.score.desc()).limit(limit).offset(offset)
+        ).all()
+        return [(entity_type, entity_id, float(score)) for entity_type, entity_id, score in rows]
+
+    def rebuild(self, db: Session) -> int:
+        self.ensure_schema(db_config.get_engine())
+        return sum(
+            db.execute(sa_select(func.count()).select_from(model)).scalar()
+            for model, _, _ in SEARCH_FIELDS.values()
+        )
+
+
+class MemoryIndex(SearchIndex):
+    """
+    In-process inverted index ranked with Okapi BM25, for databases without
+    a full-text index. Each worker keeps its own copy: its own admin writes
+    apply right after they commit, and the whole index is rebuilt from the
+    database every SEARCH_REFRESH_SECONDS to pick up the other workers'.
+    """
+
+    name = "memory"
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.built_at: float | None = None
+        self._reset()
+
+    def _reset(self):
+        self.lengths: dict[tuple[str, int], int] = {}
+        self.terms: dict[tuple[str, int], list[str]] = {}
+        self.postings: dict[str, dict[tuple[str, int], int]] = defaultdict(dict)
+        self.total_length = 0
+
+    def _add(self, key: tuple[str, int], title: str | None, body: str | None):
+        # Title words count `search_title_weight` times
+        terms = Counter(tokenize(body))
+        for term in tokenize(title):
+            terms[term] += settings.search_title_weight
+
+        self.lengths[key] = sum(terms.values())
+        self.terms[key] = list(terms)
+        self.total_length += self.lengths[key]
+        for term, frequency in terms.items():
+            self.postings[term][key] = frequency
+
+    def _remove(self, key: tuple[str, int]):
+        if key not in self.lengths:
+            return
+
+        self.total_length -= self.lengths.pop(key)
+        for term in self.terms.pop(key):
+            postings = self.postings[term]
+            del postings[key]
+            if not postings:
+                del self.postings[term]
+
+    def apply(self, documents: dict):
+        with self.lock:
+            for key, document in documents.items():
+                self._remove(key)
+                if document is not None:
+                    self._add(key, *document)
+
+    def write(self, session: Session, documents: dict):
+        run_after_commit(session, self.apply, documents)
+
+    def rebuild(self, db: Session) -> int:
+        documents = {
+            (entity_type, entity_id): (title, body)
+            for entity_type in SEARCH_TYPES
+            for entity_id, title, body in db.execute(_documents_query(entity_type))
+        }
+
+        with self.lock:
+            self._reset()
+            for key, (title, body) in documents.items():
+                self._add(key, title, body)
+            self.built_at = time.monotonic()
+
+        return len(documents)
+
+    def search(self, db, terms, types, category_ids, limit, offset):
+        if self.built_at is None or time.monotonic() - self.built_at > settings.search_refresh_seconds:
+            self.rebuild(db)
+
+        allowed_videos = None
+        if category_ids:
+            types = [entity_type for entity_type in types if entity_type == "video"]
+            allowed_videos = set(db.exec(
+                select(VideoCategoryLink.video_id)
+                .where(VideoCategoryLink.category_id.in_(category_ids))
+            ).all())
+
+        with self.lock:
+            count = len(self.lengths)
+            average = self.total_length / count if count else 0
+            # Every term must match; the last one as a prefix of any indexed term
+            expansions = [[term] for term in terms[:-1]]
+            expansions.append([term for term in self.postings if term.startswith(terms[-1])])
+
+            scores = None
+            for group in expansions:
+                group_scores = defaultdict(float)
+                for term in group:
+                    postings = self.postings.get(term, {})
+                    idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for key, frequency in postings.items():
+                        norm = self.k1 * (1 - self.b + self.b * self.lengths[key] / average)
+                        group_scores[key] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+                if scores is None:
+                    scores = group_scores
+                else:
+                    scores = {key: score + group_scores[key] for key, score in scores.items() if key in group_scores}
+
+        hits = [
+            (entity_type, entity_id, score)
+            for (entity_type, entity_id), score in (scores or {}).items()
+            if entity_type in types and (allowed_videos is None or entity_id in allowed_videos)
+        ]
+        hits.sort(key=lambda hit: hit[2], reverse=True)
+        return hits[offset:offset + limit]
+
+
+@lru_cache
+def get_search_index() -> SearchIndex:
+    """
+    The configured SEARCH_BACKEND; "auto" picks FTS5 on SQLite builds that
+    have it, FULLTEXT on MySQL, and the in-memory index otherwise.
+    """
+    backend = settings.search_backend
+    if backend == "auto":
+        engine = db_config.get_engine()
+        if engine.dialect.name == "mysql":
+            backend = "fulltext"
+        elif engine.dialect.name == "sqlite" and FTS5Index.available(engine):
+            backend = "fts5"
+        else:
+            backend = "memory"
+
+    indexes = {"fts5": FTS5Index, "fulltext": FulltextIndex, "memory": MemoryIndex}
+    if backend not in indexes:
+        raise ValueError(f"Unknown SEARCH_BACKEND '{backend}'")
+
+    return indexes[backend]()
+
+
+def ensure_search_index(db: Session) -> dict:
+    """Create the index structures, filling them when they are new."""
+    index = get_search_index()
+    created = index.ensure_schema(db_config.get_engine())
+    indexed = index.rebuild(db) if created else None
+    return {"backend": index.name, "created": created, "indexed": indexed}
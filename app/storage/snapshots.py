@@ -0,0 +1,187 @@
+import gzip
+import json
+import hashlib
+import logging
+import threading
+
+from datetime import datetime, timezone
+from flask.json.provider import DefaultJSONProvider
+from sqlmodel import Session, select
+from app.core import background
+from app.storage.backends import get_storage, StorageBackend
+from app.storage.changes import content_changed, current_generation
+from app.storage.models import Event, LiveUpdate
+from config import get_settings
+
+settings = get_settings()
+
+SNAPSHOT_PREFIX = "snapshots"
+POINTER = "latest.json"
+CATALOGUE = ("categories", "tvs/grouped")
+ENDED = "ended"
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Publishes in this process render and write one at a time, so a pointer is
+# never moved back by a job that read the database earlier
+_publish_lock = threading.Lock()
+
+
+def serialize(payload) -> bytes:
+    """The JSON the API would answer with, outside of an app context."""
+    return json.dumps(
+        payload,
+        default=DefaultJSONProvider.default,
+        ensure_ascii=DefaultJSONProvider.ensure_ascii,
+        sort_keys=DefaultJSONProvider.sort_keys,
+        separators=(",", ":")
+    ).encode()
+
+
+def snapshot_names(db: Session, entity_type: str, ids) -> set[str]:
+    """Snapshots showing the given items, named after their API paths."""
+    if entity_type == "video":
+        return {"tvs/grouped"}
+    if entity_type == "event":
+        return {f"events/{event_id}" for event_id in ids}
+    if entity_type == "update":
+        event_ids = db.exec(select(LiveUpdate.event_id).where(LiveUpdate.id.in_(ids))).all()
+        return {f"events/{event_id}" for event_id in event_ids}
+
+    return set()
+
+
+def render(db: Session, names: set[str]) -> tuple[int, dict[str, object | None]]:
+    """
+    Current payload of each snapshot, None for those that should not be
+    published (events that are live, being deleted or gone), with the
+    content generation they were read at.
+    """
+    from app.crud.category import get_all_categories
+    from app.crud.event import get_event
+    from app.crud.video import get_videos
+
+    payloads = {}
+    for name in sorted(names):
+        if name == "categories":
+            payloads[name] = get_all_categories(db)
+        elif name == "tvs/grouped":
+            payloads[name] = get_videos(db, None, group_by_category=True)
+        else:
+            event = get_event(db, int(name.split("/")[1]))
+            payloads[name] = event if event and event["status"] == ENDED else None
+
+    return current_generation(db), payloads
+
+
+def ended_event_names(db: Session) -> set[str]:
+    event_ids = db.exec(select(Event.id).where(Event.status == ENDED)).all()
+    return {f"events/{event_id}" for event_id in event_ids}
+
+
+def _read_pointer(storage: StorageBackend, key: str) -> dict | None:
+    if storage.head_object(key) is None:
+        return None
+
+    try:
+        return json.loads(storage.get_object_bytes(key))
+    except (OSError, ValueError) as e:
+        logging.warning(f"Unreadable snapshot pointer {key}: {e}")
+        return None
+
+
+def _versions(storage: StorageBackend, name: str) -> list[dict]:
+    prefix = f"{SNAPSHOT_PREFIX}/{name}/"
+    return sorted(
+        (obj for obj in storage.list_objects(prefix) if not obj["Key"].endswith(POINTER)),
+        key=lambda obj: obj["LastModified"],
+        reverse=True
+    )
+
+
+def write_snapshot(storage: StorageBackend, name: str, payload, generation: int) -> str:
+    """
+    Upload one snapshot as an immutable, content-addressed gzip object, then
+    point `latest.json` at it. A single PUT replaces the pointer, so readers
+    see either the old version or the new one.
+
+    Returns:
+        str: published, unchanged or superseded (a newer generation is out).
+    """
+    body = gzip.compress(serialize(payload), mtime=0)
+    version = hashlib.sha256(body).hexdigest()[:20]
+    pointer_key = f"{SNAPSHOT_PREFIX}/{name}/{POINTER}"
+
+    current = _read_pointer(storage, pointer_key)
+    if current and current.get("version") == version:
+        return "unchanged"
+    if current and current.get("generation", 0) > generation:
+        return "superseded"
+
+    key = f"{SNAPSHOT_PREFIX}/{name}/{version}.json.gz"
+    storage.put_object(key, body, "application/json", CacheControl=IMMUTABLE, ContentEncoding="gzip")
+    storage.put_object(
+        pointer_key,
+        json.dumps({
+            "version": version,
+            "url": storage.public_url(key),
+            "generation": generation,
+            "published_at": datetime.now(timezone.utc).isoformat()
+        }).encode(),
+        "application/json",
+        CacheControl=f"public, max-age={settings.snapshot_pointer_max_age}"
+    )
+
+    # Clients holding a recent pointer may still fetch the versions before it
+    stale = [
+        obj["Key"] for obj in _versions(storage, name)[settings.snapshot_keep_versions:]
+        if obj["Key"] != key
+    ]
+    if stale:
+        storage.delete_objects(stale)
+
+    return "published"
+
+
+def remove_snapshot(storage: StorageBackend, name: str) -> str:
+    keys = [obj["Key"] for obj in _versions(storage, name)]
+    pointer_key = f"{SNAPSHOT_PREFIX}/{name}/{POINTER}"
+    if storage.head_object(pointer_key) is not None:
+        keys.append(pointer_key)
+    if not keys:
+        return "absent"
+
+    storage.delete_objects(keys)
+    return "removed"
+
+
+def publish(names: set[str]) -> dict[str, str]:
+    """Render the named snapshots from the primary and publish or remove them."""
+    from app.core.dependencies import safe_db_operation
+
+    with _publish_lock:
+        generation, payloads = safe_db_operation(render, names)
+        storage = get_storage()
+        return {
+            name: (
+                remove_snapshot(storage, name) if payload is None
+                else write_snapshot(storage, name, payload, generation)
+            )
+            for name, payload in payloads.items()
+        }
+
+
+def publish_changes(entity_type: str, ids):
+    from app.core.dependencies import safe_db_operation
+
+    names = safe_db_operation(snapshot_names, entity_type, ids)
+    if names:
+        publish(names)
+
+
+def _on_content_changed(entity_type: str, ids=()):
+    if settings.snapshots_enabled:
+        background.submit(publish_changes, entity_type, set(ids))
+
+
+content_changed.connect(_on_content_changed)
@@ -0,0 +1,119 @@
+import logging
+
+from datetime import datetime, timedelta, timezone
+from sqlmodel import Session, select
+from app.storage.models import Event, LiveUpdate, Video, UploadSession
+from app.core.utils import key_from_url, media_urls
+from app.storage.backends import StorageBackend, get_storage
+
+SWEEP_PREFIXES = ("videos/", "images/")
+
+
+def referenced_keys(db: Session) -> set[str]:
+    """
+    Object keys referenced by any video, event or live update row, plus the
+    keys of uploads still in progress.
+    """
+    urls = []
+    urls.extend(db.exec(select(Video.url)).all())
+    urls.extend(db.exec(select(Video.thumbnail_url)).all())
+    urls.extend(db.exec(select(Event.image_url)).all())
+    urls.extend(db.exec(select(LiveUpdate.image_url)).all())
+    for column in (Video.thumbnail_variants, Event.image_variants, LiveUpdate.image_variants):
+        for variants in db.exec(select(column).where(column.is_not(None))).all():
+            urls.extend(media_urls(variants))
+
+    keys = {key_from_url(url) for url in urls if url}
+    keys.update(db.exec(
+        select(UploadSession.key).where(UploadSession.status == 'uploading')
+    ).all())
+
+    return keys
+
+
+def mark_uploads_aborted(db: Session, upload_ids: list[str]):
+    sessions = db.exec(
+        select(UploadSession).where(UploadSession.status == 'uploading')
+    ).all()
+    for session in sessions:
+        if session.upload_id in upload_ids:
+            session.status = 'aborted'
+            session.updated_at = datetime.now(timezone.utc)
+            db.add(session)
+
+
+def _upload_size(storage: StorageBackend, upload: dict) -> int:
+    return sum(part["Size"] for part in storage.list_parts(upload["Key"], upload["UploadId"]))
+
+
+def sweep_storage(
+    referenced: set[str],
+    dry_run: bool = False,
+    stale_after: timedelta = timedelta(hours=24),
+    grace: timedelta = timedelta(hours=1),
+    storage: StorageBackend | None = None,
+    now: datetime | None = None
+) -> dict:
+    """
+    Reconcile the storage backend against the database.
+
+    Multipart uploads initiated more than `stale_after` ago are aborted, and
+    objects under the swept prefixes that no row references are deleted once
+    they are older than `grace` (which protects uploads that have not been
+    attached to a row yet).
+
+    Args:
+        referenced (set[str]): Keys still referenced by the database.
+        dry_run (bool): Only report what would be reclaimed.
+        stale_after (timedelta): Age after which an upload is abandoned.
+        grace (timedelta): Minimum age of an unreferenced object.
+        storage (StorageBackend): Backend to sweep, defaults to the configured one.
+        now (datetime): Reference time, defaults to the current UTC time.
+
+    Returns:
+        dict: Counts, reclaimed bytes and errors.
+    """
+    storage = storage or get_storage()
+    now = now or datetime.now(timezone.utc)
+    report = {
+        "dry_run": dry_run,
+        "stale_uploads": [],
+        "orphaned_objects": [],
+        "reclaimed_bytes": 0,
+        "errors": {}
+    }
+
+    for prefix in SWEEP_PREFIXES:
+        for upload in storage.list_multipart_uploads(prefix):
+            if now - upload["Initiated"] < stale_after:
+                continue
+
+            try:
+                size = _upload_size(storage, upload)
+                if not dry_run:
+                    storage.abort_multipart_upload(upload["Key"], upload["UploadId"])
+            except Exception as e:
+                logging.warning(f"Could not abort upload {upload['UploadId']}: {e}")
+                report["errors"][upload["Key"]] = str(e)
+                continue
+
+            report["stale_uploads"].append(upload["UploadId"])
+            report["reclaimed_bytes"] += size
+
+        orphans = {}
+        for obj in storage.list_objects(prefix):
+            if obj["Key"] in referenced or now - obj["LastModified"] < grace:
+                continue
+            orphans[obj["Key"]] = obj["Size"]
+
+        if dry_run:
+            deleted = list(orphans)
+        else:
+            result = storage.delete_objects(list(orphans))
+            deleted = result["deleted"]
+            report["errors"].update(result["errors"])
+
+        report["orphaned_objects"].extend(deleted)
+        report["reclaimed_bytes"] += sum(orphans[key] for key in deleted)
+
+    return report
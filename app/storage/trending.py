@@ -0,0 +1,157 @@
+import math
+
+from collections import defaultdict
+from datetime import datetime, timezone
+from sqlalchemy import event, insert, update, delete, and_
+from sqlalchemy.orm import Session as SASession
+from sqlmodel import Session, select
+from app.core import background
+from app.storage.database import run_after_commit, increment_upsert
+from app.storage.models import TrendingScore, TrendingLandmark
+from config import get_settings
+
+settings = get_settings()
+
+LANDMARK_ID = 1
+
+
+def _rate() -> float:
+    """Decay rate per second: a score halves every TRENDING_HALF_LIFE_HOURS."""
+    return math.log(2) / (settings.trending_half_life_hours * 3600)
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite hands datetimes back without tzinfo
+    return value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def add_engagement(db: Session, entity_type: str, entity_id: int, at: datetime, deltas: dict):
+    """
+    Queue the weighted, forward-decayed value of new engagement; it is added
+    to the item's score just before the session commits.
+
+    Values are kept relative to a reference time taken once per session, and
+    rescaled to the landmark when written.
+    """
+    weight = sum(settings.trending_weights.get(metric, 0) * delta for metric, delta in deltas.items())
+    if not weight:
+        return
+
+    reference = db.info.setdefault("trending_reference", datetime.now(timezone.utc))
+    pending = db.info.setdefault("trending", defaultdict(float))
+    pending[(entity_type, entity_id)] += weight * math.exp(
+        _rate() * (_utc(at) - reference).total_seconds()
+    )
+
+
+def _read_landmark(conn, lock: bool) -> datetime:
+    table = TrendingLandmark.__table__
+    query = table.select().where(table.c.id == LANDMARK_ID)
+    # Writers share the landmark; a rebase holds it alone while rescaling
+    row = conn.execute(query.with_for_update(read=not lock)).first()
+    if row is None:
+        conn.execute(
+            insert(table)
+            .prefix_with("IGNORE", dialect="mysql")
+            .prefix_with("OR IGNORE", dialect="sqlite"),
+            {"id": LANDMARK_ID, "landmark": datetime.now(timezone.utc)}
+        )
+        row = conn.execute(query.with_for_update(read=not lock)).first()
+
+    return _utc(row.landmark)
+
+
+def _flush_trending(session: SASession):
+    pending = session.info.pop("trending", None)
+    reference = session.info.pop("trending_reference", None)
+    if not pending:
+        return
+
+    conn = session.connection()
+    landmark = _read_landmark(conn, lock=False)
+    scale = math.exp(_rate() * (reference - landmark).total_seconds())
+    now = datetime.now(timezone.utc)
+    conn.execute(
+        increment_upsert(
+            conn.dialect.name,
+            TrendingScore.__table__,
+            ["entity_type", "entity_id"],
+            ["score"]
+        ),
+        [
+            {"entity_type": entity_type, "entity_id": entity_id, "score": value * scale, "updated_at": now}
+            for (entity_type, entity_id), value in sorted(pending.items())
+        ]
+    )
+
+    if (now - landmark).total_seconds() > settings.trending_rebase_hours * 3600:
+        run_after_commit(session, background.submit, rebase_job)
+
+
+event.listen(SASession, "before_commit", _flush_trending)
+
+
+@event.listens_for(SASession, "after_rollback")
+def _drop_trending(session: SASession):
+    session.info.pop("trending", None)
+    session.info.pop("trending_reference", None)
+
+
+def rebase(db: Session) -> dict:
+    """
+    Compaction pass: move the landmark to now, rescale every score by the
+    decay since the old landmark, and drop items whose score has faded
+    below TRENDING_MIN_SCORE. Keeps scores bounded however long they run.
+    """
+    conn = db.connection()
+    landmark = _read_landmark(conn, lock=True)
+    now = datetime.now(timezone.utc)
+    factor = math.exp(-_rate() * (now - landmark).total_seconds())
+
+    db.exec(update(TrendingScore).values(score=TrendingScore.score * factor))
+    pruned = db.exec(
+        delete(TrendingScore).where(TrendingScore.score < settings.trending_min_score)
+    ).rowcount
+    db.exec(
+        update(TrendingLandmark)
+        .where(TrendingLandmark.id == LANDMARK_ID)
+        .values(landmark=now)
+    )
+
+    return {"factor": factor, "pruned": pruned}
+
+
+def rebase_job():
+    from app.core.dependencies import safe_db_operation
+
+    safe_db_operation(rebase)
+
+
+def top(db: Session, model, entity_type: str, limit: int, *conditions, options=()) -> list[tuple]:
+    """
+    The `limit` highest-scored items of one type, read off the
+    (entity_type, score) index.
+
+    Returns:
+        list[tuple]: (item, score decayed to now), best first.
+    """
+    landmark = db.exec(
+        select(TrendingLandmark.landmark).where(TrendingLandmark.id == LANDMARK_ID)
+    ).first()
+    if landmark is None:
+        return []
+
+    rows = db.exec(
+        select(model, TrendingScore.score)
+        .join(TrendingScore, and_(
+            TrendingScore.entity_type == entity_type,
+            TrendingScore.entity_id == model.id
+        ))
+        .where(*conditions)
+        .order_by(TrendingScore.score.desc())
+        .limit(limit)
+        .options(*options)
+    ).all()
+
+    decay = math.exp(-_rate() * (datetime.now(timezone.utc) - _utc(landmark)).total_seconds())
+    return [(item, score * decay) for item, score in rows]
@@ -0,0 +1,237 @@
+import os
+import atexit
+import logging
+import threading
+
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from flask import request
+from sqlalchemy import insert, update, delete, tuple_
+from sqlmodel import Session, select
+from app.core.hll import HyperLogLog, hash64, SKETCH_BYTES
+from app.storage.models import Video, UniqueViewSketch
+from app.storage.rollups import bucket_start, record_engagement
+from config import get_settings
+
+settings = get_settings()
+
+# Period of the sketch kept across every day
+ALL_TIME = "all"
+
+
+def viewer_fingerprint() -> int:
+    """
+    Hash of the current viewer: the client's own id when it sends one,
+    otherwise its address and user agent. Keyed with the app secret, and
+    only the hash ever reaches a sketch.
+    """
+    client_id = request.headers.get("X-Client-Id")
+    identity = (
+        f"client:{client_id}" if client_id
+        else f"addr:{request.remote_addr}|ua:{request.user_agent.string}"
+    )
+    return hash64(identity, settings.secret_key.encode())
+
+
+def periods(days: int | None = None) -> list[str]:
+    """Sketch periods covering the last `days` UTC days, or all time."""
+    if not days:
+        return [ALL_TIME]
+
+    today = datetime.now(timezone.utc).date()
+    return [(today - timedelta(days=offset)).isoformat() for offset in range(days)]
+
+
+def prune_sketches(db: Session, days: int) -> int:
+    """
+    Delete daily sketches older than the last `days` days, which no read
+    covers; the all-time sketches are kept.
+    """
+    oldest = periods(days)[-1]
+    return db.exec(
+        delete(UniqueViewSketch).where(
+            UniqueViewSketch.period != ALL_TIME,
+            UniqueViewSketch.period < oldest
+        )
+    ).rowcount
+
+
+class ViewBuffer:
+    """
+    Views seen by this process and not yet written: raw counts per video
+    and hour, and per video a sketch of each day plus one of all time.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts: Counter = Counter()
+        self.totals: Counter = Counter()
+        self.sketches: dict[tuple[int, str], HyperLogLog] = {}
+
+    def add(self, video_id: int, fingerprint: int) -> int:
+        """Count one view; returns the video's views waiting to be written."""
+        now = datetime.now(timezone.utc)
+        with self.lock:
+            self.counts[(video_id, bucket_start(now, "hour"))] += 1
+            self.totals[video_id] += 1
+            for period in (now.date().isoformat(), ALL_TIME):
+                self.sketches.setdefault((video_id, period), HyperLogLog()).add(fingerprint)
+
+            return self.totals[video_id]
+
+    def pending_views(self, video_id: int) -> int:
+        with self.lock:
+            return self.totals[video_id]
+
+    def pending_sketch(self, video_id: int, periods: list[str]) -> HyperLogLog:
+        sketch = HyperLogLog()
+        with self.lock:
+            for period in periods:
+                if (video_id, period) in self.sketches:
+                    sketch.merge(self.sketches[(video_id, period)])
+
+        return sketch
+
+    def take(self) -> tuple[Counter, dict]:
+        with self.lock:
+            counts, sketches = self.counts, self.sketches
+            self.counts, self.totals, self.sketches = Counter(), Counter(), {}
+
+        return counts, sketches
+
+    def restore(self, counts: Counter, sketches: dict):
+        """Put back what a failed flush took, merged with anything newer."""
+        with self.lock:
+            self.counts.update(counts)
+            for (video_id, _), views in counts.items():
+                self.totals[video_id] += views
+            for key, sketch in sketches.items():
+                if key in self.sketches:
+                    sketch.merge(self.sketches[key])
+                self.sketches[key] = sketch
+
+
+def write_views(db: Session, counts: Counter, sketches: dict):
+    """
+    Add buffered views to `videos.views` and the rollups, and merge buffered
+    sketches into the stored ones. Merging takes the per-register maximum,
+    so every worker can fold its own sketches into the same rows.
+    """
+    video_ids = {video_id for video_id, _ in counts} | {video_id for video_id, _ in sketches}
+    if not video_ids:
+        return
+
+    # Views of videos deleted meanwhile are dropped
+    existing = set(db.exec(select(Video.id).where(Video.id.in_(video_ids))).all())
+
+    per_video = Counter()
+    for (video_id, hour), views in sorted(counts.items()):
+        if video_id in existing:
+            per_video[video_id] += views
+            record_engagement(db, "video", video_id, at=hour, views=views)
+
+    for video_id, views in sorted(per_video.items()):
+        db.exec(update(Video).where(Video.id == video_id).values(views=Video.views + views))
+
+    keys = sorted(key for key in sketches if key[0] in existing)
+    if not keys:
+        return
+
+    # Create missing rows first: on SQLite that also takes the write lock
+    # before the rows are read, on MySQL the reads below lock them
+    now = datetime.now(timezone.utc)
+    db.connection().execute(
+        insert(UniqueViewSketch.__table__)
+        .prefix_with("IGNORE", dialect="mysql")
+        .prefix_with("OR IGNORE", dialect="sqlite"),
+        [
+            {
+                "video_id": video_id,
+                "period": period,
+                "registers": bytes(SKETCH_BYTES),
+                "estimate": 0,
+                "updated_at": now
+            }
+            for video_id, period in keys
+        ]
+    )
+
+    rows = db.exec(
+        select(UniqueViewSketch)
+        .where(tuple_(UniqueViewSketch.video_id, UniqueViewSketch.period).in_(keys))
+        .order_by(UniqueViewSketch.video_id, UniqueViewSketch.period)
+        .with_for_update()
+    ).all()
+    for row in rows:
+        merged = HyperLogLog(row.registers).merge(sketches[(row.video_id, row.period)])
+        row.registers = merged.to_bytes()
+        row.estimate = merged.count()
+        row.updated_at = now
+        db.add(row)
+
+
+def flush():
+    """Write this process's buffered views; they are kept if the write fails."""
+    from app.core.dependencies import safe_db_operation
+
+    counts, sketches = _buffer.take()
+    if not counts and not sketches:
+        return
+
+    try:
+        safe_db_operation(write_views, counts, sketches)
+    except Exception:
+        _buffer.restore(counts, sketches)
+        raise
+
+
+class ViewFlusher(threading.Thread):
+    """Background thread writing buffered views every VIEW_FLUSH_SECONDS."""
+
+    def __init__(self):
+        super().__init__(name="view-flusher", daemon=True)
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(settings.view_flush_seconds):
+            try:
+                flush()
+            except Exception as e:
+                logging.warning(f"View flush failed, will retry: {e}")
+
+
+_buffer = ViewBuffer()
+_flusher: ViewFlusher | None = None
+_flusher_pid: int | None = None
+_flusher_lock = threading.Lock()
+
+
+def _ensure_flusher():
+    global _buffer, _flusher, _flusher_pid
+
+    with _flusher_lock:
+        if _flusher is None or _flusher_pid != os.getpid():
+            if _flusher_pid is not None:
+                _buffer = ViewBuffer()  # the parent's views are its own to write
+            else:
+                atexit.register(flush)
+            _flusher = ViewFlusher()
+            _flusher_pid = os.getpid()
+            _flusher.start()
+
+
+def record_view(video_id: int, fingerprint: int) -> int:
+    """
+    Count a view of an existing video in memory. Returns the video's views
+    not yet written, to add to the stored count when answering.
+    """
+    _ensure_flusher()
+    return _buffer.add(video_id, fingerprint)
+
+
+def pending_views(video_id: int) -> int:
+    return _buffer.pending_views(video_id)
+
+
+def pending_sketch(video_id: int, periods: list[str]) -> HyperLogLog:
+    return _buffer.pending_sketch(video_id, periods)
@@ -5,14 +5,119 @@ from functools import lru_cache
 class Settings:
     secret_key: str = os.getenv("SECRET_KEY", "default-secret")
     database_uri: str = os.getenv("DATABASE_URI", "sqlite:///app.db")
+    database_replica_uris: list[str] = [
+        uri for uri in os.getenv("DATABASE_REPLICA_URIS", "").split(",") if uri
+    ]
+    replica_max_lag_seconds: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+    replica_check_interval: float = float(os.getenv("REPLICA_CHECK_INTERVAL", "2"))
     config: str = os.getenv("CONFIG", "development")
     r2_access_key_id: str = os.getenv("R2_ACCESS_KEY_ID", "")
     r2_secret_access_key: str = os.getenv("R2_SECRET_ACCESS_KEY", "")
     r2_bucket_name: str = os.getenv("R2_BUCKET_NAME", "")
     r2_endpoint_url_s3: str = os.getenv("R2_ENDPOINT_URL_S3", "")
     r2_public_url: str = os.getenv("R2_PUBLIC_URL", "")
+    r2_max_pool_connections: int = int(os.getenv("R2_MAX_POOL_CONNECTIONS", "20"))
+    r2_connect_timeout: float = float(os.getenv("R2_CONNECT_TIMEOUT", "5"))
+    r2_read_timeout: float = float(os.getenv("R2_READ_TIMEOUT", "60"))
+    r2_tcp_keepalive: bool = os.getenv("R2_TCP_KEEPALIVE", "true").lower() == "true"
+    r2_retry_mode: str = os.getenv("R2_RETRY_MODE", "standard")
+    r2_max_attempts: int = int(os.getenv("R2_MAX_ATTEMPTS", "3"))
+    storage_backend: str = os.getenv("STORAGE_BACKEND", "r2")
+    local_storage_dir: str = os.getenv("LOCAL_STORAGE_DIR", "media")
+    local_storage_url: str = os.getenv("LOCAL_STORAGE_URL", "/media")
+    local_storage_chunk_bytes: int = int(os.getenv("LOCAL_STORAGE_CHUNK_BYTES", str(256 * 1024)))
+    storage_mirror_dir: str = os.getenv("STORAGE_MIRROR_DIR", "")
+    media_max_age: int = int(os.getenv("MEDIA_MAX_AGE", "86400"))
+    use_x_sendfile: bool = os.getenv("USE_X_SENDFILE", "false").lower() == "true"
     admin_user: str = os.getenv("ADMIN_USER", "admin")
     admin_pwd: str = os.getenv("ADMIN_PWD", "password")
+    db_max_connections: int = int(os.getenv("DB_MAX_CONNECTIONS", "8"))
+    db_read_slots: int = int(os.getenv("DB_READ_SLOTS", "5"))
+    db_write_slots: int = int(os.getenv("DB_WRITE_SLOTS", "3"))
+    db_admin_slots: int = int(os.getenv("DB_ADMIN_SLOTS", "2"))
+    db_background_slots: int = int(os.getenv("DB_BACKGROUND_SLOTS", "2"))
+    db_admin_reserved: int = int(os.getenv("DB_ADMIN_RESERVED", "1"))
+    db_queue_size: int = int(os.getenv("DB_QUEUE_SIZE", "16"))
+    db_queue_timeout: float = float(os.getenv("DB_QUEUE_TIMEOUT", "2"))
+    db_retry_after: int = int(os.getenv("DB_RETRY_AFTER", "5"))
+    db_slot_lock_dir: str = os.getenv("DB_SLOT_LOCK_DIR", "")
+    bootstrap_lock_file: str = os.getenv("BOOTSTRAP_LOCK_FILE", "/tmp/blacctheddi-bootstrap.lock")
+    bootstrap_lock_timeout: int = int(os.getenv("BOOTSTRAP_LOCK_TIMEOUT", "30"))
+    startup_budget_ms: int = int(os.getenv("STARTUP_BUDGET_MS", "1000"))
+    storage_delete_poll_seconds: float = float(os.getenv("STORAGE_DELETE_POLL_SECONDS", "30"))
+    storage_delete_lease_seconds: int = int(os.getenv("STORAGE_DELETE_LEASE_SECONDS", "300"))
+    storage_delete_backoff_seconds: int = int(os.getenv("STORAGE_DELETE_BACKOFF_SECONDS", "30"))
+    storage_delete_max_backoff_seconds: int = int(os.getenv("STORAGE_DELETE_MAX_BACKOFF_SECONDS", "3600"))
+    background_workers: int = int(os.getenv("BACKGROUND_WORKERS", "2"))
+    cascade_delete_chunk_size: int = int(os.getenv("CASCADE_DELETE_CHUNK_SIZE", "1000"))
+    cascade_delete_background_rows: int = int(os.getenv("CASCADE_DELETE_BACKGROUND_ROWS", "5000"))
+    trending_half_life_hours: float = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24"))
+    trending_weights: dict[str, float] = {
+        metric: float(weight) for metric, weight in (
+            pair.split(":") for pair in os.getenv(
+                "TRENDING_WEIGHTS", "views:1,likes:5,comments:10"
+            ).split(",")
+        )
+    }
+    trending_rebase_hours: float = float(os.getenv("TRENDING_REBASE_HOURS", "24"))
+    trending_min_score: float = float(os.getenv("TRENDING_MIN_SCORE", "0.01"))
+    trending_max_limit: int = int(os.getenv("TRENDING_MAX_LIMIT", "50"))
+    search_backend: str = os.getenv("SEARCH_BACKEND", "auto")  # auto, fts5, fulltext or memory
+    search_title_weight: int = int(os.getenv("SEARCH_TITLE_WEIGHT", "3"))
+    search_refresh_seconds: int = int(os.getenv("SEARCH_REFRESH_SECONDS", "60"))
+    search_min_token_size: int = int(os.getenv("SEARCH_MIN_TOKEN_SIZE", "3"))
+    search_max_query_length: int = int(os.getenv("SEARCH_MAX_QUERY_LENGTH", "200"))
+    search_max_limit: int = int(os.getenv("SEARCH_MAX_LIMIT", "50"))
+    batch_max_ids: int = int(os.getenv("BATCH_MAX_IDS", "100"))
+    feed_videos: int = int(os.getenv("FEED_VIDEOS", "3"))
+    feed_updates: int = int(os.getenv("FEED_UPDATES", "3"))
+    feed_events: int = int(os.getenv("FEED_EVENTS", "10"))
+    feed_check_seconds: float = float(os.getenv("FEED_CHECK_SECONDS", "2"))
+    feed_max_age_seconds: float = float(os.getenv("FEED_MAX_AGE_SECONDS", "30"))
+    singleflight_fresh_seconds: float = float(os.getenv("SINGLEFLIGHT_FRESH_SECONDS", "1"))
+    singleflight_stale_seconds: float = float(os.getenv("SINGLEFLIGHT_STALE_SECONDS", "10"))
+    singleflight_max_entries: int = int(os.getenv("SINGLEFLIGHT_MAX_ENTRIES", "2048"))
+    circuit_failure_threshold: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+    circuit_reset_seconds: float = float(os.getenv("CIRCUIT_RESET_SECONDS", "15"))
+    last_known_good_path: str = os.getenv("LAST_KNOWN_GOOD_PATH", "/tmp/blacctheddi-last-known-good.sqlite3")
+    last_known_good_memory_entries: int = int(os.getenv("LAST_KNOWN_GOOD_MEMORY_ENTRIES", "512"))
+    last_known_good_disk_entries: int = int(os.getenv("LAST_KNOWN_GOOD_DISK_ENTRIES", "20000"))
+    last_known_good_touch_seconds: float = float(os.getenv("LAST_KNOWN_GOOD_TOUCH_SECONDS", "60"))
+    cdn_purger: str = os.getenv("CDN_PURGER", "local")  # local or cloudflare
+    cloudflare_zone_id: str = os.getenv("CLOUDFLARE_ZONE_ID", "")
+    cloudflare_api_token: str = os.getenv("CLOUDFLARE_API_TOKEN", "")
+    surrogate_key_header: str = os.getenv("SURROGATE_KEY_HEADER", "Surrogate-Key")  # Cache-Tag on Cloudflare
+    snapshots_enabled: bool = os.getenv("SNAPSHOTS_ENABLED", "true").lower() == "true"
+    snapshot_pointer_max_age: int = int(os.getenv("SNAPSHOT_POINTER_MAX_AGE", "60"))
+    snapshot_keep_versions: int = int(os.getenv("SNAPSHOT_KEEP_VERSIONS", "3"))
+    server_timing_log: bool = os.getenv("SERVER_TIMING_LOG", "true").lower() == "true"
+    # Oldest last-known-good response each endpoint may serve, in seconds (0: never)
+    stale_if_error_max_age: dict[str, float] = {
+        endpoint: float(seconds) for endpoint, seconds in (
+            pair.split(":") for pair in os.getenv(
+                "STALE_IF_ERROR_MAX_AGE",
+                "default:86400,video.get_a_video:21600,event.get_event_updates:3600,"
+                "update.fetch_trending_updates:3600,video.fetch_trending_videos:3600,"
+                "search.search_content:0,counts.get_counts:3600"
+            ).split(",")
+        )
+    }
+    view_flush_seconds: float = float(os.getenv("VIEW_FLUSH_SECONDS", "10"))
+    # Proxies (CDN, load balancer) in front of the app whose X-Forwarded-For is trusted
+    trusted_proxy_hops: int = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+    rollup_hourly_retention_days: int = int(os.getenv("ROLLUP_HOURLY_RETENTION_DAYS", "14"))
+    analytics_trend_max_days: int = int(os.getenv("ANALYTICS_TREND_MAX_DAYS", "366"))
+    image_workers: int = int(os.getenv("IMAGE_WORKERS", "1"))
+    image_variant_widths: list[int] = [
+        int(width) for width in os.getenv("IMAGE_VARIANT_WIDTHS", "320,640,1280").split(",")
+    ]
+    presign_expires_in: int = int(os.getenv("PRESIGN_EXPIRES_IN", "900"))
+    part_sign_batch_max: int = int(os.getenv("PART_SIGN_BATCH_MAX", "1000"))
+    image_upload_max_bytes: int = int(os.getenv("IMAGE_UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+    image_upload_types: list[str] = os.getenv(
+        "IMAGE_UPLOAD_TYPES",
+        "image/jpeg,image/png,image/webp,image/gif"
+    ).split(",")
     video_categories: list[str] = [
         "New Releases",
         "Comedy & Satire",
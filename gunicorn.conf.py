@@ -0,0 +1,62 @@
+# gunicorn -c gunicorn.conf.py
+import os
+import time
+import multiprocessing
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from config import get_settings
+
+settings = get_settings()
+
+wsgi_app = "main:app"
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+
+# Threaded workers: requests mostly wait on MySQL and R2, so threads are
+# cheap concurrency. One thread per database slot keeps them from queueing
+# on admission control.
+worker_class = "gthread"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+threads = int(os.getenv("GUNICORN_THREADS", settings.db_max_connections))
+preload_app = os.getenv("GUNICORN_PRELOAD", "false").lower() == "true"
+
+# Set to false when deploys run `flask bootstrap` as a release step
+BOOTSTRAP_ON_START = os.getenv("BOOTSTRAP_ON_START", "true").lower() == "true"
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = 100
+
+# Heartbeat files on tmpfs, so a slow disk cannot stall workers
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+
+def on_starting(server):
+    """Pre-fork: schema check and default rows, once for the whole server."""
+    from app.factory import bootstrap
+
+    if not BOOTSTRAP_ON_START:
+        return
+
+    started = time.perf_counter()
+    bootstrap()
+    server.log.info(f"Bootstrap finished in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+def post_fork(server, worker):
+    """Post-fork: per-worker engine and storage clients."""
+    from app.factory import init_worker
+
+    worker.boot_started = time.perf_counter()
+    init_worker()
+
+
+def post_worker_init(worker):
+    """Cold-start time: fork to application ready."""
+    elapsed = (time.perf_counter() - worker.boot_started) * 1000
+    worker.log.info(f"Worker {worker.pid} booted in {elapsed:.0f} ms")
@@ -0,0 +1,66 @@
+"""
+Import-time report for worker boot.
+
+Runs `create_app()` in a fresh interpreter under `python -X importtime` and
+prints the modules with the highest cumulative import cost, plus the total
+self time per top-level package.
+
+    python scripts/importtime_report.py [--top 30]
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BOOT = "from app.factory import create_app; create_app()"
+
+
+def collect() -> list[tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) for every import made during boot."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", BOOT],
+        cwd=ROOT,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        sys.exit(result.stderr)
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--top", type=int, default=30, help="Modules to list.")
+    args = parser.parse_args()
+
+    rows = collect()
+    total = sum(self_us for _, self_us, _ in rows)
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for module, self_us, cumulative_us in sorted(rows, key=lambda r: -r[2])[:args.top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {module}")
+
+    packages = defaultdict(int)
+    for module, self_us, _ in rows:
+        packages[module.split(".")[0]] += self_us
+
+    print(f"\n{'self ms':>9} {'share':>6}  package")
+    for package, self_us in sorted(packages.items(), key=lambda p: -p[1])[:args.top]:
+        print(f"{self_us / 1000:9.1f} {self_us / total:6.1%}  {package}")
+
+    print(f"\n{len(rows)} modules, {total / 1000:.1f} ms total")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Worker boot benchmark.
+
+Times imports plus `create_app()` in several fresh interpreters, the work a
+new gunicorn worker does before its first request, and exits non-zero when
+the median exceeds the budget (`STARTUP_BUDGET_MS`, or `--budget-ms`).
+
+    python scripts/startup_benchmark.py [--runs 5] [--budget-ms 1000]
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import get_settings
+
+BOOT = """
+import time
+started = time.perf_counter()
+from app.factory import create_app
+create_app()
+print((time.perf_counter() - started) * 1000)
+"""
+
+
+def boot_ms() -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", BOOT],
+        cwd=ROOT,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        sys.exit(result.stderr)
+
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=get_settings().startup_budget_ms)
+    args = parser.parse_args()
+
+    # The first boot also writes bytecode caches; keep it out of the median
+    warmup = boot_ms()
+    runs = [boot_ms() for _ in range(args.runs)]
+    median = statistics.median(runs)
+
+    print(f"warm-up: {warmup:.0f} ms")
+    print(f"boot: median {median:.0f} ms, min {min(runs):.0f} ms, max {max(runs):.0f} ms")
+    print(f"budget: {args.budget_ms:.0f} ms")
+
+    if median > args.budget_ms:
+        print("FAIL: worker boot is over budget")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
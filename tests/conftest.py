@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# Settings are read at import time: point them at scratch locations first
+_scratch = tempfile.mkdtemp(prefix="blacctheddi-tests-")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URI", f"sqlite:///{os.path.join(_scratch, 'app.db')}")
+os.environ.setdefault("LAST_KNOWN_GOOD_PATH", "")
+os.environ.setdefault("SERVER_TIMING_LOG", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+import pytest
+from flask import Flask
+from app.storage import database
+from app.storage.database import DatabaseConfig, ReplicaRouter, get_db
+from app.storage.models import SQLModel, Category, ReplicaHeartbeat
+
+
+def _url(session) -> str:
+    return str(session.get_bind().url)
+
+
+def _replicate_heartbeat(primary: DatabaseConfig, replica: DatabaseConfig, lag: timedelta = timedelta(0)):
+    """Copy the primary's heartbeat to the replica, `lag` behind."""
+    with primary.get_engine().connect() as conn:
+        beat = conn.execute(
+            ReplicaHeartbeat.__table__.select().where(ReplicaHeartbeat.id == 1)
+        ).one().beat_at
+
+    table = ReplicaHeartbeat.__table__
+    with replica.get_engine().begin() as conn:
+        conn.execute(table.delete())
+        conn.execute(table.insert().values(id=1, beat_at=beat - lag))
+
+
+@pytest.fixture
+def router(tmp_path, monkeypatch):
+    primary = DatabaseConfig(f"sqlite:///{tmp_path / 'primary.db'}")
+    router = ReplicaRouter(
+        primary,
+        [f"sqlite:///{tmp_path / 'replica.db'}"],
+        max_lag=5,
+        check_interval=3600
+    )
+    for config in (primary, router.replicas[0].config):
+        SQLModel.metadata.create_all(config.get_engine())
+
+    # Checks are driven by the tests instead of the monitor thread
+    monkeypatch.setattr(router, "_ensure_monitor", lambda: None)
+    monkeypatch.setattr(database, "db_config", primary)
+    monkeypatch.setattr(database, "router", router)
+
+    router.check_replicas()  # writes the first heartbeat
+    _replicate_heartbeat(primary, router.replicas[0].config)
+    router.check_replicas()
+
+    yield router
+    primary.dispose_engine()
+    router.dispose_engines()
+
+
+def test_read_only_work_goes_to_a_caught_up_replica(router):
+    assert router.stats() == [{"replica": 0, "lag_seconds": 0.0}]
+
+    with get_db(read_only=True) as db:
+        assert _url(db) == router.replicas[0].config.database_url
+    with get_db() as db:
+        assert _url(db) == router.primary.database_url
+
+
+def test_reads_after_a_write_in_the_same_request_stay_on_the_primary(router):
+    app = Flask(__name__)
+
+    with app.test_request_context("/", method="POST"):
+        with get_db() as db:
+            db.add(Category(name="Fresh"))
+
+        with get_db(read_only=True) as db:
+            assert _url(db) == router.primary.database_url
+
+    with app.test_request_context("/"):
+        with get_db(read_only=True) as db:
+            assert _url(db) == router.replicas[0].config.database_url
+
+
+def test_a_lagging_replica_sends_reads_to_the_primary(router):
+    _replicate_heartbeat(router.primary, router.replicas[0].config, lag=timedelta(minutes=1))
+    router.check_replicas()
+
+    assert router.stats()[0]["lag_seconds"] > router.max_lag
+    with get_db(read_only=True) as db:
+        assert _url(db) == router.primary.database_url
+
+    _replicate_heartbeat(router.primary, router.replicas[0].config)
+    router.check_replicas()
+    with get_db(read_only=True) as db:
+        assert _url(db) == router.replicas[0].config.database_url
@@ -0,0 +1,82 @@
+import io
+import json
+import os
+import time
+
+from datetime import timedelta
+from app.storage.backends import LocalBackend, UPLOADS_DIR
+from app.storage.sweeper import sweep_storage
+
+HOUR = 3600
+
+
+def _age(storage: LocalBackend, key: str, seconds: float):
+    """Backdate an object's modification time."""
+    path = storage.local_path(key)
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def _stale_upload(storage: LocalBackend, key: str, body: bytes) -> str:
+    upload_id = storage.create_multipart_upload(key, "video/mp4")
+    storage.upload_part(upload_id, 1, io.BytesIO(body))
+
+    meta_path = os.path.join(storage.root, UPLOADS_DIR, upload_id, "upload.json")
+    with open(meta_path) as meta:
+        upload = json.load(meta)
+    upload["initiated"] = time.time() - 48 * HOUR
+    with open(meta_path, "w") as meta:
+        json.dump(upload, meta)
+
+    return upload_id
+
+
+def _populate(tmp_path) -> tuple[LocalBackend, str]:
+    storage = LocalBackend(str(tmp_path), "http://localhost/media")
+    upload_id = _stale_upload(storage, "videos/abandoned.mp4", b"v" * 100)
+
+    storage.put_object("images/orphan.jpg", b"o" * 10, "image/jpeg")
+    _age(storage, "images/orphan.jpg", 2 * HOUR)
+    storage.put_object("images/young.jpg", b"y" * 20, "image/jpeg")
+    storage.put_object("images/kept.jpg", b"k" * 40, "image/jpeg")
+    _age(storage, "images/kept.jpg", 2 * HOUR)
+
+    return storage, upload_id
+
+
+def _sweep(storage: LocalBackend, dry_run: bool) -> dict:
+    return sweep_storage(
+        {"images/kept.jpg"},
+        dry_run=dry_run,
+        stale_after=timedelta(hours=24),
+        grace=timedelta(hours=1),
+        storage=storage
+    )
+
+
+def test_sweep_aborts_stale_uploads_and_deletes_old_orphans(tmp_path):
+    storage, upload_id = _populate(tmp_path)
+
+    report = _sweep(storage, dry_run=False)
+
+    assert report["stale_uploads"] == [upload_id]
+    assert report["orphaned_objects"] == ["images/orphan.jpg"]
+    assert report["reclaimed_bytes"] == 110
+    assert report["errors"] == {}
+    assert list(storage.list_multipart_uploads("videos/")) == []
+    assert storage.head_object("images/orphan.jpg") is None
+    assert storage.head_object("images/young.jpg") is not None
+    assert storage.head_object("images/kept.jpg") is not None
+
+
+def test_dry_run_reports_the_same_without_deleting(tmp_path):
+    storage, upload_id = _populate(tmp_path)
+
+    report = _sweep(storage, dry_run=True)
+
+    assert report["dry_run"] is True
+    assert report["stale_uploads"] == [upload_id]
+    assert report["orphaned_objects"] == ["images/orphan.jpg"]
+    assert report["reclaimed_bytes"] == 110
+    assert [upload["UploadId"] for upload in storage.list_multipart_uploads("videos/")] == [upload_id]
+    assert storage.head_object("images/orphan.jpg") is not None